@@ -0,0 +1,126 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+class TTLCache:
+    """A thread-safe LRU cache whose entries expire after `ttl` seconds."""
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Any, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+def normalize_query(text: str) -> str:
+    """Canonical form of a query used as a cache key (case and whitespace folded)."""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+class SemanticAnswerCache:
+    """
+    Caches answers per document set and matches new queries by embedding similarity.
+    A query hits when its cosine similarity to a cached query over the same
+    documents is at least `threshold`.
+    """
+    def __init__(self, threshold: float = 0.95, max_per_docset: int = 256,
+                 max_docsets: int = 512, ttl: float = 3600.0):
+        self.threshold = threshold
+        self.max_per_docset = max_per_docset
+        self.max_docsets = max_docsets
+        self.ttl = ttl
+        # docset -> list of (expires_at, unit query vector, answer)
+        self._entries: "OrderedDict[frozenset, List[Tuple[float, np.ndarray, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(embedding: Iterable[float]) -> Optional[np.ndarray]:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        if norm == 0:
+            return None
+        return vec / norm
+
+    def lookup(self, document_ids: Iterable[str], embedding: Iterable[float]) -> Any:
+        key = frozenset(document_ids)
+        query = self._unit(embedding)
+        if query is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            entries[:] = [e for e in entries if e[0] >= now]
+            if not entries:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            vecs = np.stack([e[1] for e in entries])
+            scores = vecs @ query
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                return entries[best][2]
+        return None
+
+    def store(self, document_ids: Iterable[str], embedding: Iterable[float], answer: Any):
+        key = frozenset(document_ids)
+        query = self._unit(embedding)
+        if query is None:
+            return
+        with self._lock:
+            entries = self._entries.setdefault(key, [])
+            self._entries.move_to_end(key)
+            entries.append((time.monotonic() + self.ttl, query, answer))
+            if len(entries) > self.max_per_docset:
+                del entries[:len(entries) - self.max_per_docset]
+            while len(self._entries) > self.max_docsets:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, document_id: str):
+        """Drops every cached answer whose document set includes `document_id`."""
+        with self._lock:
+            for key in [k for k in self._entries if document_id in k]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Process-wide caches shared by the chat endpoint and the indexing path.
+# Level 1: normalized query text -> embedding.
+query_embedding_cache = TTLCache(maxsize=4096, ttl=24 * 3600)
+# Level 2: (document set, query embedding) -> answer.
+answer_cache = SemanticAnswerCache()
@@ -1,10 +1,46 @@
+import os
 import uuid
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional, Callable
+import functools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from datetime import datetime
 
+# --- Sync/Async Bridge ---
+# Shared pool that adapts synchronous agents, tools and skills to the async interfaces
+_sync_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ADK_SYNC_THREADS", "32")),
+    thread_name_prefix="adk-sync"
+)
+
+async def run_sync(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Runs a blocking callable on the shared thread pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_sync_executor, functools.partial(fn, *args, **kwargs))
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Lazily started pool for CPU-bound work (PDF extraction, offloaded tools), shared process-wide."""
+    global _process_pool
+    if _process_pool is None:
+        # spawn avoids forking a process that already runs threads (uvicorn, the ADK pool)
+        _process_pool = ProcessPoolExecutor(
+            max_workers=int(os.getenv("EXTRACTION_PROCESSES", str(min(4, os.cpu_count() or 1)))),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+class JobClaimedError(RuntimeError):
+    """Raised when a job is already being resumed by another caller."""
+
+class CheckpointNotFoundError(KeyError):
+    """Raised when a job has no resumable checkpoint (unknown, or already completed)."""
+
 # --- State Management ---
 @dataclass
 class State:
@@ -23,6 +59,13 @@ class State:
         entry['timestamp'] = datetime.now().isoformat()
         self.history.append(entry)
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {"session_id": self.session_id, "data": self.data, "history": self.history}
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> "State":
+        return cls(session_id=record["session_id"], data=record.get("data", {}), history=record.get("history", []))
+
 # --- Base Agent ---
 class Agent(ABC):
     """Base class for all ADK agents."""
@@ -37,25 +80,60 @@ class Agent(ABC):
         """Execute the agent's logic."""
         pass
 
+    async def arun(self, state: State, input_data: Any) -> Any:
+        """Async counterpart of `run`. Synchronous agents run on the shared thread pool."""
+        return await run_sync(self.run, state, input_data)
+
+    def mark_fallback(self, state: State):
+        """Records that this agent's LLM call failed and a heuristic result was used instead."""
+        fallbacks = state.get("fallback_agents", [])
+        if self.name not in fallbacks:
+            state.set("fallback_agents", fallbacks + [self.name])
+
     def log_execution(self, state: State, input_data: Any, output_data: Any):
         state.add_history({
             'agent': self.name,
-            'input': str(input_data), # Simplify for log
-            'output': str(output_data)
+            'input': self._describe(input_data), # Simplify for log
+            'output': self._describe(output_data)
         })
 
+    @staticmethod
+    def _describe(value: Any) -> str:
+        # Raw PDF buffers are summarized rather than dumped into the history
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return f"<{memoryview(value).nbytes} bytes>"
+        return str(value)
+
 # --- Sequential Agent ---
 class SequentialAgent(Agent):
-    """Executes a list of sub-agents in sequence."""
-    def __init__(self, name: str, description: str, agents: List[Agent]):
+    """
+    Executes a list of sub-agents in sequence.
+
+    With a `checkpoint_store`, runs whose state carries a `job_id` are
+    checkpointed after every sub-agent (and on failure), so `resume` can
+    continue a failed job from the stage that failed instead of from scratch.
+    A checkpoint keeps only what resuming needs (`checkpoint_state`), and a
+    claim on the store lets only one caller resume a job at a time.
+    """
+    # History entries describe stage inputs and outputs; checkpoints keep a prefix of each
+    checkpoint_history_chars = 200
+    def __init__(self, name: str, description: str, agents: List[Agent], checkpoint_store: Any = None):
         super().__init__(name, description)
         self.agents = agents
+        self.checkpoint_store = checkpoint_store
 
     def run(self, state: State, input_data: Any) -> Any:
-        current_input = input_data
         self.logger.info(f"Starting SequentialAgent: {self.name}")
-        
-        for agent in self.agents:
+        return self.run_agents(state, self.agents, input_data)
+
+    def run_agents(self, state: State, agents: List[Agent], input_data: Any, stages: Optional[List[str]] = None) -> Any:
+        """
+        Runs `agents` in order, piping each output into the next agent. `stages`
+        names the whole planned run when `agents` is the remainder of a resumed one.
+        """
+        stages = stages or [a.name for a in agents]
+        current_input = input_data
+        for agent in agents:
             self.logger.info(f"Running sub-agent: {agent.name}")
             try:
                 # Pass the output of the previous agent as input to the next
@@ -65,6 +143,118 @@ class SequentialAgent(Agent):
                 current_input = output
             except Exception as e:
                 self.logger.error(f"Error in agent {agent.name}: {e}")
+                self.checkpoint(state, stages, agent.name, current_input, error=e)
                 raise e
+            self.checkpoint(state, stages, agent.name, current_input, completed=True)
                 
         return current_input
+
+    async def arun(self, state: State, input_data: Any) -> Any:
+        self.logger.info(f"Starting SequentialAgent: {self.name}")
+        return await self.arun_agents(state, self.agents, input_data)
+
+    async def arun_agents(self, state: State, agents: List[Agent], input_data: Any, stages: Optional[List[str]] = None) -> Any:
+        """Async counterpart of `run_agents`."""
+        stages = stages or [a.name for a in agents]
+        current_input = input_data
+        for agent in agents:
+            self.logger.info(f"Running sub-agent: {agent.name}")
+            try:
+                output = await agent.arun(state, current_input)
+                agent.log_execution(state, current_input, output)
+                current_input = output
+            except Exception as e:
+                self.logger.error(f"Error in agent {agent.name}: {e}")
+                await run_sync(self.checkpoint, state, stages, agent.name, current_input, error=e)
+                raise e
+            await run_sync(self.checkpoint, state, stages, agent.name, current_input, completed=True)
+
+        return current_input
+
+    def checkpoint(self, state: State, stages: List[str], stage: str, next_input: Any,
+                   completed: bool = False, error: Optional[Exception] = None):
+        """
+        Persists the state and the input of the next stage to run. A failure is
+        recorded against the stage that raised, with that stage's input.
+        """
+        job_id = state.get("job_id")
+        if self.checkpoint_store is None or not job_id:
+            return
+        index = stages.index(stage) + (1 if completed else 0)
+        if index == 0:
+            # Nothing finished yet, so there is nothing to resume; the job must be re-submitted
+            self.checkpoint_store.put(job_id, {"job_id": job_id, "stages": stages, "next_stage": 0, "input": None,
+                                               "state": None, "failed_stage": stage, "error": str(error)})
+            return
+        # Stage outputs are also stored in the state; those are referenced rather than written twice
+        input_key = next((k for k, v in state.data.items() if v is next_input and next_input is not None), None)
+        record = {
+            "job_id": job_id,
+            "stages": stages,
+            "next_stage": index,
+            "input": None if input_key else next_input,
+            "input_key": input_key,
+            "state": self.checkpoint_state(state),
+            "failed_stage": None if completed else stage,
+            "error": None if error is None else str(error)
+        }
+        try:
+            self.checkpoint_store.put(job_id, record)
+        except (TypeError, ValueError) as e:
+            # Checkpoints are best-effort; a stage output that is not JSON leaves the previous one in place
+            self.logger.warning(f"Job {job_id} not checkpointed at {stage}: {e}")
+
+    def checkpoint_state(self, state: State) -> Dict[str, Any]:
+        """The part of `state` a checkpoint keeps; subclasses drop what `restore_state` can rebuild."""
+        limit = self.checkpoint_history_chars
+        history = [{k: v[:limit] if isinstance(v, str) else v for k, v in entry.items()} for entry in state.history]
+        return {"session_id": state.session_id, "data": dict(state.data), "history": history}
+
+    def restore_state(self, record: Dict[str, Any]) -> State:
+        return State.from_dict(record)
+
+    def load_checkpoint(self, job_id: str) -> Optional[Tuple[State, List[Agent], Any, List[str]]]:
+        """Returns (state, remaining agents, their input, planned stages), or None if the job cannot be resumed."""
+        record = self.checkpoint_store.get(job_id) if self.checkpoint_store is not None else None
+        if not record or record.get("state") is None:
+            return None
+        by_name = {a.name: a for a in self.agents}
+        remaining = [by_name[name] for name in record["stages"][record["next_stage"]:]]
+        state = self.restore_state(record["state"])
+        current_input = state.get(record["input_key"]) if record.get("input_key") else record["input"]
+        return state, remaining, current_input, record["stages"]
+
+    def claim_checkpoint(self, job_id: str) -> Tuple[State, List[Agent], Any, List[str]]:
+        """Claims a job for this caller and loads its checkpoint."""
+        if not self.checkpoint_store.claim(job_id):
+            raise JobClaimedError(f"Job {job_id} is already being resumed")
+        checkpoint = self.load_checkpoint(job_id)
+        if checkpoint is None:
+            self.checkpoint_store.release(job_id)
+            raise CheckpointNotFoundError(f"No resumable checkpoint for job {job_id}")
+        return checkpoint
+
+    def resume(self, job_id: str) -> Tuple[State, Any]:
+        """Continues a checkpointed job from its first unfinished stage; the checkpoint is deleted once it completes."""
+        state, remaining, current_input, stages = self.claim_checkpoint(job_id)
+        self.logger.info(f"Resuming job {job_id} at {[a.name for a in remaining]}")
+        try:
+            result = self.run_agents(state, remaining, current_input, stages)
+        except BaseException:
+            # A failed attempt leaves a checkpoint that the next retry may claim
+            self.checkpoint_store.release(job_id)
+            raise
+        # Deleting the checkpoint drops the claim with it
+        self.checkpoint_store.delete(job_id)
+        return state, result
+
+    async def aresume(self, job_id: str) -> Tuple[State, Any]:
+        state, remaining, current_input, stages = await run_sync(self.claim_checkpoint, job_id)
+        self.logger.info(f"Resuming job {job_id} at {[a.name for a in remaining]}")
+        try:
+            result = await self.arun_agents(state, remaining, current_input, stages)
+        except BaseException:
+            await run_sync(self.checkpoint_store.release, job_id)
+            raise
+        await run_sync(self.checkpoint_store.delete, job_id)
+        return state, result
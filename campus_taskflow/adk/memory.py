@@ -1,6 +1,17 @@
 from typing import Any, Dict, List, Optional
+import hashlib
 import json
 import os
+import re
+import time
+import tempfile
+
+# Checkpoints of jobs nobody retried are removed after this long
+CHECKPOINT_TTL_SECONDS = int(os.getenv("CHECKPOINT_TTL_HOURS", "24")) * 3600
+# A claim older than this belongs to a retry whose worker died, and may be taken over
+CHECKPOINT_CLAIM_SECONDS = int(os.getenv("CHECKPOINT_CLAIM_MINUTES", "30")) * 60
+# Stores sweep expired checkpoints on write, at most this often
+CHECKPOINT_SWEEP_INTERVAL = 3600
 
 class MemoryBank:
     """Manages short-term (session) and long-term (vector/file) memory."""
@@ -44,3 +55,147 @@ class MemoryBank:
 
     def clear_session(self):
         self.session_store = {}
+
+class ArtifactStore:
+    """Persistent, content-addressed cache of pipeline artifacts (one JSON file per key)."""
+    def __init__(self, artifact_dir: str = os.path.join("memory_store", "artifacts")):
+        self.artifact_dir = artifact_dir
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.artifact_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        file_path = self._path(key)
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, 'r') as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                return None
+
+    def put(self, key: str, artifacts: Dict[str, Any]):
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        # Write to a temp file first so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.artifact_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(artifacts, f)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+class DocumentLineageStore(ArtifactStore):
+    """Persists the latest processed version of each document lineage (e.g. a syllabus across revisions)."""
+    def __init__(self, artifact_dir: str = os.path.join("memory_store", "lineages")):
+        super().__init__(artifact_dir)
+
+    @staticmethod
+    def lineage_id_from_filename(filename: str) -> str:
+        """Derives a lineage id so that 'CS101 Syllabus v2.pdf' and 'cs101_syllabus.pdf' match."""
+        stem = os.path.splitext(os.path.basename(filename))[0].lower()
+        stem = re.sub(r"[\s_\-.]*(v\d+|rev\d+|final|draft|updated)$", "", stem)
+        stem = re.sub(r"[\s_\-.]+", "-", stem).strip("-")
+        return f"lineage-{stem}"
+
+    @classmethod
+    def scoped_lineage_id(cls, owner: str, document_key: str) -> str:
+        """Lineage of `document_key` for one owner (session); other owners' documents never match it."""
+        return f"{owner}:{cls.lineage_id_from_filename(document_key)}"
+
+    def load(self, lineage_id: str) -> Optional[Dict[str, Any]]:
+        return self.get(self.make_key(lineage_id))
+
+    def save(self, lineage_id: str, record: Dict[str, Any]):
+        self.put(self.make_key(lineage_id), record)
+        owner = record.get("owner")
+        if owner:
+            heads = self.heads(owner)
+            heads[lineage_id] = record.get("document_id")
+            self.put(self.make_key("heads", owner), heads)
+
+    def heads(self, owner: str) -> Dict[str, Optional[str]]:
+        """lineage_id -> latest document_id of every lineage `owner` has saved."""
+        return self.get(self.make_key("heads", owner)) or {}
+
+class CheckpointStore(ArtifactStore):
+    """
+    Per-job checkpoints of pipeline runs, kept until the job completes so failed runs can resume.
+    Checkpoints older than `ttl` seconds are swept on write; a claim file marks a job
+    that is being resumed so that concurrent retries do not run it twice.
+    """
+    # artifact_dir -> time of its last sweep in this process
+    _last_sweep: Dict[str, float] = {}
+
+    def __init__(self, artifact_dir: str = os.path.join("memory_store", "checkpoints"),
+                 ttl: float = CHECKPOINT_TTL_SECONDS):
+        super().__init__(artifact_dir)
+        self.ttl = ttl
+
+    # Job ids arrive in URLs, so they are hashed rather than used as file names
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return super().get(self.make_key(job_id))
+
+    def put(self, job_id: str, record: Dict[str, Any]):
+        super().put(self.make_key(job_id), record)
+        if time.time() - self._last_sweep.get(self.artifact_dir, 0) > CHECKPOINT_SWEEP_INTERVAL:
+            self.sweep()
+
+    def delete(self, job_id: str):
+        super().delete(self.make_key(job_id))
+        self.release(job_id)
+
+    def _claim_path(self, job_id: str) -> str:
+        return os.path.join(self.artifact_dir, f"{self.make_key(job_id)}.claim")
+
+    def claim(self, job_id: str) -> bool:
+        """Marks the job as being resumed. Returns False if another caller holds a live claim."""
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        path = self._claim_path(job_id)
+        try:
+            if time.time() - os.path.getmtime(path) > CHECKPOINT_CLAIM_SECONDS:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+        try:
+            # Exclusive creation is atomic, so exactly one concurrent caller wins
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+    def release(self, job_id: str):
+        try:
+            os.remove(self._claim_path(job_id))
+        except FileNotFoundError:
+            pass
+
+    def sweep(self) -> int:
+        """Removes checkpoints and claims not written for `ttl` seconds. Returns the number of checkpoints removed."""
+        self._last_sweep[self.artifact_dir] = time.time()
+        cutoff = time.time() - self.ttl
+        removed = 0
+        try:
+            names = os.listdir(self.artifact_dir)
+        except FileNotFoundError:
+            return 0
+        for name in names:
+            path = os.path.join(self.artifact_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += name.endswith(".json")
+            except FileNotFoundError:
+                pass
+        return removed
@@ -0,0 +1,226 @@
+import os
+import time
+import asyncio
+import random
+import logging
+import threading
+from typing import Any, Callable, List, Optional, Tuple
+
+from google.api_core import exceptions as api_exceptions
+
+logger = logging.getLogger(__name__)
+
+# Errors worth another attempt; 429s additionally shrink the concurrency window
+THROTTLE_ERRORS = (api_exceptions.TooManyRequests,)
+TRANSIENT_ERRORS = (
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.InternalServerError,
+    api_exceptions.GatewayTimeout,
+    api_exceptions.DeadlineExceeded,
+    ConnectionError,
+    TimeoutError,
+)
+
+class DeadlineExceededError(Exception):
+    """Raised when a call cannot be started or retried before its deadline."""
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts of up to `capacity`."""
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """Takes a token if one is available. Returns 0, or the seconds until one will be."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Blocks until a token is available. Returns False if `deadline` passes first."""
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    async def aacquire(self, deadline: Optional[float] = None) -> bool:
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+class AIMDLimiter:
+    """
+    Adaptive concurrency limit. The window grows by one slot per window's worth of
+    successes (additive increase) and is halved on throttling (multiplicative
+    decrease). Calls slower than `latency_target` shrink it gently, so queueing
+    at the server is noticed before it turns into 429s.
+    """
+    def __init__(self, initial: float = 4, minimum: float = 1, maximum: float = 64,
+                 latency_target: float = 30.0, backoff: float = 0.5, latency_backoff: float = 0.9):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.latency_backoff = latency_backoff
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        # (event loop, asyncio.Event) of async callers waiting for a slot
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    return False
+                self._cond.wait(timeout)
+            self.in_flight += 1
+            return True
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    async def aacquire(self, deadline: Optional[float] = None) -> bool:
+        # The window is shared with threads, so async callers wait on an event that release() sets
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return True
+                waiter = (loop, asyncio.Event())
+                self._async_waiters.append(waiter)
+            timeout = None if deadline is None else deadline - time.monotonic()
+            try:
+                if timeout is not None and timeout <= 0:
+                    return False
+                await asyncio.wait_for(waiter[1].wait(), timeout)
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                with self._cond:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+
+    def release(self, latency: float, throttled: bool = False):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit * self.backoff)
+            elif latency > self.latency_target:
+                self.limit = max(self.minimum, self.limit * self.latency_backoff)
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The waiter's loop has already closed
+                pass
+
+class RateLimiter:
+    """
+    Client-side limiter shared by every caller of one upstream API: a token bucket
+    caps request rate, an AIMD window caps concurrency, and failed calls are retried
+    with full-jitter exponential backoff until `deadline` seconds have passed.
+    """
+    def __init__(self, name: str, rate: float, burst: float, bucket: Optional[TokenBucket] = None,
+                 concurrency: Optional[AIMDLimiter] = None, max_attempts: int = 5,
+                 base_delay: float = 0.5, max_delay: float = 20.0, deadline: float = 120.0):
+        self.name = name
+        self.bucket = bucket or TokenBucket(rate, burst)
+        self.concurrency = concurrency or AIMDLimiter()
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def backoff_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, fn: Callable[..., Any], *args, deadline: Optional[float] = None, **kwargs) -> Any:
+        """
+        Calls `fn(*args, **kwargs)` under the limits. `deadline` is a budget in
+        seconds for all attempts. Non-retryable errors propagate immediately; the
+        last retryable error propagates once attempts or the deadline run out.
+        """
+        expires_at = time.monotonic() + (deadline if deadline is not None else self.deadline)
+        for attempt in range(self.max_attempts):
+            if not self.bucket.acquire(expires_at):
+                raise DeadlineExceededError(f"{self.name}: rate limit wait exceeded deadline")
+            if not self.concurrency.acquire(expires_at):
+                raise DeadlineExceededError(f"{self.name}: concurrency wait exceeded deadline")
+
+            started = time.monotonic()
+            throttled = False
+            try:
+                return fn(*args, **kwargs)
+            except THROTTLE_ERRORS + TRANSIENT_ERRORS as e:
+                throttled = isinstance(e, THROTTLE_ERRORS)
+                delay = self.backoff_delay(attempt)
+                if attempt == self.max_attempts - 1 or time.monotonic() + delay >= expires_at:
+                    raise
+                logger.warning(f"{self.name}: attempt {attempt + 1} failed ({e}); retrying in {delay:.2f}s")
+            finally:
+                self.concurrency.release(time.monotonic() - started, throttled=throttled)
+            time.sleep(delay)
+
+    async def acall(self, fn: Callable[..., Any], *args, deadline: Optional[float] = None, **kwargs) -> Any:
+        """Async counterpart of `call` for coroutine functions; waits without blocking the event loop."""
+        expires_at = time.monotonic() + (deadline if deadline is not None else self.deadline)
+        for attempt in range(self.max_attempts):
+            if not await self.bucket.aacquire(expires_at):
+                raise DeadlineExceededError(f"{self.name}: rate limit wait exceeded deadline")
+            if not await self.concurrency.aacquire(expires_at):
+                raise DeadlineExceededError(f"{self.name}: concurrency wait exceeded deadline")
+
+            started = time.monotonic()
+            throttled = False
+            try:
+                return await fn(*args, **kwargs)
+            except THROTTLE_ERRORS + TRANSIENT_ERRORS as e:
+                throttled = isinstance(e, THROTTLE_ERRORS)
+                delay = self.backoff_delay(attempt)
+                if attempt == self.max_attempts - 1 or time.monotonic() + delay >= expires_at:
+                    raise
+                logger.warning(f"{self.name}: attempt {attempt + 1} failed ({e}); retrying in {delay:.2f}s")
+            finally:
+                self.concurrency.release(time.monotonic() - started, throttled=throttled)
+            await asyncio.sleep(delay)
+
+# Shared by LLMSkill and the embedding path; tune per quota tier via environment
+gemini_limiter = RateLimiter(
+    "gemini",
+    rate=float(os.getenv("GEMINI_RPS", "2")),
+    burst=float(os.getenv("GEMINI_BURST", "5")),
+)
+embedding_limiter = RateLimiter(
+    "embedding",
+    rate=float(os.getenv("EMBEDDING_RPS", "20")),
+    burst=float(os.getenv("EMBEDDING_BURST", "40")),
+    concurrency=AIMDLimiter(initial=8, latency_target=10.0),
+)
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Any, List
+from typing import Any, Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel
+from .core import run_sync
 
 class Skill(ABC):
     """Base class for agent skills."""
@@ -7,16 +9,49 @@ class Skill(ABC):
     def execute(self, input_data: Any) -> Any:
         pass
 
+    async def aexecute(self, input_data: Any) -> Any:
+        """Async counterpart of `execute`. Synchronous skills run on the shared thread pool."""
+        return await run_sync(self.execute, input_data)
+
 import google.generativeai as genai
 import os
+import logging
+from .ratelimit import gemini_limiter
+from .structured import JSONArrayStreamParser, response_schema, validate_items, repair_prompt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = "gemini-2.5-pro"
+
+def configure_client(api_key: str):
+    """
+    Configures the Gemini client. GEMINI_API_ENDPOINT points it at another
+    server (e.g. a local fake for load and throttling tests) over REST.
+    """
+    endpoint = os.getenv("GEMINI_API_ENDPOINT")
+    if endpoint:
+        genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": endpoint})
+    else:
+        genai.configure(api_key=api_key)
+
+def async_client_supported() -> bool:
+    # The REST transport used for custom endpoints has no async client
+    return not os.getenv("GEMINI_API_ENDPOINT")
+
+def chunk_text(chunk: Any) -> str:
+    # Chunks without text parts (e.g. the final one carrying only finish_reason) raise on .text
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
 
 class LLMSkill(Skill):
     """Skill for interacting with Google Gemini models."""
-    def __init__(self, model_name: str = "gemini-2.5-pro"):
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME):
         self.model_name = model_name
         self.api_key = os.getenv("GOOGLE_API_KEY")
         if self.api_key:
-            genai.configure(api_key=self.api_key)
+            configure_client(self.api_key)
             self.model = genai.GenerativeModel(model_name)
         else:
             self.model = None
@@ -27,24 +62,139 @@ class LLMSkill(Skill):
             return "[Error: GOOGLE_API_KEY not set. Please configure it in the UI.]"
         
         try:
-            response = self.model.generate_content(prompt)
+            # Throttling and transient failures are retried under the shared limiter
+            response = gemini_limiter.call(self.model.generate_content, prompt)
+            return response.text
+        except Exception as e:
+            return f"[Error calling Gemini API: {str(e)}]"
+
+    async def aexecute(self, prompt: str) -> str:
+        if not self.model:
+            return "[Error: GOOGLE_API_KEY not set. Please configure it in the UI.]"
+        if not async_client_supported():
+            return await run_sync(self.execute, prompt)
+
+        try:
+            response = await gemini_limiter.acall(self.model.generate_content_async, prompt)
             return response.text
         except Exception as e:
             return f"[Error calling Gemini API: {str(e)}]"
 
+    def json_config(self, item_model: Type[BaseModel]) -> Dict[str, Any]:
+        # JSON mode constrained to an array of `item_model` objects
+        return {"response_mime_type": "application/json", "response_schema": response_schema(item_model)}
+
+    def stream_json(self, prompt: str, item_model: Type[BaseModel]) -> Tuple[List[Any], List[str]]:
+        """
+        Streams a JSON-mode response, parsing array elements as they arrive.
+        Returns (elements, fragments that failed to parse). A stream that breaks
+        after some elements arrived returns those instead of raising.
+        """
+        parser = JSONArrayStreamParser()
+        items = []
+        try:
+            response = self.model.generate_content(prompt, generation_config=self.json_config(item_model), stream=True)
+            for chunk in response:
+                items.extend(parser.feed(chunk_text(chunk)))
+        except Exception as e:
+            if not items:
+                raise
+            logger.warning(f"Structured stream interrupted after {len(items)} items: {e}")
+        items.extend(parser.close())
+        return items, parser.failed
+
+    async def astream_json(self, prompt: str, item_model: Type[BaseModel]) -> Tuple[List[Any], List[str]]:
+        parser = JSONArrayStreamParser()
+        items = []
+        try:
+            response = await self.model.generate_content_async(prompt, generation_config=self.json_config(item_model), stream=True)
+            async for chunk in response:
+                items.extend(parser.feed(chunk_text(chunk)))
+        except Exception as e:
+            if not items:
+                raise
+            logger.warning(f"Structured stream interrupted after {len(items)} items: {e}")
+        items.extend(parser.close())
+        return items, parser.failed
+
+    def generate_structured(self, prompt: str, item_model: Type[BaseModel], repair: bool = True) -> Optional[List[Dict[str, Any]]]:
+        """
+        Generates a JSON list of `item_model` objects. Objects that are malformed
+        or fail validation are sent back for one targeted repair call on their own.
+        Returns None when no usable response was produced, including when objects
+        arrived but none validated even after repair; an honestly empty list is [].
+        """
+        if not self.model:
+            return None
+        try:
+            items, failed = gemini_limiter.call(self.stream_json, prompt, item_model)
+        except Exception as e:
+            logger.error(f"Structured Gemini call failed: {e}")
+            return None
+
+        valid, broken = validate_items(items, item_model)
+        if repair and (broken or failed):
+            logger.info(f"Repairing {len(broken)} invalid and {len(failed)} malformed objects")
+            try:
+                repaired, _ = gemini_limiter.call(self.stream_json, repair_prompt(broken, failed), item_model)
+                valid += validate_items(repaired, item_model)[0]
+            except Exception as e:
+                logger.warning(f"Repair call failed, keeping {len(valid)} valid objects: {e}")
+        return self.usable(valid, items, failed)
+
+    async def agenerate_structured(self, prompt: str, item_model: Type[BaseModel], repair: bool = True) -> Optional[List[Dict[str, Any]]]:
+        if not self.model:
+            return None
+        if not async_client_supported():
+            return await run_sync(self.generate_structured, prompt, item_model, repair)
+        try:
+            items, failed = await gemini_limiter.acall(self.astream_json, prompt, item_model)
+        except Exception as e:
+            logger.error(f"Structured Gemini call failed: {e}")
+            return None
+
+        valid, broken = validate_items(items, item_model)
+        if repair and (broken or failed):
+            logger.info(f"Repairing {len(broken)} invalid and {len(failed)} malformed objects")
+            try:
+                repaired, _ = await gemini_limiter.acall(self.astream_json, repair_prompt(broken, failed), item_model)
+                valid += validate_items(repaired, item_model)[0]
+            except Exception as e:
+                logger.warning(f"Repair call failed, keeping {len(valid)} valid objects: {e}")
+        return self.usable(valid, items, failed)
+
+    @staticmethod
+    def usable(valid: List[Dict[str, Any]], items: List[Any], failed: List[str]) -> Optional[List[Dict[str, Any]]]:
+        # A response whose every object is unusable is a failure, not "nothing found"
+        if not valid and (items or failed):
+            logger.warning(f"None of {len(items) + len(failed)} structured objects validated")
+            return None
+        return valid
+
+    def summarize_prompt(self, text: str) -> str:
+        return f"Please provide a concise summary and key learning points for the following academic text:\n\n{text[:10000]}" # Truncate for safety
+
     def summarize(self, text: str) -> str:
-        prompt = f"Please provide a concise summary and key learning points for the following academic text:\n\n{text[:10000]}" # Truncate for safety
-        return self.execute(prompt)
+        return self.execute(self.summarize_prompt(text))
+
+    async def asummarize(self, text: str) -> str:
+        return await self.aexecute(self.summarize_prompt(text))
 
-    def generate_flashcards(self, text: str) -> List[str]:
-        prompt = f"""
-        Generate 5-10 high-quality flashcards from the following text. 
+    def flashcards_prompt(self, text: str, count: Optional[int] = None) -> str:
+        amount = f"exactly {count}" if count else "5-10"
+        return f"""
+        Generate {amount} high-quality flashcards from the following text. 
         Format the output strictly as a JSON list of objects with 'question' and 'answer' keys.
         Do not include markdown formatting like ```json.
         
         Text:
         {text[:10000]}
         """
+
+    def generate_flashcards(self, text: str, count: Optional[int] = None) -> str:
         # Note: In a real app we'd use structured output or json mode if available, 
         # or parse the text more robustly.
-        return self.execute(prompt)
+        return self.execute(self.flashcards_prompt(text, count))
+
+    async def agenerate_flashcards(self, text: str, count: Optional[int] = None) -> str:
+        return await self.aexecute(self.flashcards_prompt(text, count))
@@ -0,0 +1,182 @@
+import re
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+from pydantic import BaseModel, ValidationError
+
+logger = logging.getLogger(__name__)
+
+# Keys of the OpenAPI subset accepted as a Gemini response schema
+SCHEMA_KEYS = ("type", "format", "description", "nullable", "enum", "items", "properties", "required")
+
+def response_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Gemini response schema for a JSON array of `model` objects."""
+    definition = model.model_json_schema()
+
+    def convert(node: Dict[str, Any]) -> Dict[str, Any]:
+        if "$ref" in node:
+            node = definition["$defs"][node["$ref"].split("/")[-1]]
+        nullable = False
+        if "anyOf" in node:
+            # Optional[X] is the only union the API understands
+            options = [o for o in node["anyOf"] if o.get("type") != "null"]
+            nullable = len(options) < len(node["anyOf"])
+            node = {**node, **options[0]}
+        schema = {k: v for k, v in node.items() if k in SCHEMA_KEYS}
+        if "const" in node:
+            schema["enum"] = [node["const"]]
+        if "enum" in schema:
+            schema["type"] = "string"
+        if "properties" in schema:
+            schema["properties"] = {k: convert(v) for k, v in schema["properties"].items()}
+        if "items" in schema:
+            schema["items"] = convert(schema["items"])
+        if nullable:
+            schema["nullable"] = True
+        return schema
+
+    return {"type": "array", "items": convert(definition)}
+
+def loads_lenient(fragment: str) -> Any:
+    """json.loads, retried after fixing the slips LLMs commonly make in otherwise valid JSON."""
+    try:
+        return json.loads(fragment)
+    except json.JSONDecodeError:
+        pass
+    repaired = re.sub(r",\s*([}\]])", r"\1", fragment)                  # trailing commas
+    repaired = re.sub(r"\bNone\b", "null", repaired)                     # Python literals
+    repaired = re.sub(r"\bTrue\b", "true", re.sub(r"\bFalse\b", "false", repaired))
+    repaired = re.sub(r"(?<=[{,])\s*([A-Za-z_]\w*)\s*:", r'"\1":', repaired)  # unquoted keys
+    return json.loads(repaired)
+
+class JSONArrayStreamParser:
+    """
+    Incrementally parses a streamed JSON array, yielding each top-level element
+    as soon as it is complete. Text around the array (code fences, prose) is
+    ignored, an element that fails to parse is kept in `failed` without losing
+    its neighbours, and `close` salvages an element cut off by truncation.
+    """
+    def __init__(self):
+        self.failed: List[str] = []
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._ended = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._element_start: Optional[int] = None
+        self._closers: List[str] = []
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consumes the next piece of text and returns the elements it completed."""
+        self._buffer += chunk
+        completed = []
+        while self._pos < len(self._buffer) and not self._ended:
+            char = self._buffer[self._pos]
+            if not self._started:
+                if char == "[":
+                    self._started = True
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+                self._begin_element()
+            elif char in "{[":
+                self._begin_element()
+                self._depth += 1
+                self._closers.append("}" if char == "{" else "]")
+            elif char in "}]":
+                if self._depth == 0:
+                    # End of the top-level array
+                    self._emit(self._pos, completed)
+                    self._ended = True
+                else:
+                    self._depth -= 1
+                    self._closers.pop()
+                    if self._depth == 0:
+                        self._emit(self._pos + 1, completed)
+            elif char == "," and self._depth == 0:
+                self._emit(self._pos, completed)
+            elif not char.isspace():
+                self._begin_element()
+            self._pos += 1
+        return completed
+
+    def close(self) -> List[Any]:
+        """Ends the stream; an unterminated last element is closed and parsed if possible."""
+        completed = []
+        if self._element_start is not None and not self._ended:
+            fragment = self._buffer[self._element_start:].rstrip().rstrip(",")
+            if self._in_string:
+                fragment += '"'
+            # Drop a dangling key or separator before closing the open containers
+            fragment = re.sub(r'(,\s*"[^"]*"\s*:?\s*|,\s*|:\s*)$', "", fragment)
+            fragment += "".join(reversed(self._closers))
+            try:
+                completed.append(loads_lenient(fragment))
+            except json.JSONDecodeError:
+                self.failed.append(self._buffer[self._element_start:])
+            self._element_start = None
+        self._ended = True
+        return completed
+
+    def _begin_element(self):
+        if self._depth == 0 and self._element_start is None:
+            self._element_start = self._pos
+
+    def _emit(self, end: int, completed: List[Any]):
+        if self._element_start is None:
+            return
+        fragment = self._buffer[self._element_start:end].strip()
+        self._element_start = None
+        if not fragment:
+            return
+        try:
+            completed.append(loads_lenient(fragment))
+        except json.JSONDecodeError:
+            self.failed.append(fragment)
+
+def parse_json_array(chunks: Iterable[str]) -> Tuple[List[Any], List[str]]:
+    """Parses a (possibly streamed) JSON array. Returns (elements, fragments that failed to parse)."""
+    parser = JSONArrayStreamParser()
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    items.extend(parser.close())
+    return items, parser.failed
+
+def validate_items(items: List[Any], model: Type[BaseModel]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Validates parsed elements against `model`. Returns (valid items, broken items);
+    a broken item carries the offending object and the fields that need repair.
+    """
+    valid, broken = [], []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            valid.append(model.model_validate(item).model_dump())
+        except ValidationError as e:
+            broken.append({
+                "item": item,
+                "errors": {".".join(str(p) for p in err["loc"]) or "item": err["msg"] for err in e.errors()}
+            })
+    return valid, broken
+
+def repair_prompt(broken: List[Dict[str, Any]], failed: List[str]) -> str:
+    """Prompt asking the model to fix only the listed objects, not to redo the whole extraction."""
+    entries = [{"object": b["item"], "invalid_fields": b["errors"]} for b in broken]
+    entries += [{"malformed_json": fragment[:2000]} for fragment in failed]
+    return f"""
+        The following JSON objects failed validation. Correct only the listed fields
+        (or re-encode the malformed JSON), keeping every other value unchanged.
+        Return a JSON list with one corrected object per entry, in the same order.
+
+        {json.dumps(entries, indent=2, default=str)}
+        """
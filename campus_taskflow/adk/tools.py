@@ -1,20 +1,226 @@
+import os
+import copy
+import time
+import asyncio
+import logging
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Type
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Type
 from pydantic import BaseModel
+from .cache import TTLCache
+from .core import get_process_pool, run_sync
+
+logger = logging.getLogger(__name__)
+
+# Offloaded and time-limited tool calls; separate from the sync bridge so a tool
+# invoked from a bridged agent never waits on a slot of its own pool
+_tool_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ADK_TOOL_THREADS", "8")),
+    thread_name_prefix="adk-tool"
+)
+
+class ToolTimeoutError(TimeoutError):
+    """Raised when a tool call exceeds its timeout."""
+
+# --- Result Caches ---
+# Memoized results of cacheable tools, one LRU per tool class shared by every
+# instance in the process: agents build their tools per request, so a
+# per-instance cache would never be hit twice
+_result_caches: Dict[Type["Tool"], TTLCache] = {}
+_result_caches_lock = threading.Lock()
+
+def freeze(value: Any) -> Any:
+    """Hashable form of tool arguments for memoization. Raises TypeError if there is none."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(v) for v in value)
+    hash(value)
+    return value
+
+_MISSING = object()
+
+def _run_started(on_start: Callable[[], Any], run: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+    # Signals when a queued call gets a worker, so its timeout excludes the time spent waiting for one
+    on_start()
+    return run(**kwargs)
+
+def _run_in_process(tool_class: Type["Tool"], kwargs: Dict[str, Any]) -> Any:
+    # Tools are rebuilt in the worker; instances hold caches and locks that do not pickle
+    return tool_class().run(**kwargs)
+
+@dataclass
+class ToolStats:
+    calls: int = 0
+    cache_hits: int = 0
+    timeouts: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
 
 class Tool(ABC):
-    """Base class for ADK tools."""
+    """
+    Base class for ADK tools.
+
+    `invoke`/`ainvoke` run a tool through the runtime: arguments are validated
+    against `args_schema`, results of pure tools are memoized in a process-wide
+    LRU per tool class, keyed by tool name and validated arguments (`cacheable`,
+    `cache_size`), calls are limited to `timeout` seconds of running, and
+    CPU-heavy tools can run on the tool thread pool or the shared process pool
+    (`offload` = "thread" or "process"). Every invocation is timed into `stats`.
+    """
+    cacheable: bool = False
+    cache_size: int = 256
+    timeout: Optional[float] = None
+    offload: Optional[str] = None
+    validate_inputs: bool = True
+
     def __init__(self, name: str, description: str, args_schema: Type[BaseModel] = None):
         self.name = name
         self.description = description
         self.args_schema = args_schema
+        self.stats = ToolStats()
+        self._results = self._result_cache() if self.cacheable else None
+        self._stats_lock = threading.Lock()
 
     @abstractmethod
     def run(self, **kwargs) -> Any:
         """Execute the tool."""
         pass
 
-    def validate_args(self, **kwargs):
-        if self.args_schema:
-            return self.args_schema(**kwargs)
-        return kwargs
+    async def arun(self, **kwargs) -> Any:
+        """Async counterpart of `run`. Synchronous tools run on the shared thread pool."""
+        return await run_sync(self.run, **kwargs)
+
+    def validate_args(self, **kwargs) -> Dict[str, Any]:
+        """Validates `kwargs` against `args_schema`; returns the (coerced) arguments that were passed."""
+        if not self.args_schema or not self.validate_inputs:
+            return kwargs
+        # pydantic compiles the schema's validator once per model class
+        validated = self.args_schema.model_validate(kwargs)
+        return {k: getattr(validated, k) for k in kwargs}
+
+    def invoke(self, **kwargs) -> Any:
+        """Runs the tool through the runtime (validation, memoization, timeout, offload)."""
+        started = time.perf_counter()
+        kwargs = self.validate_args(**kwargs)
+        key = self._cache_key(kwargs)
+        if key is not None:
+            hit = self._results.get(key, _MISSING)
+            if hit is not _MISSING:
+                self._record(started, cache_hit=True)
+                return copy.deepcopy(hit)
+
+        future, running = None, None
+        try:
+            if self.offload == "process":
+                future = get_process_pool().submit(_run_in_process, type(self), self._picklable(kwargs))
+            elif self.offload == "thread" or self.timeout is not None:
+                running = threading.Event()
+                future = _tool_executor.submit(_run_started, running.set, self.run, kwargs)
+            if future is None:
+                result = self.run(**kwargs)
+            else:
+                if running is not None:
+                    # The timeout limits the call itself, not its wait behind other calls for a pool thread
+                    running.wait()
+                result = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # A call still queued is dropped; a running worker cannot be interrupted,
+            # so its result is discarded when it finishes
+            future.cancel()
+            self._record(started, timed_out=True)
+            raise ToolTimeoutError(f"{self.name} exceeded its {self.timeout}s timeout")
+        except Exception:
+            self._record(started, failed=True)
+            raise
+
+        if key is not None:
+            self._results.set(key, copy.deepcopy(result))
+        self._record(started)
+        return result
+
+    async def ainvoke(self, **kwargs) -> Any:
+        """Async counterpart of `invoke`; offloaded work never blocks the event loop."""
+        started = time.perf_counter()
+        kwargs = self.validate_args(**kwargs)
+        key = self._cache_key(kwargs)
+        if key is not None:
+            hit = self._results.get(key, _MISSING)
+            if hit is not _MISSING:
+                self._record(started, cache_hit=True)
+                return copy.deepcopy(hit)
+
+        loop = asyncio.get_running_loop()
+        running = None
+        if self.offload == "process":
+            call = loop.run_in_executor(get_process_pool(), _run_in_process, type(self), self._picklable(kwargs))
+        elif self.offload == "thread":
+            running = asyncio.Event()
+            call = loop.run_in_executor(_tool_executor, _run_started,
+                                        lambda: loop.call_soon_threadsafe(running.set), self.run, kwargs)
+        else:
+            call = self.arun(**kwargs)
+        try:
+            if running is not None:
+                try:
+                    await running.wait()
+                except asyncio.CancelledError:
+                    call.cancel()
+                    raise
+            # On a timeout wait_for cancels the executor future, which drops a call that is still queued
+            result = await asyncio.wait_for(call, self.timeout)
+        except asyncio.TimeoutError:
+            self._record(started, timed_out=True)
+            raise ToolTimeoutError(f"{self.name} exceeded its {self.timeout}s timeout")
+        except Exception:
+            self._record(started, failed=True)
+            raise
+
+        if key is not None:
+            self._results.set(key, copy.deepcopy(result))
+        self._record(started)
+        return result
+
+    def clear_cache(self):
+        """Drops the memoized results of every instance of this tool class."""
+        if self._results is not None:
+            self._results.clear()
+
+    @classmethod
+    def _result_cache(cls) -> TTLCache:
+        cache = _result_caches.get(cls)
+        if cache is None:
+            with _result_caches_lock:
+                cache = _result_caches.setdefault(cls, TTLCache(maxsize=cls.cache_size, ttl=float("inf")))
+        return cache
+
+    def _cache_key(self, kwargs: Dict[str, Any]) -> Optional[Any]:
+        if self._results is None:
+            return None
+        try:
+            return self.name, freeze(kwargs)
+        except TypeError:
+            # Unhashable arguments are simply not memoized
+            return None
+
+    @staticmethod
+    def _picklable(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        # memoryviews cannot be pickled; the copy is what ships the buffer to the worker anyway
+        return {k: bytes(v) if isinstance(v, memoryview) else v for k, v in kwargs.items()}
+
+    def _record(self, started: float, cache_hit: bool = False, timed_out: bool = False, failed: bool = False):
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self.stats.calls += 1
+            self.stats.cache_hits += cache_hit
+            self.stats.timeouts += timed_out
+            self.stats.errors += failed
+            self.stats.total_seconds += elapsed
+            self.stats.max_seconds = max(self.stats.max_seconds, elapsed)
+        logger.debug(f"Tool {self.name} took {elapsed * 1000:.1f}ms"
+                     f"{' (cached)' if cache_hit else ''}{' (timed out)' if timed_out else ''}")
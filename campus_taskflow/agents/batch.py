@@ -0,0 +1,127 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional, Tuple
+from ..adk.core import Agent, State, get_process_pool, run_sync
+from ..tools.pdf_tools import PDFSource
+from .orchestrator import OrchestratorAgent
+from .pdf_extractor import extract_pdf
+
+# Stages that only depend on one document; run concurrently across the batch
+PER_DOCUMENT_AGENTS = ["TaskParsingAgent", "SummarizationAgent", "FlashcardAgent"]
+
+# Stages that run once over the merged results of every document
+COMBINED_AGENTS = ["SchedulerAgent", "ValidationAgent"]
+
+class BatchOrchestratorAgent(Agent):
+    """
+    Processes several PDFs (e.g. a semester's course documents) as one batch:
+    1. Artifact cache lookups and lineage loading per document
+    2. PDF extraction of every document in parallel on a process pool
+    3. RAG indexing with all documents' chunks in shared batched embedding requests
+    4. TaskParsingAgent, SummarizationAgent and FlashcardAgent concurrently per document
+    5. SchedulerAgent and ValidationAgent once over the combined task list
+
+    `input_data` is a list of (document State, PDF source) pairs; the combined
+    results are written to `state`.
+    """
+    def __init__(self, name: str = "BatchOrchestrator", orchestrator: Optional[OrchestratorAgent] = None,
+                 executor: Optional[Executor] = None):
+        super().__init__(
+            name=name,
+            description="Processes a batch of academic documents into one combined plan."
+        )
+        self.orchestrator = orchestrator or OrchestratorAgent()
+        self.executor = executor
+        self.stages = {agent.name: agent for agent in self.orchestrator.agents}
+
+    def run(self, state: State, input_data: List[Tuple[State, PDFSource]]) -> Dict[str, Any]:
+        return asyncio.run(self.arun(state, input_data))
+
+    async def arun(self, state: State, input_data: List[Tuple[State, PDFSource]]) -> Dict[str, Any]:
+        documents = input_data
+        for doc_state, source in documents:
+            await run_sync(self.orchestrator.plan, doc_state, source)
+        pending = [(s, src) for s, src in documents if not s.get("cache_hit")]
+        # Cached documents whose vectors are missing are extracted again, only to be indexed
+        unindexed = [(s, src) for s, src in documents if s.get("needs_index")]
+        self.logger.info(f"Batch of {len(documents)} documents, {len(pending)} not cached")
+
+        await self.extract_all(pending + unindexed)
+        await run_sync(self.index_all, [s for s, _ in pending + unindexed])
+        await asyncio.gather(*(
+            self.orchestrator.arun_agents(
+                doc_state,
+                [self.stages[name] for name in PER_DOCUMENT_AGENTS],
+                doc_state.get("extracted_content")
+            )
+            for doc_state, _ in pending
+        ))
+        for doc_state, _ in pending:
+            await run_sync(self.orchestrator.finish, doc_state)
+
+        self.merge(state, [s for s, _ in documents])
+        return await self.orchestrator.arun_agents(
+            state,
+            [self.stages[name] for name in COMBINED_AGENTS],
+            state.get("parsed_tasks")
+        )
+
+    async def extract_all(self, documents: List[Tuple[State, PDFSource]]):
+        loop = asyncio.get_running_loop()
+        executor = self.executor or get_process_pool()
+        extractor = self.stages["PDFExtractionAgent"]
+        # memoryviews cannot be pickled; the copy is what ships the PDF to the worker anyway
+        results = await asyncio.gather(*(
+            loop.run_in_executor(
+                executor, extract_pdf,
+                source if isinstance(source, str) else bytes(source),
+                extractor.known_pages(doc_state)
+            )
+            for doc_state, source in documents
+        ))
+        for (doc_state, source), result in zip(documents, results):
+            extractor.record_extraction(doc_state, result)
+            extractor.log_execution(doc_state, source, result)
+
+    def index_all(self, doc_states: List[State]):
+        extractor = self.stages["PDFExtractionAgent"]
+        try:
+            from ..tools.search_tools import EmbeddingSearchTool
+            rag_tool = EmbeddingSearchTool()
+            chunks = []
+            for doc_state in doc_states:
+                chunks.extend(extractor.chunks_to_index(doc_state, rag_tool, doc_state.get("extracted_content")))
+            rag_tool.embed_and_store(chunks)
+        except Exception as e:
+            self.logger.warning(f"Failed to index batch for RAG: {e}")
+            for doc_state in doc_states:
+                doc_state.set("rag_error", str(e))
+
+    def merge(self, state: State, doc_states: List[State]):
+        """Combines per-document results; tasks and flashcards are tagged with their course file."""
+        tasks, flashcards, documents, summaries = [], [], [], []
+        for doc_state in doc_states:
+            filename = doc_state.get("filename", "document.pdf")
+            doc_tasks = doc_state.get("parsed_tasks") or []
+            doc_flashcards = doc_state.get("flashcards") or []
+            summary = doc_state.get("summary") or {}
+            tasks.extend({**task, "course": filename} for task in doc_tasks)
+            flashcards.extend({**card, "tags": card.get("tags", []) + [filename]} for card in doc_flashcards)
+            summaries.append(f"{filename}:\n{summary.get('summary', '')}")
+            documents.append({
+                "filename": filename,
+                "document_id": doc_state.get("document_id"),
+                "cached": doc_state.get("cache_hit", False),
+                "summary": summary,
+                "tasks": doc_tasks,
+                "flashcards": doc_flashcards
+            })
+
+        state.set("documents", documents)
+        state.set("document_ids", [d["document_id"] for d in documents])
+        state.set("parsed_tasks", tasks)
+        state.set("flashcards", flashcards)
+        state.set("summary", {
+            "summary": "\n\n".join(summaries),
+            "key_points": [point for d in documents for point in d["summary"].get("key_points", [])]
+        })
@@ -1,31 +1,184 @@
-from typing import Any, List, Dict
-from ..adk.core import Agent, State
+import os
+import re
+import json
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Dict, Optional, Tuple
+import numpy as np
+from ..adk.core import Agent, State, run_sync
 from ..adk.skills import LLMSkill
 from ..tools.study_tools import FlashcardFormatterTool
 
+# Characters of source text per section prompt (LLMSkill truncates beyond 10,000)
+SECTION_CHARS = 10000
+# Sections sent to the LLM at most; longer documents are sampled evenly
+MAX_SECTIONS = 30
+# One card per this many characters, clamped to [MIN_CARDS, MAX_CARDS]
+CHARS_PER_CARD = 2000
+MIN_CARDS = 5
+MAX_CARDS = 100
+# Candidates kept for deduplication per card in the budget; bounds the similarity matrix
+CANDIDATES_PER_CARD = 4
+# Cards at least this similar to an earlier card are dropped
+DUPLICATE_THRESHOLD = 0.9
+
+def split_sections(pages: List[str], section_chars: int = SECTION_CHARS) -> List[str]:
+    """Groups consecutive pages into sections of at most `section_chars` characters."""
+    sections, current = [], ""
+    for text in pages:
+        while len(text) > section_chars:
+            # A single oversized page is split on its own
+            if current:
+                sections.append(current)
+                current = ""
+            sections.append(text[:section_chars])
+            text = text[section_chars:]
+        if current and len(current) + len(text) > section_chars:
+            sections.append(current)
+            current = ""
+        current += text
+    if current.strip():
+        sections.append(current)
+    return [s for s in sections if s.strip()]
+
+def card_budget(total_chars: int) -> int:
+    return max(MIN_CARDS, min(MAX_CARDS, total_chars // CHARS_PER_CARD))
+
+def lexical_vectors(texts: List[str], dim: int = 512) -> np.ndarray:
+    """Hashed bag-of-words vectors, used when embeddings are unavailable."""
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for i, text in enumerate(texts):
+        for token in re.findall(r"\w+", text.lower()):
+            vectors[i, int(hashlib.md5(token.encode("utf-8")).hexdigest()[:8], 16) % dim] += 1
+    return vectors
+
+def deduplicate(vectors: np.ndarray, threshold: float = DUPLICATE_THRESHOLD) -> List[int]:
+    """
+    Indices of rows to keep, in order, dropping any row whose cosine similarity to an
+    already kept row reaches `threshold`. The similarity matrix is one matrix product.
+    """
+    if len(vectors) == 0:
+        return []
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    unit = vectors / norms
+    similarity = unit @ unit.T
+
+    kept = np.zeros(len(vectors), dtype=bool)
+    for i in range(len(vectors)):
+        kept[i] = not np.any(similarity[i, :i][kept[:i]] >= threshold)
+    return np.flatnonzero(kept).tolist()
+
 class FlashcardAgent(Agent):
-    def __init__(self):
+    def __init__(self, max_concurrency: Optional[int] = None):
         super().__init__(
             name="FlashcardAgent",
             description="Generates study flashcards.",
             tools=[FlashcardFormatterTool()]
         )
         self.llm_skill = LLMSkill()
+        # None reads FLASHCARD_CONCURRENCY on every run
+        self.max_concurrency = max_concurrency
+
+    def concurrency(self) -> int:
+        return self.max_concurrency or int(os.getenv("FLASHCARD_CONCURRENCY", "4"))
 
     def run(self, state: State, input_data: Any) -> List[Dict[str, str]]:
+        sections, budget = self.plan_sections(state)
+        if not self.llm_skill.model or not sections:
+            return self.store_cards(self.heuristic_cards(sections), budget, state)
+
+        # One LLM call per section, at most `concurrency()` in flight
+        with ThreadPoolExecutor(max_workers=self.concurrency()) as pool:
+            responses = list(pool.map(lambda job: self.llm_skill.generate_flashcards(*job), sections))
+        return self.store_cards(self.collect_cards(responses, sections, state), budget, state)
+
+    async def arun(self, state: State, input_data: Any) -> List[Dict[str, str]]:
+        sections, budget = self.plan_sections(state)
+        if not self.llm_skill.model or not sections:
+            return self.store_cards(self.heuristic_cards(sections), budget, state)
+
+        semaphore = asyncio.Semaphore(self.concurrency())
+        async def generate(text: str, count: int) -> str:
+            async with semaphore:
+                return await self.llm_skill.agenerate_flashcards(text, count)
+
+        responses = await asyncio.gather(*(generate(text, count) for text, count in sections))
+        raw_qa = self.collect_cards(responses, sections, state)
+        # Deduplication embeds the cards, which blocks
+        return await run_sync(self.store_cards, raw_qa, budget, state)
+
+    def plan_sections(self, state: State) -> Tuple[List[Tuple[str, int]], int]:
+        """Splits the document into sections and shares the card budget across them by length."""
         extracted_content = state.get("extracted_content", {})
-        full_text = extracted_content.get("full_text", "")
-        
-        # Generate raw Q/A using LLM Skill
-        # In a real app, we'd parse the LLM output. 
-        # Here we simulate the output structure.
-        raw_qa = [
-            {"question": "What is the capital of France?", "answer": "Paris"},
-            {"question": "What is 2+2?", "answer": "4"}
-        ]
-        
+        pages = [p["text"] for p in extracted_content.get("pages", [])] or [extracted_content.get("full_text", "")]
+        sections = split_sections(pages)
+        total_chars = sum(len(s) for s in sections)
+        budget = card_budget(total_chars)
+
+        if len(sections) > MAX_SECTIONS:
+            # Keep cost bounded on very long course packs by sampling evenly
+            picks = np.linspace(0, len(sections) - 1, MAX_SECTIONS).round().astype(int)
+            sections = [sections[i] for i in dict.fromkeys(picks.tolist())]
+
+        sampled_chars = sum(len(s) for s in sections) or 1
+        # Ask for slightly more than the budget so deduplication has room
+        jobs = [(s, max(1, round(1.2 * budget * len(s) / sampled_chars))) for s in sections]
+        return jobs, budget
+
+    def collect_cards(self, responses: List[str], sections: List[Tuple[str, int]], state: State) -> List[Dict[str, str]]:
+        """Cards parsed from every section's response; the heuristic cards when no section produced any."""
+        raw_qa = [qa for response in responses for qa in self.parse_cards(response)]
+        if not raw_qa:
+            # Every section failed (LLM errors or unparseable output); the run is marked so it is not cached
+            errors = [r for r in responses if r.startswith("[Error")]
+            self.logger.warning(f"No flashcards from {len(responses)} sections ({len(errors)} LLM errors), "
+                                f"using heuristic cards{': ' + errors[0] if errors else ''}")
+            self.mark_fallback(state)
+            raw_qa = self.heuristic_cards(sections)
+        return raw_qa
+
+    def parse_cards(self, response: str) -> List[Dict[str, str]]:
+        try:
+            cleaned_response = response.replace("```json", "").replace("```", "").strip()
+            cards = json.loads(cleaned_response)
+        except Exception as e:
+            self.logger.warning(f"Flashcard parsing failed: {e}")
+            return []
+        return [c for c in cards if isinstance(c, dict) and c.get("question") and c.get("answer")]
+
+    def heuristic_cards(self, sections: List[Tuple[str, int]]) -> List[Dict[str, str]]:
+        # Without an LLM, definition-style lines ("Term: meaning", "Term is meaning") become cards
+        pattern = re.compile(r"^\s*([A-Z][\w\s\-()]{1,60}?)\s*(?::|\s+is\s+|\s+are\s+)\s*(.{10,})$")
+        cards = []
+        for text, _ in sections:
+            for line in text.split("\n"):
+                match = pattern.match(line)
+                if match:
+                    term, definition = match.group(1).strip(), match.group(2).strip()
+                    cards.append({"question": f"What is {term}?", "answer": definition})
+        return cards
+
+    def card_vectors(self, texts: List[str]) -> np.ndarray:
+        if self.llm_skill.model:
+            try:
+                from ..tools.search_tools import EmbeddingSearchTool
+                return np.asarray(EmbeddingSearchTool().embed_texts(texts), dtype=np.float32)
+            except Exception as e:
+                self.logger.warning(f"Card embedding failed, deduplicating lexically: {e}")
+        return lexical_vectors(texts)
+
+    def store_cards(self, raw_qa: List[Dict[str, str]], budget: int, state: State) -> List[Dict[str, str]]:
+        limit = budget * CANDIDATES_PER_CARD
+        if len(raw_qa) > limit:
+            raw_qa = [raw_qa[i] for i in dict.fromkeys(np.linspace(0, len(raw_qa) - 1, limit).round().astype(int).tolist())]
+        if raw_qa:
+            vectors = self.card_vectors([f"{qa['question']} {qa['answer']}" for qa in raw_qa])
+            raw_qa = [raw_qa[i] for i in deduplicate(vectors)][:budget]
+
         formatter = self.tools[0]
-        flashcards = formatter.run(qa_pairs=raw_qa)
-        
+        flashcards = formatter.invoke(qa_pairs=[{"question": str(qa["question"]), "answer": str(qa["answer"])} for qa in raw_qa])
+
         state.set("flashcards", flashcards)
         return flashcards
@@ -1,5 +1,10 @@
-from typing import Any, List
-from ..adk.core import SequentialAgent, State, Agent
+import os
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from ..adk.core import SequentialAgent, State, Agent, run_sync
+from ..adk.memory import ArtifactStore, CheckpointStore, DocumentLineageStore
+from ..adk.skills import DEFAULT_MODEL_NAME
+from ..tools.search_tools import EmbeddingSearchTool, SimpleVectorStore
 from .pdf_extractor import PDFExtractionAgent
 from .task_parser import TaskParsingAgent
 from .summarizer import SummarizationAgent
@@ -7,6 +12,15 @@ from .flashcard import FlashcardAgent
 from .scheduler import SchedulerAgent
 from .validator import ValidationAgent
 
+# Bump whenever a change to the agents would alter their cached outputs
+PIPELINE_VERSION = "2"
+
+# State keys restored from the artifact cache on a hit
+CACHED_STATE_KEYS = ["document_id", "summary", "parsed_tasks", "flashcards"]
+
+# Agents whose output depends on the current date, re-run even on a cache hit
+DATE_RELATIVE_AGENTS = ["SchedulerAgent", "ValidationAgent"]
+
 class OrchestratorAgent(SequentialAgent):
     """
     Orchestrates the entire Campus TaskFlow pipeline.
@@ -17,8 +31,28 @@ class OrchestratorAgent(SequentialAgent):
     4. FlashcardAgent
     5. SchedulerAgent
     6. ValidationAgent
+
+    When the state carries a `content_hash` of the uploaded PDF, artifacts are
+    looked up by (content hash, pipeline version, model name) and only the
+    date-relative agents run on a hit. A hit whose document has no vectors for
+    this session gets a copy of another session's; only when no session has
+    any is the document extracted and indexed again. Runs in which an agent
+    fell back to its heuristic after an LLM failure are not cached.
+
+    When the state carries a `lineage_id`, the previous version of that document
+    is loaded so that only its changed pages are re-extracted, re-embedded and
+    re-parsed. Every version keeps its own content-hash `document_id`; once a
+    new version is saved (cache hits included), the session's vectors of the
+    version it replaced are deleted unless another of its lineages still uses them.
+
+    Every run gets a `job_id` and is checkpointed after each agent; a failed
+    job can be continued with `resume`/`aresume` from the stage that failed.
+    Checkpoints leave out the full text and the previous version's pages, which
+    resuming rebuilds or no longer needs.
     """
-    def __init__(self, name: str = "Orchestrator"):
+    def __init__(self, name: str = "Orchestrator", artifact_store: Optional[ArtifactStore] = None,
+                 lineage_store: Optional[DocumentLineageStore] = None,
+                 checkpoint_store: Optional[CheckpointStore] = None):
         # Initialize sub-agents
         # Note: These will be initialized with their specific tools and configurations
         agents = [
@@ -29,14 +63,160 @@ class OrchestratorAgent(SequentialAgent):
             SchedulerAgent(),
             ValidationAgent()
         ]
-        
+
         super().__init__(
             name=name,
             description="Orchestrates the academic workflow automation pipeline.",
-            agents=agents
+            agents=agents,
+            checkpoint_store=checkpoint_store or CheckpointStore()
         )
+        self.artifact_store = artifact_store or ArtifactStore()
+        self.lineage_store = lineage_store or DocumentLineageStore()
+
+    def cache_key(self, content_hash: str) -> str:
+        # Heuristic fallbacks (no API key) must not be served once a model is configured
+        model_name = DEFAULT_MODEL_NAME if os.getenv("GOOGLE_API_KEY") else "heuristic"
+        return ArtifactStore.make_key(content_hash, PIPELINE_VERSION, model_name)
 
     def run(self, state: State, input_data: Any) -> Any:
-        # The input_data is expected to be the path to the PDF file
-        state.set("pdf_path", input_data)
-        return super().run(state, input_data)
+        # The input_data is the path to the PDF file or its bytes
+        self.start_job(state)
+        agents, current_input = self.plan(state, input_data)
+        self.logger.info(f"Starting SequentialAgent: {self.name}")
+        result = self.run_agents(state, agents, current_input)
+        self.finish(state)
+        return result
+
+    async def arun(self, state: State, input_data: Any) -> Any:
+        self.start_job(state)
+        # Planning and finishing read and write the artifact, lineage and vector stores
+        agents, current_input = await run_sync(self.plan, state, input_data)
+        self.logger.info(f"Starting SequentialAgent: {self.name}")
+        result = await self.arun_agents(state, agents, current_input)
+        await run_sync(self.finish, state)
+        return result
+
+    def resume(self, job_id: str) -> Tuple[State, Any]:
+        state, result = super().resume(job_id)
+        self.finish(state)
+        return state, result
+
+    async def aresume(self, job_id: str) -> Tuple[State, Any]:
+        state, result = await super().aresume(job_id)
+        await run_sync(self.finish, state)
+        return state, result
+
+    def checkpoint_state(self, state: State) -> Dict[str, Any]:
+        # The full text is the pages joined, and the previous version's pages only serve extraction,
+        # which every resumable checkpoint has already completed
+        record = super().checkpoint_state(state)
+        data = record["data"]
+        if data.get("extracted_content"):
+            data["extracted_content"] = {k: v for k, v in data["extracted_content"].items() if k != "full_text"}
+        if data.get("lineage"):
+            data["lineage"] = {k: v for k, v in data["lineage"].items() if k != "pages"}
+        return record
+
+    def restore_state(self, record: Dict[str, Any]) -> State:
+        state = super().restore_state(record)
+        extracted = state.get("extracted_content")
+        if extracted and "full_text" not in extracted:
+            extracted["full_text"] = "".join(p["text"] + "\n" for p in extracted.get("pages", []))
+        return state
+
+    def start_job(self, state: State):
+        # Only whole-pipeline runs are checkpointed; batches drive the stages themselves
+        if not state.get("job_id"):
+            state.set("job_id", str(uuid.uuid4()))
+
+    def plan(self, state: State, input_data: Any) -> Tuple[List[Agent], Any]:
+        """Restores cached artifacts or lineage into `state` and picks the agents to run."""
+        if isinstance(input_data, str):
+            state.set("pdf_path", input_data)
+
+        content_hash = state.get("content_hash")
+        artifacts = self.artifact_store.get(self.cache_key(content_hash)) if content_hash else None
+        if artifacts is not None:
+            self.logger.info(f"Artifact cache hit for {content_hash}")
+            for k in CACHED_STATE_KEYS:
+                state.set(k, artifacts.get(k))
+            state.set("cache_hit", True)
+            # Lets `finish` advance the lineage without extracting the pages again
+            state.set("cached_pages", artifacts.get("pages", []))
+            self.load_lineage(state)
+            agents = [a for a in self.agents if a.name in DATE_RELATIVE_AGENTS]
+            if self.needs_index(state):
+                # Indexing failed when the artifacts were cached; extraction indexes it again
+                state.set("needs_index", True)
+                return [self.agents[0]] + agents, input_data
+            return agents, state.get("parsed_tasks")
+
+        self.load_lineage(state)
+        return self.agents, input_data
+
+    def load_lineage(self, state: State):
+        lineage_id = state.get("lineage_id")
+        if lineage_id:
+            state.set("lineage", self.lineage_store.load(lineage_id))
+
+    def needs_index(self, state: State) -> bool:
+        """Whether a cache hit's document still lacks vectors for this session after copying another session's."""
+        document_id = state.get("document_id")
+        if not document_id or SimpleVectorStore.shared().has_document(document_id, state.session_id):
+            return False
+        # The same PDF uploaded in another session: copying its rows is far cheaper than extracting again
+        copied = EmbeddingSearchTool().copy_rows(
+            lambda m: m.get("document_id") == document_id,
+            lambda m: {**m, "owner": state.session_id, "source": state.get("filename") or m.get("source")}
+        )
+        # Without an API key the document could not be embedded anyway
+        return not copied and bool(os.getenv("GOOGLE_API_KEY"))
+
+    def finish(self, state: State):
+        """Persists lineage and artifacts of a full pipeline run."""
+        # A completed job has nothing left to resume
+        if state.get("job_id"):
+            self.checkpoint_store.delete(state.get("job_id"))
+        # Degraded results must not be kept, so the LLM is retried next time
+        if state.get("fallback_agents"):
+            return
+        if state.get("lineage_id"):
+            self.save_lineage(state)
+        # Cached results are already stored
+        if state.get("cache_hit"):
+            return
+
+        content_hash = state.get("content_hash")
+        if content_hash:
+            artifacts = {k: state.get(k) for k in CACHED_STATE_KEYS}
+            artifacts["pages"] = self.lineage_pages(state)
+            self.artifact_store.put(self.cache_key(content_hash), artifacts)
+
+    def lineage_pages(self, state: State) -> List[Dict[str, Any]]:
+        pages = state.get("extracted_content", {}).get("pages") or state.get("cached_pages") or []
+        return [{"page_hash": p["page_hash"], "text": p["text"]} for p in pages]
+
+    def save_lineage(self, state: State):
+        """Records this run as the lineage's latest version and drops the vectors of the one it replaced."""
+        lineage_id, owner = state.get("lineage_id"), state.session_id
+        previous = state.get("lineage") or {}
+        document_id = state.get("document_id")
+        if previous.get("document_id") == document_id:
+            # The same version uploaded again
+            return
+        self.lineage_store.save(lineage_id, {
+            "lineage_id": lineage_id,
+            "owner": owner,
+            "version": previous.get("version", 0) + 1,
+            "content_hash": state.get("content_hash"),
+            "document_id": document_id,
+            "pages": self.lineage_pages(state),
+            "tasks": state.get("parsed_tasks", []),
+            "summary": state.get("summary")
+        })
+
+        superseded = previous.get("document_id")
+        if superseded and superseded not in self.lineage_store.heads(owner).values():
+            # Unchanged pages were copied under the new version, so these rows are no longer needed
+            SimpleVectorStore.shared().delete(
+                lambda m: m.get("document_id") == superseded and m.get("owner") == owner)
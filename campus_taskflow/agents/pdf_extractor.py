@@ -1,6 +1,13 @@
-from typing import Any, Dict
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
 from ..adk.core import Agent, State
-from ..tools.pdf_tools import PDFReaderTool, OCRTool
+from ..tools.pdf_tools import PDFReaderTool, OCRTool, PDFSource
+
+def extract_pdf(source: PDFSource, known_pages: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Runs PDFReaderTool on a path or buffer. Module-level so it can run in a process pool."""
+    if isinstance(source, str):
+        return PDFReaderTool().run(file_path=source, known_pages=known_pages)
+    return PDFReaderTool().run(data=source, known_pages=known_pages)
 
 class PDFExtractionAgent(Agent):
     def __init__(self):
@@ -11,24 +18,67 @@ class PDFExtractionAgent(Agent):
         )
 
     def run(self, state: State, input_data: Any) -> Dict[str, Any]:
-        # input_data is expected to be the pdf_path
-        pdf_path = input_data
-        self.logger.info(f"Extracting content from {pdf_path}")
-        
+        # input_data is the pdf_path, or the PDF's bytes when the upload fit in memory
+        in_memory = not isinstance(input_data, str)
+        if in_memory:
+            self.logger.info(f"Extracting content from {memoryview(input_data).nbytes} in-memory bytes")
+        else:
+            self.logger.info(f"Extracting content from {input_data}")
+
         pdf_tool = self.tools[0] # PDFReaderTool
-        result = pdf_tool.run(file_path=pdf_path)
-        
-        # Store extracted content in state/memory
-        state.set("extracted_content", result)
-        
+        known_pages = self.known_pages(state)
+        if in_memory:
+            result = pdf_tool.invoke(data=input_data, known_pages=known_pages)
+        else:
+            result = pdf_tool.invoke(file_path=input_data, known_pages=known_pages)
+
+        self.record_extraction(state, result)
+
         # Index content for RAG
         try:
             from ..tools.search_tools import EmbeddingSearchTool
             rag_tool = EmbeddingSearchTool()
-            rag_tool.index_document(result["full_text"], {"source": pdf_path})
+            rag_tool.embed_and_store(self.chunks_to_index(state, rag_tool, result))
         except Exception as e:
             self.logger.warning(f"Failed to index document for RAG: {e}")
             # Do not fail the pipeline, just log the error
             state.set("rag_error", str(e))
-        
+
         return result
+
+    def known_pages(self, state: State) -> Dict[str, str]:
+        # Pages seen in the previous version of this document keep their extracted text
+        previous = state.get("lineage") or {}
+        return {p["page_hash"]: p["text"] for p in previous.get("pages", [])}
+
+    def record_extraction(self, state: State, result: Dict[str, Any]):
+        """Stores extracted content, the document id and (for lineages) the page diff in state."""
+        state.set("extracted_content", result)
+        if state.get("lineage_id"):
+            state.set("page_diff", self.diff_pages(state.get("lineage") or {}, result["pages"]))
+        # Stable identifier for the document's content, independent of where it was uploaded to.
+        # Each version of a lineage gets its own id, so no upload can rewrite another's vectors.
+        state.set("document_id", hashlib.sha256(result["full_text"].encode("utf-8")).hexdigest())
+
+    def chunks_to_index(self, state: State, rag_tool: Any, result: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Chunks of this document that still need embedding, with their metadata."""
+        # The upload's filename, not the temporary path it was spooled to
+        # Vectors belong to the uploading session; chat only searches its own copies
+        metadata = {"source": state.get("filename", state.get("pdf_path", "upload")),
+                    "document_id": state.get("document_id"), "owner": state.session_id}
+        if state.get("lineage_id"):
+            previous_document_id = (state.get("lineage") or {}).get("document_id")
+            return rag_tool.page_chunks(result["pages"], metadata, previous_document_id)
+        return rag_tool.document_chunks(result["full_text"], metadata)
+
+    def diff_pages(self, previous: Dict[str, Any], pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Compares page hashes against the previous version of the document."""
+        previous_hashes = [p["page_hash"] for p in previous.get("pages", [])]
+        current_hashes = [p["page_hash"] for p in pages]
+        old, new = set(previous_hashes), set(current_hashes)
+        return {
+            "previous_version": previous.get("version"),
+            "added": [h for h in dict.fromkeys(current_hashes) if h not in old],
+            "removed": [h for h in dict.fromkeys(previous_hashes) if h not in new],
+            "unchanged": [h for h in dict.fromkeys(current_hashes) if h in old]
+        }
@@ -1,9 +1,21 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field, field_validator
 from ..adk.core import Agent, State
 from ..adk.skills import LLMSkill
 from datetime import datetime, timedelta
 import json
 
+class ScheduleItem(BaseModel):
+    date: str = Field(..., description="YYYY-MM-DD")
+    task: str = Field(..., min_length=1, description="Description of the study activity")
+    duration_minutes: int = Field(..., gt=0, description="Duration in minutes")
+
+    @field_validator("date")
+    @classmethod
+    def check_date(cls, value: str) -> str:
+        datetime.strptime(value, "%Y-%m-%d")
+        return value
+
 class SchedulerAgent(Agent):
     def __init__(self):
         super().__init__(
@@ -21,10 +33,17 @@ class SchedulerAgent(Agent):
         else:
             return self.generate_schedule_heuristic(tasks, state)
 
-    def generate_schedule_with_llm(self, tasks: List[Dict], state: State) -> List[Dict[str, Any]]:
+    async def arun(self, state: State, input_data: Any) -> List[Dict[str, Any]]:
+        tasks = state.get("parsed_tasks", [])
+        if not self.llm.model:
+            return self.generate_schedule_heuristic(tasks, state)
+        schedule = await self.llm.agenerate_structured(self.schedule_prompt(tasks), ScheduleItem)
+        return self.store_llm_schedule(schedule, tasks, state)
+
+    def schedule_prompt(self, tasks: List[Dict]) -> str:
         start_date = datetime.now().strftime("%Y-%m-%d")
         
-        prompt = f"""
+        return f"""
         You are an expert academic scheduler. Create a realistic day-wise study schedule for the next 7 days based on the following tasks.
         
         Tasks:
@@ -38,23 +57,23 @@ class SchedulerAgent(Agent):
         - Break down large tasks (high estimated_hours) across multiple days.
         - Include "Review" sessions.
         
-        Return the output strictly as a JSON list of objects. Each object must have:
+        Return a JSON list of objects. Each object must have:
         - "date": YYYY-MM-DD
         - "task": Description of the study activity
         - "duration_minutes": Duration (integer)
-        
-        Do not include markdown formatting like ```json.
         """
-        
-        try:
-            response = self.llm.execute(prompt)
-            cleaned_response = response.replace("```json", "").replace("```", "").strip()
-            schedule = json.loads(cleaned_response)
-            state.set("schedule", schedule)
-            return schedule
-        except Exception as e:
-            print(f"LLM Scheduling failed: {e}")
+
+    def generate_schedule_with_llm(self, tasks: List[Dict], state: State) -> List[Dict[str, Any]]:
+        schedule = self.llm.generate_structured(self.schedule_prompt(tasks), ScheduleItem)
+        return self.store_llm_schedule(schedule, tasks, state)
+
+    def store_llm_schedule(self, schedule: Optional[List[Dict[str, Any]]], tasks: List[Dict], state: State) -> List[Dict[str, Any]]:
+        # An empty schedule is as unusable as a failed call
+        if not schedule:
+            print("LLM Scheduling failed, using heuristic")
             return self.generate_schedule_heuristic(tasks, state)
+        state.set("schedule", schedule)
+        return schedule
 
     def generate_schedule_heuristic(self, tasks: List[Dict], state: State) -> List[Dict[str, Any]]:
         # Simple scheduling logic: distribute tasks over the next 5 days
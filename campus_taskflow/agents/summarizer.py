@@ -1,4 +1,4 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from ..adk.core import Agent, State
 from ..adk.skills import LLMSkill
 
@@ -14,11 +14,36 @@ class SummarizationAgent(Agent):
     def run(self, state: State, input_data: Any) -> Dict[str, Any]:
         # input_data is the list of tasks from TaskParsingAgent, 
         # but we actually need the extracted text from state
-        extracted_content = state.get("extracted_content", {})
-        full_text = extracted_content.get("full_text", "")
-        
+        previous_summary = self.reusable_summary(state)
+        if previous_summary:
+            state.set("summary", previous_summary)
+            return previous_summary
+
+        full_text = state.get("extracted_content", {}).get("full_text", "")
         summary = self.llm_skill.summarize(full_text)
-        
+        return self.store_summary(summary, state)
+
+    async def arun(self, state: State, input_data: Any) -> Dict[str, Any]:
+        previous_summary = self.reusable_summary(state)
+        if previous_summary:
+            state.set("summary", previous_summary)
+            return previous_summary
+
+        full_text = state.get("extracted_content", {}).get("full_text", "")
+        summary = await self.llm_skill.asummarize(full_text)
+        return self.store_summary(summary, state)
+
+    def reusable_summary(self, state: State) -> Optional[Dict[str, Any]]:
+        # A revision that only reorders pages keeps the previous summary
+        page_diff = state.get("page_diff")
+        previous_summary = (state.get("lineage") or {}).get("summary")
+        if page_diff and previous_summary and not page_diff["added"] and not page_diff["removed"]:
+            return previous_summary
+        return None
+
+    def store_summary(self, summary: str, state: State) -> Dict[str, Any]:
+        if summary.startswith("[Error calling"):
+            self.mark_fallback(state)
         result = {
             "summary": summary,
             "key_points": ["Point 1", "Point 2"] # Mocked for now
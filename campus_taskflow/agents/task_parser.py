@@ -1,8 +1,55 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Literal, Optional
+from datetime import datetime
+from pydantic import BaseModel, Field, field_validator
 from ..adk.core import Agent, State
 from ..adk.skills import LLMSkill
-import json
-import re
+
+class TaskItem(BaseModel):
+    description: str = Field(..., min_length=1, description="The task description.")
+    deadline: Optional[str] = Field(None, description="The due date (YYYY-MM-DD) if found, else null.")
+    priority: Literal["High", "Medium", "Low"] = Field("Medium", description="Importance/urgency.")
+    estimated_hours: int = Field(2, ge=0, description="Estimated hours to complete.")
+
+    @field_validator("priority", mode="before")
+    @classmethod
+    def normalize_priority(cls, value: Any) -> Any:
+        # "high" and "HIGH" are fixed locally rather than sent back for repair
+        return value.strip().capitalize() if isinstance(value, str) else value
+
+    @field_validator("deadline")
+    @classmethod
+    def check_deadline(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None:
+            datetime.strptime(value, "%Y-%m-%d")
+        return value
+
+class PageTaskItem(TaskItem):
+    page: Optional[int] = Field(None, description="The page number the task appears on.")
+
+# Page text sent per structured call; longer page sets are parsed in several calls
+PAGE_BATCH_CHARS = 15000
+
+def page_batches(pages: List[Dict[str, Any]], limit: int = PAGE_BATCH_CHARS) -> List[List[Dict[str, Any]]]:
+    """
+    Groups pages, in order, into batches whose formatted text fits in `limit`
+    characters. A page too long for one batch is split into parts that keep its
+    page number and hash.
+    """
+    batches, batch, size = [], [], 0
+    for page in pages:
+        header = f"--- Page {page['page_number']} ---\n"
+        room = limit - len(header) - 1
+        parts = [page["text"][i:i + room] for i in range(0, len(page["text"]), room)] or [""]
+        for part in parts:
+            length = len(header) + len(part) + 1
+            if batch and size + length > limit:
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append({**page, "text": part})
+            size += length
+    if batch:
+        batches.append(batch)
+    return batches
 
 class TaskParsingAgent(Agent):
     def __init__(self):
@@ -17,38 +64,51 @@ class TaskParsingAgent(Agent):
         # input_data is the result from PDFExtractionAgent
         extracted_content = input_data
         full_text = extracted_content.get("full_text", "")
+
+        # Revised documents only have their added pages parsed
+        page_diff = state.get("page_diff")
+        if page_diff is not None:
+            return self.extract_tasks_incremental(extracted_content.get("pages", []), page_diff, state)
         
         if self.llm.model:
             return self.extract_tasks_with_llm(full_text, state)
         else:
             return self.extract_tasks_heuristic(full_text, state)
 
-    def extract_tasks_with_llm(self, text: str, state: State) -> List[Dict[str, Any]]:
-        prompt = f"""
+    async def arun(self, state: State, input_data: Any) -> List[Dict[str, Any]]:
+        # Only the whole-document LLM call is natively async; other paths use the thread-pool shim
+        if state.get("page_diff") is not None or not self.llm.model:
+            return await super().arun(state, input_data)
+        full_text = input_data.get("full_text", "")
+        tasks = await self.llm.agenerate_structured(self.task_prompt(full_text), TaskItem)
+        return self.store_llm_tasks(tasks, full_text, state)
+
+    def task_prompt(self, text: str) -> str:
+        return f"""
         You are an expert academic planner. Extract all actionable tasks, assignments, exams, and study goals from the following text.
         
-        Return the output strictly as a JSON list of objects. Each object must have:
+        Return a JSON list of objects. Each object must have:
         - "description": The task description.
         - "deadline": The due date (YYYY-MM-DD) if found, else null.
         - "priority": "High", "Medium", or "Low" based on importance/urgency.
         - "estimated_hours": Estimated hours to complete (integer).
         
-        Do not include markdown formatting like ```json.
-        
         Text:
         {text[:15000]}
         """
-        
-        try:
-            response = self.llm.execute(prompt)
-            # Clean up response if it contains markdown
-            cleaned_response = response.replace("```json", "").replace("```", "").strip()
-            tasks = json.loads(cleaned_response)
-            state.set("parsed_tasks", tasks)
-            return tasks
-        except Exception as e:
-            print(f"LLM Extraction failed: {e}")
+
+    def extract_tasks_with_llm(self, text: str, state: State) -> List[Dict[str, Any]]:
+        tasks = self.llm.generate_structured(self.task_prompt(text), TaskItem)
+        return self.store_llm_tasks(tasks, text, state)
+
+    def store_llm_tasks(self, tasks: Optional[List[Dict[str, Any]]], text: str, state: State) -> List[Dict[str, Any]]:
+        # Only a call that produced nothing usable falls back to the heuristic
+        if tasks is None:
+            print("LLM Extraction failed, using heuristic")
+            self.mark_fallback(state)
             return self.extract_tasks_heuristic(text, state)
+        state.set("parsed_tasks", tasks)
+        return tasks
 
     def extract_tasks_heuristic(self, text: str, state: State) -> List[Dict[str, Any]]:
         tasks = []
@@ -64,3 +124,73 @@ class TaskParsingAgent(Agent):
         
         state.set("parsed_tasks", tasks)
         return tasks
+
+    def extract_tasks_incremental(self, pages: List[Dict[str, Any]], page_diff: Dict[str, Any], state: State) -> List[Dict[str, Any]]:
+        """Keeps tasks from unchanged pages of the previous version and parses only added pages."""
+        page_numbers = {p["page_hash"]: p["page_number"] for p in pages}
+        unchanged = set(page_diff.get("unchanged", []))
+        added = set(page_diff.get("added", []))
+
+        previous_tasks = (state.get("lineage") or {}).get("tasks", [])
+        tasks = [
+            {**task, "page": page_numbers[task["page_hash"]]}
+            for task in previous_tasks
+            if task.get("page_hash") in unchanged
+        ]
+
+        added_pages = [p for p in pages if p["page_hash"] in added]
+        if added_pages:
+            if self.llm.model:
+                tasks += self.extract_page_tasks_with_llm(added_pages, state)
+            else:
+                tasks += self.extract_page_tasks_heuristic(added_pages)
+
+        tasks.sort(key=lambda t: t.get("page") or 0)
+        state.set("parsed_tasks", tasks)
+        return tasks
+
+    def extract_page_tasks_with_llm(self, pages: List[Dict[str, Any]], state: State) -> List[Dict[str, Any]]:
+        """One structured call per PAGE_BATCH_CHARS of pages, so no page is cut off."""
+        tasks = []
+        for batch in page_batches(pages):
+            tasks += self.extract_page_batch_with_llm(batch, state)
+        return tasks
+
+    def extract_page_batch_with_llm(self, pages: List[Dict[str, Any]], state: State) -> List[Dict[str, Any]]:
+        text = "\n".join(f"--- Page {p['page_number']} ---\n{p['text']}" for p in pages)
+        prompt = f"""
+        You are an expert academic planner. Extract all actionable tasks, assignments, exams, and study goals from the following pages.
+        
+        Return a JSON list of objects. Each object must have:
+        - "description": The task description.
+        - "deadline": The due date (YYYY-MM-DD) if found, else null.
+        - "priority": "High", "Medium", or "Low" based on importance/urgency.
+        - "estimated_hours": Estimated hours to complete (integer).
+        - "page": The page number the task appears on (integer).
+        
+        Pages:
+        {text}
+        """
+
+        tasks = self.llm.generate_structured(prompt, PageTaskItem)
+        if tasks is None:
+            print("LLM Extraction failed, using heuristic")
+            self.mark_fallback(state)
+            return self.extract_page_tasks_heuristic(pages)
+
+        page_hashes = {p["page_number"]: p["page_hash"] for p in pages}
+        for task in tasks:
+            # Tasks the model cannot place are attributed to the batch's first page
+            if task.get("page") not in page_hashes:
+                task["page"] = pages[0]["page_number"]
+            task["page_hash"] = page_hashes[task["page"]]
+        return tasks
+
+    def extract_page_tasks_heuristic(self, pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        tasks = []
+        for page in pages:
+            for task in self.extract_tasks_heuristic(page["text"], State()):
+                task["page"] = page["page_number"]
+                task["page_hash"] = page["page_hash"]
+                tasks.append(task)
+        return tasks
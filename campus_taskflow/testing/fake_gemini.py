@@ -0,0 +1,107 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional, Union
+
+class FakeGeminiServer:
+    """
+    Local stand-in for the Gemini REST API (generateContent,
+    streamGenerateContent, embedContent and batchEmbedContents).
+    Point the client at it with GEMINI_API_ENDPOINT=server.endpoint.
+
+    Responses are delayed by `latency` seconds; `throttle_first` requests and a
+    random `throttle_rate` fraction get 429, and `error_rate` get 503.
+    `response_text` may be a callable receiving the request body; streamed
+    responses split it into `stream_chunks` pieces.
+    """
+    def __init__(self, latency: float = 0.0, throttle_rate: float = 0.0, error_rate: float = 0.0,
+                 throttle_first: int = 0, response_text: Union[str, Callable[[dict], str]] = "OK",
+                 embedding_dim: int = 768, stream_chunks: int = 3, seed: Optional[int] = None):
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.throttle_first = throttle_first
+        self.response_text = response_text
+        self.embedding_dim = embedding_dim
+        self.stream_chunks = stream_chunks
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeGeminiServer":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                status, body = fake.respond(self.path, request)
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeGeminiServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def respond(self, path: str, request: Optional[dict] = None):
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+            if self.requests <= self.throttle_first or roll < self.throttle_rate:
+                self.throttled += 1
+                return 429, {"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}}
+            if roll < self.throttle_rate + self.error_rate:
+                self.errors += 1
+                return 503, {"error": {"code": 503, "message": "The service is unavailable", "status": "UNAVAILABLE"}}
+            # Seeded pseudo-embeddings so runs are reproducible
+            count = len((request or {}).get("requests", [])) if ":batchEmbedContents" in path else 1
+            vectors = [[self._random.uniform(-1, 1) for _ in range(self.embedding_dim)] for _ in range(count)]
+        time.sleep(self.latency)
+        if ":batchEmbedContents" in path:
+            return 200, {"embeddings": [{"values": v} for v in vectors]}
+        if ":embedContent" in path:
+            return 200, {"embedding": {"values": vectors[0]}}
+        text = self.response_text(request or {}) if callable(self.response_text) else self.response_text
+        if ":streamGenerateContent" in path:
+            # The REST transport reads a stream as a JSON array of partial responses
+            size = max(1, -(-len(text) // self.stream_chunks))
+            pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+            return 200, [self.candidate(piece) for piece in pieces]
+        return 200, self.candidate(text)
+
+    @staticmethod
+    def candidate(text: str) -> dict:
+        return {"candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0
+        }]}
@@ -0,0 +1,268 @@
+"""
+Concurrent load test for the HTTP API in main.py.
+
+Runs the app under uvicorn on a background thread, with Gemini and embeddings
+served by FakeGeminiServer, and drives /api/upload, /api/chat and
+/api/dashboard from `--users` concurrent virtual students:
+
+    python -m campus_taskflow.testing.loadtest --users 50 --iterations 2 \\
+        --latency 0.3 --error-rate 0.02 --save-baseline loadtest_baseline.json
+    python -m campus_taskflow.testing.loadtest --users 50 --iterations 2 \\
+        --latency 0.3 --error-rate 0.02 --baseline loadtest_baseline.json
+
+Reports p50/p95/p99 latency per endpoint, throughput, event-loop lag of the
+server's loop and peak RSS, and diffs them against a saved baseline.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import resource
+import threading
+from typing import Any, Dict, List, Optional
+
+import fitz
+import httpx
+import numpy as np
+import uvicorn
+
+from .fake_gemini import FakeGeminiServer
+
+ENDPOINTS = ["upload", "chat", "dashboard"]
+
+def fake_responder(request: dict) -> str:
+    """Plausible responses for each prompt the pipeline sends, so every stage does real work."""
+    prompt = json.dumps(request.get("contents", ""))
+    if "flashcards" in prompt:
+        return json.dumps([{"question": f"What is topic {i}?", "answer": f"Topic {i} is covered in week {i}."} for i in range(8)])
+    if "actionable tasks" in prompt:
+        return json.dumps([{"description": f"Assignment {i}", "deadline": None, "priority": "Medium", "estimated_hours": 2} for i in range(5)])
+    if "scheduler" in prompt:
+        today = time.strftime("%Y-%m-%d")
+        return json.dumps([{"date": today, "task": f"Study block {i}", "duration_minutes": 45} for i in range(7)])
+    return "This is a generated answer about the uploaded course material."
+
+def make_pdf(student: int, iteration: int, pages: int) -> bytes:
+    # Distinct text per upload so the artifact cache does not short-circuit the pipeline
+    doc = fitz.open()
+    for page in range(pages):
+        doc.new_page().insert_text((72, 72), f"Course {student}-{iteration} page {page}\nAssignment {page} due Friday\nExam review week {page}")
+    return doc.tobytes()
+
+class LagMonitor:
+    """Samples how late the event loop wakes up from a fixed sleep."""
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: List[float] = []
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - started - self.interval))
+
+class ServerThread(threading.Thread):
+    """Runs the FastAPI app under uvicorn on its own thread and loop, with a LagMonitor in that loop."""
+    def __init__(self, app: Any):
+        super().__init__(daemon=True)
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+        self.lag = LagMonitor()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def run(self):
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        monitor = asyncio.create_task(self.lag.run())
+        await self.server.serve()
+        monitor.cancel()
+
+    def start(self):
+        super().start()
+        while not self.server.started:
+            if not self.is_alive():
+                raise RuntimeError("API server failed to start")
+            time.sleep(0.01)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.join()
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "max": float(max(values))}
+
+async def virtual_student(client: httpx.AsyncClient, student: int, args: argparse.Namespace,
+                          latencies: Dict[str, List[float]], errors: Dict[str, int]):
+    async def timed(endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        latencies[endpoint].append(time.perf_counter() - started)
+        if response is None or response.status_code >= 400:
+            errors[endpoint] += 1
+        return response
+
+    session_id = None
+    for iteration in range(args.iterations):
+        pdf = make_pdf(student, iteration, args.pages)
+        data = {"session_id": session_id} if session_id else {}
+        response = await timed("upload", "POST", "/api/upload", files={"file": (f"course{student}.pdf", pdf, "application/pdf")}, data=data)
+        if response is not None and response.status_code == 200:
+            session_id = response.json()["session_id"]
+
+        # Dashboard polls and chat questions interleave the way a student would use the app
+        requests = ["chat"] * args.chats + ["dashboard"] * args.dashboards
+        random.shuffle(requests)
+        for endpoint in requests:
+            if endpoint == "chat":
+                question = random.choice(["When is the exam?", "What is due Friday?", "Summarize week 2"])
+                await timed("chat", "POST", "/api/chat", json={"message": question, "session_id": session_id})
+            else:
+                await timed("dashboard", "GET", "/api/dashboard")
+
+async def drive(base_url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    latencies: Dict[str, List[float]] = {e: [] for e in ENDPOINTS}
+    errors: Dict[str, int] = {e: 0 for e in ENDPOINTS}
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_student(client, i, args, latencies, errors) for i in range(args.users)))
+        elapsed = time.perf_counter() - started
+
+    total = sum(len(v) for v in latencies.values())
+    return {
+        "elapsed_s": elapsed,
+        "requests": total,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "endpoints": {
+            e: {"requests": len(latencies[e]), "errors": errors[e], **percentiles(latencies[e])}
+            for e in ENDPOINTS
+        }
+    }
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def run_load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    """Starts the fake Gemini server and the API, runs the workload and returns the report."""
+    with FakeGeminiServer(latency=args.latency, error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                          response_text=fake_responder, seed=args.seed) as fake, \
+            tempfile.TemporaryDirectory() as workdir:
+        previous_cwd = os.getcwd()
+        previous_env = {k: os.environ.get(k) for k in ("GOOGLE_API_KEY", "GEMINI_API_ENDPOINT")}
+        os.environ.update({"GOOGLE_API_KEY": "loadtest", "GEMINI_API_ENDPOINT": fake.endpoint})
+        # Vector, artifact and checkpoint stores are created relative to the working directory
+        os.chdir(workdir)
+        try:
+            import main
+            server = ServerThread(main.app)
+            server.start()
+            try:
+                report = asyncio.run(drive(server.url, args))
+            finally:
+                server.stop()
+        finally:
+            os.chdir(previous_cwd)
+            for k, v in previous_env.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+
+        report["event_loop_lag_s"] = percentiles(server.lag.samples)
+        report["peak_rss_mb"] = peak_rss_mb()
+        report["fake_gemini"] = {"requests": fake.requests, "throttled": fake.throttled, "errors": fake.errors}
+        report["config"] = {k: getattr(args, k) for k in ("users", "iterations", "chats", "dashboards", "pages",
+                                                          "latency", "error_rate", "throttle_rate")}
+    return report
+
+def flatten(report: Dict[str, Any]) -> Dict[str, float]:
+    """Metric name -> value for the numbers worth comparing across runs."""
+    metrics = {"throughput_rps": report["throughput_rps"], "peak_rss_mb": report["peak_rss_mb"]}
+    for name, stats in report["endpoints"].items():
+        for key in ("p50", "p95", "p99", "errors"):
+            metrics[f"{name}.{key}"] = stats[key]
+    for key in ("p50", "p99", "max"):
+        metrics[f"loop_lag.{key}"] = report["event_loop_lag_s"][key]
+    return metrics
+
+def diff_reports(baseline: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Dict[str, Optional[float]]]:
+    """Per metric: baseline value, current value and relative change (None when the baseline is 0)."""
+    before, after = flatten(baseline), flatten(current)
+    return {
+        name: {
+            "baseline": before.get(name),
+            "current": value,
+            "change": (value - before[name]) / before[name] if before.get(name) else None
+        }
+        for name, value in after.items()
+    }
+
+def format_report(report: Dict[str, Any], diff: Optional[Dict[str, Dict[str, Optional[float]]]] = None) -> str:
+    lines = [f"{report['requests']} requests in {report['elapsed_s']:.2f}s "
+             f"({report['throughput_rps']:.1f} req/s), peak RSS {report['peak_rss_mb']:.0f} MB"]
+    lines.append(f"{'endpoint':<10} {'n':>6} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stats in report["endpoints"].items():
+        lines.append(f"{name:<10} {stats['requests']:>6} {stats['errors']:>5} {stats['p50'] * 1000:>9.1f} "
+                     f"{stats['p95'] * 1000:>9.1f} {stats['p99'] * 1000:>9.1f}")
+    lag = report["event_loop_lag_s"]
+    lines.append(f"event-loop lag: p50 {lag['p50'] * 1000:.1f} ms, p99 {lag['p99'] * 1000:.1f} ms, max {lag['max'] * 1000:.1f} ms")
+    if diff:
+        lines.append("")
+        lines.append(f"{'metric':<22} {'baseline':>12} {'current':>12} {'change':>9}")
+        for name, d in diff.items():
+            change = f"{d['change'] * 100:+.1f}%" if d["change"] is not None else "n/a"
+            baseline = f"{d['baseline']:.4g}" if d["baseline"] is not None else "n/a"
+            lines.append(f"{name:<22} {baseline:>12} {d['current']:>12.4g} {change:>9}")
+    return "\n".join(lines)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load-test the ScholarFlow API against a fake Gemini server.")
+    parser.add_argument("--users", type=int, default=50, help="Concurrent virtual students")
+    parser.add_argument("--iterations", type=int, default=1, help="Uploads per student")
+    parser.add_argument("--chats", type=int, default=5, help="Chat questions after each upload")
+    parser.add_argument("--dashboards", type=int, default=10, help="Dashboard polls after each upload")
+    parser.add_argument("--pages", type=int, default=5, help="Pages per generated PDF")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake Gemini latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake Gemini calls failing with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of fake Gemini calls failing with 429")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Client timeout per request in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="Report JSON to diff against")
+    parser.add_argument("--save-baseline", help="Write this run's report JSON here")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    random.seed(args.seed)
+    # Import main.py from the repository root regardless of where this is run from
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    report = run_load_test(args)
+
+    diff = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            diff = diff_reports(json.load(f), report)
+    print(format_report(report, diff))
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Recall versus memory benchmark for SimpleVectorStore's quantization modes.
+
+Fills a store per mode with synthetic clustered unit vectors (768 dimensions,
+like text-embedding-004), runs queries through `search()` and compares the
+results with exact brute-force search:
+
+    python -m campus_taskflow.testing.vector_benchmark --rows 50000 --queries 200
+    python -m campus_taskflow.testing.vector_benchmark --modes pq --rerank-factors 1 5 10 20
+    python -m campus_taskflow.testing.vector_benchmark --max-latency-ratio 1.5 --max-pq-latency-ratio 3
+
+Reports recall@k, in-memory index bytes per vector and query latency for each
+mode and re-rank factor. A re-rank factor of 0 scores with the codes alone.
+With --max-latency-ratio the run fails when a quantized mode's median query
+latency exceeds that multiple of the float32 mode's. PQ scores with table
+lookups rather than BLAS and runs at about 2-3x float32's latency, so it can be
+held to its own bound with --max-pq-latency-ratio.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..tools.search_tools import SimpleVectorStore
+
+def make_dataset(rows: int, queries: int, dim: int, clusters: int, seed: int):
+    """Unit vectors scattered around random topic centres, and queries perturbed from stored rows."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(clusters, size=rows)] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    picks = vectors[rng.integers(rows, size=queries)]
+    # Noise of norm ~0.3 around a stored unit vector
+    query_vectors = picks + 0.3 * rng.standard_normal((queries, dim)).astype(np.float32) / np.sqrt(dim)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    return vectors, query_vectors
+
+def benchmark_mode(mode: str, vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray,
+                   k: int, rerank_factor: int, workdir: str) -> Dict[str, Any]:
+    store = SimpleVectorStore(os.path.join(workdir, f"{mode}.json"), quantization=mode)
+    if not store.documents:
+        store.add_many([(str(i), vector, {"document_id": "bench"}) for i, vector in enumerate(vectors)])
+    store.rerank_factor, store.rerank_min = rerank_factor, 0
+
+    started = time.perf_counter()
+    # PQ codebooks train in the background; time queries against the finished index
+    store.wait_for_index()
+    stats = store.index_stats()
+    build_s = time.perf_counter() - started
+
+    hits, latencies = 0, []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        results = store.search(query, n_results=k)
+        latencies.append(time.perf_counter() - started)
+        hits += len({int(r["content"]) for r in results} & set(expected.tolist()))
+    return {
+        "mode": mode,
+        "rerank_factor": rerank_factor if mode != "none" else None,
+        f"recall@{k}": hits / (len(queries) * k),
+        "bytes_per_vector": stats["bytes_per_vector"],
+        "compression": vectors.shape[1] * 4 / stats["bytes_per_vector"],
+        "index_build_s": build_s,
+        "query_ms_p50": float(np.percentile(latencies, 50) * 1000)
+    }
+
+def run_benchmark(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    vectors, queries = make_dataset(args.rows, args.queries, args.dim, args.clusters, args.seed)
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+    rows = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in args.modes:
+            for factor in ([1] if mode == "none" else args.rerank_factors):
+                rows.append(benchmark_mode(mode, vectors, queries, truth, args.k, factor, workdir))
+    return rows
+
+def latency_failures(rows: List[Dict[str, Any]], max_ratio: float,
+                     mode_ratios: Optional[Dict[str, float]] = None) -> List[str]:
+    """
+    Modes whose median query latency exceeds `max_ratio` times the float32
+    mode's, or the ratio `mode_ratios` gives for that mode.
+    """
+    baseline = next((row["query_ms_p50"] for row in rows if row["mode"] == "none"), None)
+    if baseline is None:
+        return ["--max-latency-ratio needs the 'none' mode as its baseline"]
+    failures = []
+    for row in rows:
+        ratio = (mode_ratios or {}).get(row["mode"], max_ratio)
+        if row["mode"] != "none" and row["query_ms_p50"] > ratio * baseline:
+            failures.append(f"{row['mode']} (rerank {row['rerank_factor']}): p50 {row['query_ms_p50']:.2f} ms "
+                            f"exceeds {ratio:g}x float32's {baseline:.2f} ms")
+    return failures
+
+def format_rows(rows: List[Dict[str, Any]], k: int) -> str:
+    lines = [f"{'mode':<6} {'rerank':>6} {'recall@' + str(k):>10} {'B/vector':>9} {'x smaller':>9} {'build s':>8} {'p50 ms':>7}"]
+    for row in rows:
+        rerank = "-" if row["rerank_factor"] is None else str(row["rerank_factor"])
+        lines.append(f"{row['mode']:<6} {rerank:>6} {row[f'recall@{k}']:>10.3f} {row['bytes_per_vector']:>9.1f} "
+                     f"{row['compression']:>9.1f} {row['index_build_s']:>8.2f} {row['query_ms_p50']:>7.2f}")
+    return "\n".join(lines)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark recall and memory of the vector store's quantization modes.")
+    parser.add_argument("--rows", type=int, default=20000, help="Stored vectors")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=200, help="Topic centres the vectors are drawn around")
+    parser.add_argument("-k", type=int, default=10, help="Results per query")
+    parser.add_argument("--modes", nargs="+", default=["none", "int8", "pq"])
+    parser.add_argument("--rerank-factors", type=int, nargs="+", default=[0, 10], help="Candidates re-ranked per result")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-latency-ratio", type=float, default=None,
+                        help="Fail if a mode's p50 latency exceeds this multiple of float32's")
+    parser.add_argument("--max-pq-latency-ratio", type=float, default=None,
+                        help="Bound for the pq mode instead of --max-latency-ratio")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    rows = run_benchmark(args)
+    print(format_rows(rows, args.k))
+    if args.max_latency_ratio is None:
+        return 0
+    mode_ratios = {"pq": args.max_pq_latency_ratio} if args.max_pq_latency_ratio is not None else None
+    failures = latency_failures(rows, args.max_latency_ratio, mode_ratios)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,14 +2,40 @@ import fitz  # pymupdf
 import pytesseract
 from PIL import Image
 import io
-from typing import Dict, Any, List
+import os
+import hashlib
+from typing import Dict, Any, List, Optional, Union
 from ..adk.tools import Tool
 from pydantic import BaseModel, Field
 
+# A path on disk, or the PDF's bytes already in memory
+PDFSource = Union[str, bytes, bytearray, memoryview]
+
 class PDFReaderArgs(BaseModel):
-    file_path: str = Field(..., description="Path to the PDF file")
+    file_path: Optional[str] = Field(None, description="Path to the PDF file")
+    data: Optional[bytes] = Field(None, description="Raw PDF bytes, used instead of file_path")
+    known_pages: Optional[Dict[str, str]] = Field(None, description="Page hash -> text of previously extracted pages")
+
+def page_content_hash(doc: "fitz.Document", page: "fitz.Page") -> str:
+    """Hashes a page's content stream and raw image streams without rendering or extracting text."""
+    digest = hashlib.sha256(page.read_contents())
+    for image in page.get_images(full=True):
+        digest.update(doc.xref_stream_raw(image[0]) or b"")
+    return digest.hexdigest()
+
+def open_pdf(source: PDFSource) -> "fitz.Document":
+    """Opens a PDF from a path, or straight from an in-memory buffer without touching disk."""
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
 
 class PDFReaderTool(Tool):
+    # CPU-bound; PDF_READER_OFFLOAD=process moves extraction off the server's GIL
+    offload = os.getenv("PDF_READER_OFFLOAD", "thread")
+    timeout = float(os.getenv("PDF_READER_TIMEOUT", "300"))
+    # Validating would copy (and reject) in-memory buffers
+    validate_inputs = False
+
     def __init__(self):
         super().__init__(
             name="pdf_reader",
@@ -17,20 +43,27 @@ class PDFReaderTool(Tool):
             args_schema=PDFReaderArgs
         )
 
-    def run(self, file_path: str) -> Dict[str, Any]:
-        doc = fitz.open(file_path)
+    def run(self, file_path: Optional[str] = None, data: Optional[PDFSource] = None,
+            known_pages: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        doc = open_pdf(data if data is not None else file_path)
+        known_pages = known_pages or {}
         pages = []
         full_text = ""
         
         for i, page in enumerate(doc):
-            text = page.get_text()
+            page_hash = page_content_hash(doc, page)
+            reused = page_hash in known_pages
+            # Unchanged pages from a previous version keep their extracted text
+            text = known_pages[page_hash] if reused else page.get_text()
             # If text is empty, it might be a scanned page
             is_scanned = len(text.strip()) < 10
             
             pages.append({
                 "page_number": i + 1,
+                "page_hash": page_hash,
                 "text": text,
-                "is_scanned": is_scanned
+                "is_scanned": is_scanned,
+                "reused": reused
             })
             full_text += text + "\n"
             
@@ -45,6 +78,10 @@ class OCRArgs(BaseModel):
     image_data: bytes = Field(..., description="Raw bytes of the image")
 
 class OCRTool(Tool):
+    # pytesseract waits on the tesseract binary, so a thread is enough
+    offload = "thread"
+    timeout = float(os.getenv("OCR_TIMEOUT", "60"))
+
     def __init__(self):
         super().__init__(
             name="ocr_tool",
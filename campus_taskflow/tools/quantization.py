@@ -0,0 +1,210 @@
+from typing import Optional
+import numpy as np
+
+# Rows scored per step; bounds the float32 temporaries made from compressed codes
+SCORE_BLOCK_ROWS = 16384
+# int8 rows converted to float32 per step. Small enough that the converted block
+# stays in CPU cache, so scoring runs at close to float32 BLAS speed
+CAST_BLOCK_ROWS = 256
+# PQ rows scored per lookup-table gather; their table offsets (8 bytes per code) stay in CPU cache
+PQ_BLOCK_ROWS = 512
+
+class GrowableArray:
+    """Row-appendable 2-D array with amortized O(1) appends (capacity doubles as needed)."""
+    def __init__(self, width: int, dtype: np.dtype):
+        self._data = np.empty((0, width), dtype=dtype)
+        self.size = 0
+
+    def extend(self, rows: np.ndarray):
+        needed = self.size + len(rows)
+        if needed > len(self._data):
+            grown = np.empty((max(needed, 2 * len(self._data), 1024), self._data.shape[1]), dtype=self._data.dtype)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size:needed] = rows
+        self.size = needed
+
+    @property
+    def view(self) -> np.ndarray:
+        return self._data[:self.size]
+
+    @property
+    def nbytes(self) -> int:
+        return self.view.nbytes
+
+class FloatIndex:
+    """Exact scoring over unit-normalized float32 rows (4 bytes per dimension)."""
+    exact = True
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._rows = GrowableArray(dim, np.float32)
+
+    @property
+    def count(self) -> int:
+        return self._rows.size
+
+    @property
+    def nbytes(self) -> int:
+        return self._rows.nbytes
+
+    def should_rebuild(self, total_rows: int) -> bool:
+        return False
+
+    def extend(self, vectors: np.ndarray):
+        self._rows.extend(vectors)
+
+    def scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        matrix = self._rows.view if rows is None else self._rows.view[rows]
+        return matrix @ query
+
+class Int8Index:
+    """
+    Scalar quantization: each unit row is stored as int8 codes plus one float32
+    scale (about 4x smaller than float32). Scores are approximate.
+
+    NumPy has no BLAS kernel for integer products (an int8 x int8 -> int32
+    matmul measures slower than converting to float32), so codes are converted
+    into a small cache-resident float32 block and scored with sgemv.
+    """
+    exact = False
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._codes = GrowableArray(dim, np.int8)
+        self._scales = GrowableArray(1, np.float32)
+
+    @property
+    def count(self) -> int:
+        return self._codes.size
+
+    @property
+    def nbytes(self) -> int:
+        return self._codes.nbytes + self._scales.nbytes
+
+    def should_rebuild(self, total_rows: int) -> bool:
+        return False
+
+    def extend(self, vectors: np.ndarray):
+        scales = np.abs(vectors).max(axis=1, keepdims=True) / 127.0
+        scales[scales == 0] = 1.0
+        self._codes.extend(np.round(vectors / scales).astype(np.int8))
+        self._scales.extend(scales.astype(np.float32))
+
+    def scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        codes = self._codes.view if rows is None else self._codes.view[rows]
+        scales = self._scales.view[:, 0] if rows is None else self._scales.view[rows, 0]
+        query = np.asarray(query, dtype=np.float32)
+        out = np.empty(len(codes), dtype=np.float32)
+        # Per call, so concurrent searches never share it
+        scratch = np.empty((min(CAST_BLOCK_ROWS, len(codes)), self.dim), dtype=np.float32)
+        for start in range(0, len(codes), CAST_BLOCK_ROWS):
+            block = codes[start:start + CAST_BLOCK_ROWS]
+            converted = scratch[:len(block)]
+            np.copyto(converted, block)
+            np.dot(converted, query, out=out[start:start + len(block)])
+        return out * scales
+
+def kmeans(x: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = nearest(x, centroids)
+        counts = np.bincount(assign, minlength=k)
+        # One-hot matmul sums each cluster's members in a single BLAS call
+        sums = np.zeros((k, len(x)), dtype=np.float32)
+        sums[assign, np.arange(len(x))] = 1.0
+        sums = sums @ x
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+def nearest(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    # argmin ||x - c||^2 == argmin (||c||^2 - 2 x.c)
+    return np.argmin((centroids ** 2).sum(axis=1) - 2.0 * (x @ centroids.T), axis=1)
+
+class PQIndex:
+    """
+    Product quantization: rows are split into `subspaces` chunks and each chunk
+    is replaced by the id of its nearest of up to 256 centroids, one byte per
+    chunk (32x smaller than float32 with 8-dimensional chunks). Queries are scored
+    with a per-query lookup table, so scoring never decompresses the rows.
+
+    Codebooks are trained on a sample of the store (`train`) before rows are
+    encoded; `should_rebuild` tells the owner to train a new index once the store
+    has grown `retrain_growth`-fold past the rows the codebooks were trained on.
+    """
+    exact = False
+
+    def __init__(self, dim: int, sub_dim: int = 8, centroids: int = 256, train_rows: int = 8192,
+                 iterations: int = 8, retrain_growth: int = 4, seed: int = 0):
+        # Largest subspace count that splits `dim` evenly into chunks of about `sub_dim`
+        subspaces = max(1, dim // sub_dim)
+        while dim % subspaces:
+            subspaces -= 1
+        self.dim = dim
+        self.subspaces = subspaces
+        self.sub_dim = dim // subspaces
+        self.centroids = centroids
+        self.train_rows = train_rows
+        self.iterations = iterations
+        self.retrain_growth = retrain_growth
+        self.rng = np.random.default_rng(seed)
+        self.codebooks: Optional[np.ndarray] = None  # (subspaces, k, sub_dim)
+        self.trained_on = 0
+        self._codes = GrowableArray(subspaces, np.uint8)
+
+    @property
+    def count(self) -> int:
+        return self._codes.size
+
+    @property
+    def nbytes(self) -> int:
+        return self._codes.nbytes + (self.codebooks.nbytes if self.codebooks is not None else 0)
+
+    def should_rebuild(self, total_rows: int) -> bool:
+        # Codebooks trained on a handful of rows are poor; retrain as the store grows
+        return self.trained_on < self.train_rows and total_rows >= self.retrain_growth * max(self.trained_on, 1)
+
+    def train(self, sample: np.ndarray):
+        if len(sample) > self.train_rows:
+            sample = sample[self.rng.choice(len(sample), self.train_rows, replace=False)]
+        k = min(self.centroids, len(sample))
+        chunks = sample.reshape(len(sample), self.subspaces, self.sub_dim)
+        self.codebooks = np.stack([
+            kmeans(np.ascontiguousarray(chunks[:, s]), k, self.iterations, self.rng) for s in range(self.subspaces)
+        ]).astype(np.float32)
+        self.trained_on = len(sample)
+
+    def extend(self, vectors: np.ndarray):
+        if self.codebooks is None:
+            self.train(vectors)
+        chunks = vectors.reshape(len(vectors), self.subspaces, self.sub_dim)
+        codes = np.empty((len(vectors), self.subspaces), dtype=np.uint8)
+        for s in range(self.subspaces):
+            codes[:, s] = nearest(chunks[:, s], self.codebooks[s])
+        self._codes.extend(codes)
+
+    def scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        # table[s, c] = <query chunk s, centroid c of subspace s>, flattened so that
+        # code c of subspace s is entry s * k + c and a block is scored with one gather
+        table = np.einsum("skd,sd->sk", self.codebooks, query.reshape(self.subspaces, self.sub_dim))
+        flat = np.ascontiguousarray(table, dtype=np.float32).ravel()
+        offsets = np.arange(self.subspaces, dtype=np.intp) * table.shape[1]
+        codes = self._codes.view if rows is None else self._codes.view[rows]
+        out = np.empty(len(codes), dtype=np.float32)
+        # Per call, so concurrent searches never share them
+        size = min(PQ_BLOCK_ROWS, len(codes))
+        index = np.empty((size, self.subspaces), dtype=np.intp)
+        gathered = np.empty((size, self.subspaces), dtype=np.float32)
+        for start in range(0, len(codes), PQ_BLOCK_ROWS):
+            block = codes[start:start + PQ_BLOCK_ROWS]
+            n = len(block)
+            np.add(block, offsets, out=index[:n])
+            np.take(flat, index[:n], out=gathered[:n])
+            gathered[:n].sum(axis=1, out=out[start:start + n])
+        return out
+
+INDEX_TYPES = {"none": FloatIndex, "int8": Int8Index, "pq": PQIndex}
+
+def make_index(mode: str, dim: int):
+    return INDEX_TYPES[mode](dim)
@@ -1,77 +1,557 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from ..adk.tools import Tool
+from ..adk.cache import query_embedding_cache, answer_cache, normalize_query
+from ..adk.ratelimit import embedding_limiter
+from ..adk.skills import configure_client, async_client_supported
+from ..adk.core import run_sync
+from .quantization import INDEX_TYPES, SCORE_BLOCK_ROWS, make_index
 
 import numpy as np
 import json
+import logging
 import os
+import tempfile
+import threading
 import uuid
+from contextlib import contextmanager
 import google.generativeai as genai
-from typing import List, Dict, Any
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking is available
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Segments beyond this count are compacted into one on the next write
+MAX_SEGMENTS = 64
+# In-memory search index: "none" (float32), "int8" (~4x smaller) or "pq" (~32x smaller)
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")
+# Quantized searches re-rank this many candidates per requested result with exact float vectors
+VECTOR_RERANK_FACTOR = int(os.getenv("VECTOR_RERANK_FACTOR", "10"))
+
+def _atomic_write(path: str, write: Callable[[Any], None], mode: str = 'w'):
+    """Writes to a temp file and renames it over `path`, so readers never see a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def _atomic_write_json(path: str, data: Any):
+    _atomic_write(path, lambda f: json.dump(data, f))
+
+def _atomic_write_npy(path: str, array: np.ndarray):
+    _atomic_write(path, lambda f: np.save(f, array), mode='wb')
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    # Avoid division by zero; zero vectors simply score 0
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+def _top(scores: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the `n` highest scores, best first."""
+    top = np.argpartition(-scores, n - 1)[:n]
+    return top[np.argsort(-scores[top])]
 
 class SimpleVectorStore:
-    """A lightweight, NumPy-based vector store."""
-    def __init__(self, persist_path: str = "vector_store.json"):
+    """
+    A lightweight, NumPy-based vector store.
+    Chunks are partitioned by their `owner` (the uploading session) and
+    `document_id` metadata so that searches restricted to one owner's documents
+    only score those rows, never another owner's copy of the same document.
+
+    On disk the store is a manifest (`persist_path`) listing immutable segment
+    files. Several worker processes may share it: writers serialize on a file
+    lock and publish new segments by atomically replacing the manifest, while
+    readers notice a new manifest generation and load only the segments they
+    have not seen yet.
+
+    Each segment keeps its float32 vectors in a `.npy` sidecar that is
+    memory-mapped rather than read into Python lists. Searches score an
+    in-memory index built from them: exact float32 rows, or with `quantization`
+    set to "int8"/"pq", compressed codes whose best candidates are re-ranked
+    against the exact float vectors. PQ codebooks are trained on a background
+    thread when rows are written or refreshed; until a trained index is ready,
+    and while the store is smaller than `quantize_min_rows`, searches score an
+    exact float index instead.
+    """
+    _shared: Dict[str, "SimpleVectorStore"] = {}
+    _shared_lock = threading.Lock()
+    rerank_factor = VECTOR_RERANK_FACTOR
+    # Quantized searches never re-rank fewer candidates than this
+    rerank_min = 50
+    # Trained (PQ) indexes need this many rows to learn codebooks from
+    quantize_min_rows = 4096
+
+    def __init__(self, persist_path: str = "vector_store.json", quantization: Optional[str] = None):
         self.persist_path = persist_path
+        self.segment_dir = os.path.splitext(persist_path)[0] + "_segments"
+        self.lock_path = persist_path + ".lock"
+        self.quantization = quantization or VECTOR_QUANTIZATION
+        if self.quantization not in INDEX_TYPES:
+            raise ValueError(f"Unknown vector quantization mode {self.quantization!r}; "
+                             f"expected one of {sorted(INDEX_TYPES)}")
         self.documents = []
         self.metadatas = []
-        self.embeddings = []
+        self.generation = 0
+        self.segments: List[str] = []
+        # Float vectors, one (rows, dim) array per segment (memory-mapped for .npy sidecars)
+        self._blocks: List[np.ndarray] = []
+        self._block_starts: List[int] = []
+        # Set when rows were read from a pre-segment single-file store
+        self._legacy = False
+        self._manifest_stat: Optional[Tuple[int, int, int]] = None
+        self._lock = threading.RLock()
+        # Lazily built search index over unit-normalized rows and (owner, document_id)
+        # partitions; both are extended in place when segments are appended and
+        # dropped when rows are replaced
+        self._index = None
+        # Exact index searched while a trained index is not ready yet
+        self._exact_index = None
+        self._training: Optional[threading.Thread] = None
+        # Bumped whenever rows are replaced, so stale training results are discarded
+        self._rows_epoch = 0
+        self._reset_partitions()
         self.load()
 
+    @classmethod
+    def shared(cls, persist_path: str = "vector_store.json") -> "SimpleVectorStore":
+        """Returns this process's store for `persist_path`, refreshed from disk."""
+        key = os.path.abspath(persist_path)
+        with cls._shared_lock:
+            store = cls._shared.get(key)
+            if store is None:
+                # Absolute, so later refreshes read the same files whatever the working directory
+                store = cls._shared[key] = cls(key)
+        store.refresh()
+        return store
+
     def add(self, text: str, embedding: List[float], metadata: Dict[str, Any]):
-        self.documents.append(text)
-        self.embeddings.append(embedding)
-        self.metadatas.append(metadata)
-        self.save()
+        self.add_many([(text, embedding, metadata)])
 
-    def search(self, query_embedding: List[float], n_results: int = 3) -> List[Dict[str, Any]]:
-        if not self.embeddings:
-            return []
-        
-        # Calculate cosine similarity
-        query_vec = np.array(query_embedding)
-        doc_vecs = np.array(self.embeddings)
-        
-        # Normalize vectors
+    def add_many(self, items: List[Tuple[str, List[float], Dict[str, Any]]]):
+        """Appends chunks as one new segment."""
+        if not items:
+            return
+        with self._write_lock():
+            self.refresh()
+            texts = [item[0] for item in items]
+            vectors = np.asarray([item[1] for item in items], dtype=np.float32)
+            metadatas = [item[2] for item in items]
+            if self._legacy or len(self.segments) >= MAX_SEGMENTS:
+                all_vectors = np.concatenate([self._vectors(), vectors]) if self._blocks else vectors
+                self._commit(self.documents + texts, all_vectors, self.metadatas + metadatas, replace=True)
+            else:
+                self._commit(texts, vectors, metadatas, replace=False)
+
+    def has_document(self, document_id: str, owner: Optional[str] = None) -> bool:
+        with self._lock:
+            return (owner, document_id) in self._get_partitions()
+
+    def page_hashes(self, document_id: str, owner: Optional[str] = None) -> set:
+        """Hashes of the pages of `owner`'s copy of `document_id` that already have vectors."""
+        with self._lock:
+            rows = self._get_partitions().get((owner, document_id), [])
+            return {self.metadatas[i].get("page_hash") for i in rows}
+
+    def owner_documents(self, owner: Optional[str]) -> List[str]:
+        """Ids of the documents `owner` has vectors for, in the order they were first stored."""
+        self.refresh()
+        with self._lock:
+            self._get_partitions()
+            return list(self._owner_documents.get(owner, {}))
+
+    def delete(self, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        """Removes every chunk whose metadata matches `predicate`. Returns the number removed."""
+        self.refresh()
+        if not any(predicate(m) for m in self.metadatas):
+            return 0
+        with self._write_lock():
+            self.refresh()
+            keep = [i for i, m in enumerate(self.metadatas) if not predicate(m)]
+            removed = len(self.metadatas) - len(keep)
+            if removed:
+                self._commit([self.documents[i] for i in keep], self._vectors(np.asarray(keep, dtype=np.intp)),
+                             [self.metadatas[i] for i in keep], replace=True)
+            return removed
+
+    def rows(self, predicate: Callable[[Dict[str, Any]], bool]) -> List[Tuple[str, np.ndarray, Dict[str, Any]]]:
+        """(text, vector, metadata) of every chunk whose metadata matches `predicate`."""
+        self.refresh()
+        with self._lock:
+            selected = np.asarray([i for i, m in enumerate(self.metadatas) if predicate(m)], dtype=np.intp)
+            if not len(selected):
+                return []
+            vectors = self._vectors(selected)
+            return [(self.documents[i], vectors[j], self.metadatas[i]) for j, i in enumerate(selected.tolist())]
+
+    def index_stats(self) -> Dict[str, Any]:
+        """Size of the in-memory search index (the float vectors themselves stay memory-mapped)."""
+        with self._lock:
+            index = self._get_index() if self.documents else None
+        nbytes = index.nbytes if index is not None else 0
+        return {
+            "quantization": self.quantization,
+            "rows": len(self.documents),
+            "index_bytes": nbytes,
+            "bytes_per_vector": nbytes / len(self.documents) if self.documents else 0.0
+        }
+
+    def wait_for_index(self, timeout: Optional[float] = None) -> bool:
+        """Waits for background index training to finish. Returns False on timeout."""
+        while True:
+            with self._lock:
+                training = self._training
+            if training is None:
+                return True
+            training.join(timeout)
+            if training.is_alive():
+                return False
+
+    def _invalidate_index(self, rows_replaced: bool = True):
+        if rows_replaced:
+            self._index = None
+            self._exact_index = None
+            self._rows_epoch += 1
+            self._reset_partitions()
+        self._schedule_training()
+
+    def _trains_index(self) -> bool:
+        return hasattr(INDEX_TYPES[self.quantization], "train")
+
+    def _schedule_training(self):
+        """Starts training a new index in the background once the store needs one."""
+        total = len(self.documents)
+        if not self._trains_index() or self._training is not None or total < self.quantize_min_rows:
+            return
+        if self._index is not None and not self._index.should_rebuild(total):
+            return
+        self._training = threading.Thread(target=self._train_index, name="vector-index-training", daemon=True)
+        self._training.start()
+
+    def _train_index(self):
+        retrain = False
+        try:
+            with self._lock:
+                epoch = self._rows_epoch
+                total = len(self.documents)
+                blocks = list(zip(self._blocks, self._block_starts))
+                index = make_index(self.quantization, self._blocks[0].shape[1])
+                # Train codebooks on a sample spread over every segment
+                rng = np.random.default_rng(0)
+                sample = np.sort(rng.choice(total, min(total, index.train_rows), replace=False))
+                sample = _unit_rows(self._vectors(sample))
+            # Training and encoding the existing rows run outside the lock; searches
+            # keep scoring the current index meanwhile
+            index.train(sample)
+            self._extend_index(index, blocks)
+            with self._lock:
+                if self._rows_epoch == epoch:
+                    self._extend_index(index, zip(self._blocks, self._block_starts))
+                    self._index, self._exact_index = index, None
+            # Rows replaced (or grown past the retrain point) meanwhile need another run
+            retrain = True
+        except Exception as e:
+            logger.warning(f"Training the {self.quantization} vector index failed: {e}")
+        finally:
+            with self._lock:
+                self._training = None
+                if retrain:
+                    self._schedule_training()
+
+    @staticmethod
+    def _extend_index(index, blocks):
+        """Encodes rows appended since `index` was last extended, a bounded chunk at a time."""
+        for block, start in blocks:
+            while start + len(block) > index.count:
+                offset = index.count - start
+                chunk = np.asarray(block[offset:offset + SCORE_BLOCK_ROWS], dtype=np.float32)
+                index.extend(_unit_rows(chunk))
+
+    def _set_blocks(self, blocks: List[np.ndarray]):
+        self._blocks, self._block_starts = [], []
+        for block in blocks:
+            self._append_block(block)
+
+    def _append_block(self, block: Optional[np.ndarray]):
+        if block is None or not len(block):
+            return
+        start = self._block_starts[-1] + len(self._blocks[-1]) if self._blocks else 0
+        self._blocks.append(block)
+        self._block_starts.append(start)
+
+    def _vectors(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Float vectors of `rows` (all rows when None), gathered across segment blocks."""
+        if not self._blocks:
+            return np.zeros((0, 0), dtype=np.float32)
+        if rows is None:
+            return np.concatenate(self._blocks) if len(self._blocks) > 1 else np.array(self._blocks[0])
+        out = np.empty((len(rows), self._blocks[0].shape[1]), dtype=np.float32)
+        owner = np.searchsorted(self._block_starts, rows, side="right") - 1
+        for b in np.unique(owner):
+            selected = owner == b
+            out[selected] = self._blocks[b][rows[selected] - self._block_starts[b]]
+        return out
+
+    def _reset_partitions(self):
+        self._partitions: Dict[Tuple[Optional[str], str], List[int]] = {}
+        # Row-index arrays of partitions searched since they last grew
+        self._partition_arrays: Dict[Tuple[Optional[str], str], np.ndarray] = {}
+        # owner -> its document ids, in first-stored order
+        self._owner_documents: Dict[Optional[str], Dict[str, None]] = {}
+        # Rows already assigned to a partition
+        self._partitioned = 0
+
+    def _get_partitions(self) -> Dict[Tuple[Optional[str], str], List[int]]:
+        """
+        (owner, document_id) -> row indices. Only rows appended since the last call
+        are visited, so keeping them current costs O(new rows). Callers hold `self._lock`.
+        """
+        for i in range(self._partitioned, len(self.metadatas)):
+            metadata = self.metadatas[i]
+            key = (metadata.get("owner"), metadata.get("document_id"))
+            self._partitions.setdefault(key, []).append(i)
+            self._partition_arrays.pop(key, None)
+            self._owner_documents.setdefault(key[0], {})[key[1]] = None
+        self._partitioned = len(self.metadatas)
+        return self._partitions
+
+    def _partition_rows(self, key: Tuple[Optional[str], str]) -> Optional[np.ndarray]:
+        rows = self._get_partitions().get(key)
+        if rows is None:
+            return None
+        array = self._partition_arrays.get(key)
+        if array is None:
+            array = self._partition_arrays[key] = np.asarray(rows, dtype=np.intp)
+        return array
+
+    def _get_index(self):
+        """
+        The index searches score, extended with any appended rows. Never trains:
+        while a trained index is not ready, an exact float index stands in.
+        Callers hold `self._lock`.
+        """
+        if self._index is None and not self._trains_index():
+            self._index = make_index(self.quantization, self._blocks[0].shape[1])
+        index = self._index
+        if index is None:
+            if self._exact_index is None:
+                self._exact_index = make_index("none", self._blocks[0].shape[1])
+            index = self._exact_index
+        # Encode only rows appended since the index was last extended
+        self._extend_index(index, zip(self._blocks, self._block_starts))
+        return index
+
+    def search(self, query_embedding: List[float], n_results: int = 3,
+               document_ids: Optional[List[str]] = None, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the `n_results` chunks most similar to `query_embedding`.
+        When `document_ids` is given, only the rows `owner` stored for those
+        documents are scored.
+        """
+        self.refresh()
+        query_vec = np.asarray(query_embedding, dtype=np.float32)
         norm_query = np.linalg.norm(query_vec)
-        norm_docs = np.linalg.norm(doc_vecs, axis=1)
-        
         # Avoid division by zero
         if norm_query == 0:
             return []
-        
-        similarities = np.dot(doc_vecs, query_vec) / (norm_docs * norm_query)
-        
-        # Get top N indices
-        top_indices = np.argsort(similarities)[::-1][:n_results]
-        
-        results = []
-        for idx in top_indices:
-            results.append({
-                "content": self.documents[idx],
-                "metadata": self.metadatas[idx],
-                "score": float(similarities[idx])
-            })
-        return results
+        query_vec = query_vec / norm_query
+
+        # Index, partitions and vectors are read under one lock so they describe the same rows
+        with self._lock:
+            if not self.documents:
+                return []
+            return self._search(query_vec, n_results, document_ids, owner)
+
+    def _search(self, query_vec: np.ndarray, n_results: int,
+                document_ids: Optional[List[str]], owner: Optional[str]) -> List[Dict[str, Any]]:
+        index = self._get_index()
+        if document_ids is None:
+            rows = None
+        else:
+            selected = [self._partition_rows((owner, d)) for d in dict.fromkeys(document_ids)]
+            selected = [rows for rows in selected if rows is not None]
+            if not selected:
+                return []
+            rows = np.concatenate(selected)
+
+        # Cosine similarity against pre-normalized rows (approximate for quantized indexes)
+        similarities = index.scores(query_vec, rows)
+        n_results = min(n_results, len(similarities))
+        if index.exact:
+            top = _top(similarities, n_results)
+            top_rows = rows[top] if rows is not None else top
+            scores = similarities[top]
+        else:
+            # Shortlist from the compressed codes, then re-rank with the exact float vectors
+            shortlist_size = max(n_results * self.rerank_factor, self.rerank_min, n_results)
+            shortlist = _top(similarities, min(len(similarities), shortlist_size))
+            candidates = rows[shortlist] if rows is not None else shortlist
+            exact = _unit_rows(self._vectors(candidates)) @ query_vec
+            top = _top(exact, n_results)
+            top_rows, scores = candidates[top], exact[top]
+
+        return [{
+            "content": self.documents[idx],
+            "metadata": self.metadatas[idx],
+            "score": float(score)
+        } for idx, score in zip(top_rows.tolist(), scores.tolist())]
 
     def save(self):
-        data = {
-            "documents": self.documents,
-            "metadatas": self.metadatas,
-            "embeddings": self.embeddings
-        }
-        with open(self.persist_path, 'w') as f:
-            json.dump(data, f)
+        """Compacts all rows into a single segment."""
+        with self._write_lock():
+            self._commit(list(self.documents), self._vectors(), list(self.metadatas), replace=True)
 
     def load(self):
-        if os.path.exists(self.persist_path):
+        """Reloads every segment listed in the manifest. Parse errors propagate."""
+        with self._lock:
+            self._load_manifest(self._read_manifest(), full=True)
+
+    def refresh(self) -> bool:
+        """
+        Picks up segments published by other processes since the last load.
+        Only the manifest is stat'ed when nothing changed. Returns True if rows changed.
+        """
+        with self._lock:
+            if self._stat_manifest() == self._manifest_stat:
+                return False
+            manifest = self._read_manifest()
+            if manifest.get("generation", 0) == self.generation and not self._legacy \
+                    and manifest.get("segments", []) == self.segments:
+                self._manifest_stat = manifest["stat"]
+                return False
+            self._load_manifest(manifest, full=False)
+            return True
+
+    # --- Persistence internals ---
+
+    @contextmanager
+    def _write_lock(self):
+        """Serializes writers within this process and, where supported, across processes."""
+        with self._lock:
+            with open(self.lock_path, 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _stat_manifest(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.persist_path)
+        except FileNotFoundError:
+            return None
+        # The inode changes on every atomic replace, even within one mtime tick
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        stat = self._stat_manifest()
+        if stat is None:
+            return {"generation": 0, "segments": [], "stat": None}
+        try:
+            with open(self.persist_path, 'r') as f:
+                manifest = json.load(f)
+        except json.JSONDecodeError as e:
+            logger.error(f"Vector store manifest {self.persist_path} is corrupt: {e}")
+            raise
+        manifest["stat"] = stat
+        return manifest
+
+    def _read_segment(self, name: str) -> Dict[str, Any]:
+        with open(os.path.join(self.segment_dir, name), 'r') as f:
+            segment = json.load(f)
+        if not segment["documents"]:
+            segment["vectors"] = None
+        elif "vectors" in segment:
+            segment["vectors"] = np.load(os.path.join(self.segment_dir, segment["vectors"]), mmap_mode="r")
+        else:
+            # Segments written before the .npy sidecars kept vectors inline
+            segment["vectors"] = np.asarray(segment.pop("embeddings"), dtype=np.float32)
+        return segment
+
+    def _load_manifest(self, manifest: Dict[str, Any], full: bool):
+        if "segments" not in manifest:
+            # Single-file store from before segments existed; migrated on the next write
+            self.documents = manifest.get("documents", [])
+            self.metadatas = manifest.get("metadatas", [])
+            embeddings = manifest.get("embeddings", [])
+            self._set_blocks([np.asarray(embeddings, dtype=np.float32)] if embeddings else [])
+            self.generation, self.segments, self._legacy = 0, [], True
+            incremental = False
+        else:
+            segments = manifest["segments"]
+            incremental = not full and not self._legacy and segments[:len(self.segments)] == self.segments
+            new_segments = segments[len(self.segments):] if incremental else segments
             try:
-                with open(self.persist_path, 'r') as f:
-                    data = json.load(f)
-                    self.documents = data.get("documents", [])
-                    self.metadatas = data.get("metadatas", [])
-                    self.embeddings = data.get("embeddings", [])
-            except Exception:
-                pass
+                data = [self._read_segment(name) for name in new_segments]
+            except FileNotFoundError:
+                # A writer compacted the segments away after we read the manifest
+                return self._load_manifest(self._read_manifest(), full=True)
+            if not incremental:
+                self.documents, self.metadatas = [], []
+                self._set_blocks([])
+            for segment in data:
+                self.documents.extend(segment["documents"])
+                self.metadatas.extend(segment["metadatas"])
+                self._append_block(segment["vectors"])
+            self.generation, self.segments, self._legacy = manifest["generation"], list(segments), False
+        self._manifest_stat = manifest.get("stat")
+        self._invalidate_index(rows_replaced=not incremental)
+
+    def _commit(self, documents: List[str], vectors: np.ndarray,
+                metadatas: List[Dict[str, Any]], replace: bool):
+        """
+        Publishes rows as a new segment. With `replace` the rows become the entire
+        store and older segments are removed. Must hold the write lock.
+        """
+        os.makedirs(self.segment_dir, exist_ok=True)
+        generation = self.generation + 1
+        stem = f"seg-{generation:08d}-{uuid.uuid4().hex[:8]}"
+        name = stem + ".json"
+        # The sidecar is complete before the segment that references it is published
+        vectors_path = os.path.join(self.segment_dir, stem + ".npy")
+        _atomic_write_npy(vectors_path, np.ascontiguousarray(vectors, dtype=np.float32))
+        _atomic_write_json(os.path.join(self.segment_dir, name), {
+            "documents": documents,
+            "metadatas": metadatas,
+            "vectors": stem + ".npy"
+        })
+        old_segments = self.segments
+        segments = [name] if replace else self.segments + [name]
+        _atomic_write_json(self.persist_path, {"generation": generation, "segments": segments})
+
+        block = np.load(vectors_path, mmap_mode="r") if documents else None
+        if replace:
+            self.documents, self.metadatas = documents, metadatas
+            self._set_blocks([block])
+            for old in old_segments:
+                # Mapped sidecars stay readable after unlinking until their mapping is dropped
+                for path in (old, os.path.splitext(old)[0] + ".npy"):
+                    try:
+                        os.unlink(os.path.join(self.segment_dir, path))
+                    except FileNotFoundError:
+                        pass
+        else:
+            self.documents.extend(documents)
+            self.metadatas.extend(metadatas)
+            self._append_block(block)
+        self.generation, self.segments, self._legacy = generation, segments, False
+        self._manifest_stat = self._stat_manifest()
+        self._invalidate_index(rows_replaced=replace)
+
+EMBEDDING_MODEL = "models/text-embedding-004"
+# Texts per batchEmbedContents request (the API's maximum)
+EMBED_BATCH_SIZE = 100
 
 class EmbeddingSearchTool(Tool):
     def __init__(self):
@@ -80,37 +560,188 @@ class EmbeddingSearchTool(Tool):
             description="Searches memory using embeddings.",
             args_schema=None
         )
-        self.vector_store = SimpleVectorStore()
+        self.vector_store = SimpleVectorStore.shared()
 
     def _get_embedding(self, text: str) -> List[float]:
         api_key = os.getenv("GOOGLE_API_KEY")
         if not api_key:
             raise ValueError("GOOGLE_API_KEY environment variable not set.")
-        genai.configure(api_key=api_key)
+        configure_client(api_key)
         
-        result = genai.embed_content(
-            model="models/text-embedding-004",
+        result = embedding_limiter.call(
+            genai.embed_content,
+            model=EMBEDDING_MODEL,
             content=text,
             task_type="retrieval_document"
         )
         return result['embedding']
 
-    def index_document(self, text: str, metadata: Dict[str, Any]):
-        """Chunks and indexes the document text."""
+    async def _aget_embedding(self, text: str) -> List[float]:
+        if not async_client_supported():
+            return await run_sync(self._get_embedding, text)
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY environment variable not set.")
+        configure_client(api_key)
+
+        result = await embedding_limiter.acall(
+            genai.embed_content_async,
+            model=EMBEDDING_MODEL,
+            content=text,
+            task_type="retrieval_document"
+        )
+        return result['embedding']
+
+    def embed_query(self, query: str) -> List[float]:
+        """Embeds a query, reusing the cached vector for identical normalized text."""
+        key = (EMBEDDING_MODEL, normalize_query(query))
+        embedding = query_embedding_cache.get(key)
+        if embedding is None:
+            embedding = self._get_embedding(query)
+            query_embedding_cache.set(key, embedding)
+        return embedding
+
+    async def aembed_query(self, query: str) -> List[float]:
+        key = (EMBEDDING_MODEL, normalize_query(query))
+        embedding = query_embedding_cache.get(key)
+        if embedding is None:
+            embedding = await self._aget_embedding(query)
+            query_embedding_cache.set(key, embedding)
+        return embedding
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embeds many texts with batched requests (EMBED_BATCH_SIZE per call)."""
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY environment variable not set.")
+        configure_client(api_key)
+
+        embeddings = []
+        for i in range(0, len(texts), EMBED_BATCH_SIZE):
+            result = embedding_limiter.call(
+                genai.embed_content,
+                model=EMBEDDING_MODEL,
+                content=texts[i:i+EMBED_BATCH_SIZE],
+                task_type="retrieval_document"
+            )
+            embeddings.extend(result['embedding'])
+        return embeddings
+
+    def document_chunks(self, text: str, metadata: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Chunks of a document that still need embedding for `metadata["owner"]`."""
+        document_id, owner = metadata.get("document_id"), metadata.get("owner")
+        if document_id:
+            if self.vector_store.has_document(document_id, owner):
+                return []
+            # Identical documents are embedded once; other owners get a copy of the vectors
+            if self.copy_rows(lambda m: m.get("document_id") == document_id, lambda m: {**m, **metadata}):
+                return []
         # Simple chunking by paragraphs or fixed size
-        chunks = [text[i:i+1000] for i in range(0, len(text), 1000)]
-        
-        for chunk in chunks:
+        return [(text[i:i+1000], metadata) for i in range(0, len(text), 1000)]
+
+    def page_chunks(self, pages: List[Dict[str, Any]], metadata: Dict[str, Any],
+                    previous_document_id: Optional[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Chunks of pages whose hash is not yet stored for `metadata["owner"]`'s copy
+        of `metadata["document_id"]`. Pages already embedded for the same document
+        (by any owner) or unchanged since `previous_document_id` (the owner's
+        previous version of the document) have those vectors copied instead of
+        being re-embedded; the source rows are left untouched.
+        """
+        document_id, owner = metadata["document_id"], metadata.get("owner")
+        indexed = self.vector_store.page_hashes(document_id, owner)
+        page_metadata = {
+            p["page_hash"]: {**metadata, "page_hash": p["page_hash"], "page_number": p["page_number"]}
+            for p in pages if p["page_hash"] not in indexed
+        }
+        if page_metadata:
+            indexed |= self.copy_rows(
+                lambda m: m.get("page_hash") in page_metadata and (
+                    m.get("document_id") == document_id
+                    or (m.get("document_id") == previous_document_id and m.get("owner") == owner)),
+                lambda m: page_metadata[m["page_hash"]]
+            )
+
+        chunks = []
+        for page in pages:
+            if page["page_hash"] in indexed:
+                continue
+            indexed.add(page["page_hash"])
+            text = page["text"]
+            chunks.extend((text[i:i+1000], page_metadata[page["page_hash"]]) for i in range(0, len(text), 1000))
+        return chunks
+
+    def copy_rows(self, predicate: Callable[[Dict[str, Any]], bool],
+                  metadata_for: Callable[[Dict[str, Any]], Dict[str, Any]]) -> set:
+        """
+        Stores the vectors of chunks matching `predicate` again under `metadata_for(metadata)`,
+        taking each page from a single source partition. Returns the page hashes copied
+        (or {None} for documents indexed without pages).
+        """
+        sources: Dict[Any, Tuple[Any, Any]] = {}
+        items = []
+        for text, vector, m in self.vector_store.rows(predicate):
+            source = sources.setdefault(m.get("page_hash"), (m.get("owner"), m.get("document_id")))
+            if source == (m.get("owner"), m.get("document_id")):
+                items.append((text, vector, metadata_for(m)))
+        self.vector_store.add_many(items)
+        return set(sources)
+
+    def embed_and_store(self, chunks: List[Tuple[str, Dict[str, Any]]]):
+        """
+        Embeds chunks, possibly from several documents, in shared batched requests
+        and stores them as one segment.
+        """
+        if not chunks:
+            return
+        items = []
+        for i in range(0, len(chunks), EMBED_BATCH_SIZE):
+            batch = chunks[i:i+EMBED_BATCH_SIZE]
             try:
-                embedding = self._get_embedding(chunk)
-                self.vector_store.add(chunk, embedding, metadata)
+                embeddings = self.embed_texts([text for text, _ in batch])
+                items.extend((text, embedding, metadata) for (text, metadata), embedding in zip(batch, embeddings))
             except Exception as e:
-                print(f"Error indexing chunk: {e}")
+                print(f"Error indexing chunks: {e}")
+        self.vector_store.add_many(items)
+
+        # Answers cached for these documents may no longer reflect their chunks
+        for document_id in {metadata.get("document_id") for _, metadata in chunks}:
+            if document_id:
+                answer_cache.invalidate(document_id)
+
+    def index_document(self, text: str, metadata: Dict[str, Any]):
+        """Chunks and indexes the document text."""
+        self.embed_and_store(self.document_chunks(text, metadata))
+
+    def index_pages(self, pages: List[Dict[str, Any]], metadata: Dict[str, Any],
+                    previous_document_id: Optional[str] = None) -> int:
+        """
+        Indexes a document page by page, embedding only pages whose hash is neither
+        stored for `metadata["document_id"]` nor for `previous_document_id`.
+        Returns the number of pages embedded.
+        """
+        chunks = self.page_chunks(pages, metadata, previous_document_id)
+        self.embed_and_store(chunks)
+        return len({m["page_hash"] for _, m in chunks})
+
+    def run(self, query: str, n_results: int = 3, query_embedding: Optional[List[float]] = None,
+            document_ids: Optional[List[str]] = None, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        try:
+            if query_embedding is None:
+                query_embedding = self.embed_query(query)
+            return self.vector_store.search(query_embedding, n_results, document_ids=document_ids, owner=owner)
+        except Exception as e:
+            print(f"Error searching: {e}")
+            return []
 
-    def run(self, query: str, n_results: int = 3) -> List[Dict[str, Any]]:
+    async def arun(self, query: str, n_results: int = 3, query_embedding: Optional[List[float]] = None,
+                   document_ids: Optional[List[str]] = None, owner: Optional[str] = None) -> List[Dict[str, Any]]:
         try:
-            query_embedding = self._get_embedding(query)
-            return self.vector_store.search(query_embedding, n_results)
+            if query_embedding is None:
+                query_embedding = await self.aembed_query(query)
+            # Refreshing and scoring the store is blocking work
+            return await run_sync(self.vector_store.search, query_embedding, n_results,
+                                  document_ids=document_ids, owner=owner)
         except Exception as e:
             print(f"Error searching: {e}")
             return []
@@ -6,6 +6,8 @@ class FlashcardFormatterArgs(BaseModel):
     qa_pairs: List[Dict[str, str]] = Field(..., description="List of Q/A pairs")
 
 class FlashcardFormatterTool(Tool):
+    cacheable = True
+
     def __init__(self):
         super().__init__(
             name="flashcard_formatter",
@@ -7,6 +7,10 @@ class DateParserArgs(BaseModel):
     date_string: str = Field(..., description="The date string to parse")
 
 class DateParserTool(Tool):
+    # Pure, and called with the same few date strings over and over
+    cacheable = True
+    cache_size = 1024
+
     def __init__(self):
         super().__init__(
             name="date_parser",
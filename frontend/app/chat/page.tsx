@@ -51,10 +51,12 @@ export default function Chat() {
         setLoading(true)
 
         try {
+            // Chat only searches the documents uploaded in this session
+            const sessionId = JSON.parse(localStorage.getItem("dashboardData") || "{}").session_id
             const response = await fetch("http://localhost:8000/api/chat", {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
-                body: JSON.stringify({ message: text, history: messages }),
+                body: JSON.stringify({ message: text, history: messages, session_id: sessionId }),
             })
 
             if (!response.ok) {
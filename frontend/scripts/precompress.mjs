@@ -0,0 +1,31 @@
+// Writes .br and .gz next to each compressible file of the static export, so the
+// API server serves build-time compressed variants instead of compressing at startup.
+import { readdirSync, readFileSync, writeFileSync } from "node:fs";
+import { join } from "node:path";
+import { brotliCompressSync, constants, gzipSync } from "node:zlib";
+
+const root = process.argv[2] ?? "out";
+const COMPRESSIBLE = /\.(html|js|mjs|css|json|txt|xml|svg|webmanifest|wasm|map)$/;
+// Matches the server's threshold for compressing a static file
+const MIN_BYTES = 1024;
+
+function* walk(dir) {
+  for (const entry of readdirSync(dir, { withFileTypes: true })) {
+    const path = join(dir, entry.name);
+    if (entry.isDirectory()) yield* walk(path);
+    else yield path;
+  }
+}
+
+for (const path of walk(root)) {
+  if (!COMPRESSIBLE.test(path)) continue;
+  const body = readFileSync(path);
+  if (body.length < MIN_BYTES) continue;
+  const variants = {
+    ".br": brotliCompressSync(body, { params: { [constants.BROTLI_PARAM_QUALITY]: 11 } }),
+    ".gz": gzipSync(body, { level: 9 }),
+  };
+  for (const [suffix, compressed] of Object.entries(variants)) {
+    if (compressed.length < body.length) writeFileSync(path + suffix, compressed);
+  }
+}
@@ -1,23 +1,44 @@
 import os
-import shutil
-import tempfile
+import gzip
+import json
+import hashlib
+import mimetypes
+import mmap
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Body
+from typing import Dict, Iterator, List, Optional, Tuple
+from fastapi import FastAPI, HTTPException, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, Response
+from starlette.datastructures import FormData, Headers, UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
 from pydantic import BaseModel
 import uvicorn
 
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is slower but produces the same JSON
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: only build-time .br files are then served as brotli
+    brotli = None
+
 # Google Calendar OAuth
 from google_auth_oauthlib.flow import Flow
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 
 # Import your existing agent logic
-from campus_taskflow.adk.core import State
+from campus_taskflow.adk.core import CheckpointNotFoundError, JobClaimedError, State, run_sync
 from campus_taskflow.agents.orchestrator import OrchestratorAgent
+from campus_taskflow.agents.batch import BatchOrchestratorAgent
 from campus_taskflow.tools.search_tools import EmbeddingSearchTool
 from campus_taskflow.adk.skills import LLMSkill
+from campus_taskflow.adk.cache import answer_cache
+from campus_taskflow.adk.memory import DocumentLineageStore
 
 # Allow OAuth over HTTP for local dev
 os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
@@ -26,6 +47,22 @@ CLIENT_SECRETS_FILE = "client_secret.json"
 SCOPES = ['https://www.googleapis.com/auth/calendar.events']
 REDIRECT_URI = 'http://localhost:8000/api/auth/callback'
 
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "50")) * 1024 * 1024
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "10"))
+# Uploads up to this size are processed entirely in memory; the form parser spills larger ones to a temp file
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_MB", "16")) * 1024 * 1024
+# Room for multipart boundaries and form fields on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+# Snapshots smaller than this are not worth compressing
+GZIP_MIN_BYTES = 1024
+# Exported Next.js frontend, loaded into memory at startup
+STATIC_DIR = os.path.join("frontend", "out")
+# Static files larger than this are streamed from disk instead of held in memory
+STATIC_MAX_INLINE_BYTES = int(os.getenv("STATIC_MAX_INLINE_MB", "8")) * 1024 * 1024
+# Brotli quality for static files without a build-time .br variant; every worker
+# compresses them at startup, and quality 11 costs seconds on a large bundle
+STATIC_BROTLI_QUALITY = int(os.getenv("STATIC_BROTLI_QUALITY", "5"))
+
 app = FastAPI(title="ScholarFlow AI API")
 
 # Configure CORS
@@ -37,10 +74,50 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def upload_body_limit(path: str) -> int:
+    """Largest request body accepted by an upload endpoint."""
+    max_files = MAX_BATCH_FILES if path == "/api/upload/batch" else 1
+    return max_files * (MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES)
+
+class UploadSizeLimitMiddleware:
+    """
+    Answers 413 for upload requests whose body exceeds `upload_body_limit`:
+    before reading anything when the client declares a larger Content-Length,
+    otherwise (chunked or understated bodies) as soon as the bytes received
+    pass the limit.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/upload"):
+            return await self.app(scope, receive, send)
+
+        limit = upload_body_limit(scope["path"])
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse(status_code=413, content={"detail": "Upload exceeds the size limit."})
+            return await response(scope, receive, send)
+
+        received = 0
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Propagates out of the form parser and is answered by the app's exception handler
+                    raise HTTPException(status_code=413, detail="Upload exceeds the size limit.")
+            return message
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # --- Data Models ---
 class ChatRequest(BaseModel):
     message: str
     history: List[dict] = []
+    session_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
@@ -48,15 +125,168 @@ class ChatResponse(BaseModel):
 class SettingsRequest(BaseModel):
     api_key: str
 
+# --- Response Snapshots ---
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+@dataclass(frozen=True)
+class Snapshot:
+    """A JSON payload serialized once, with its gzip variant and ETag."""
+    body: bytes
+    gzip_body: Optional[bytes]
+    etag: str
+
+    @classmethod
+    def of(cls, value) -> "Snapshot":
+        body = dumps(value)
+        gzip_body = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+        return cls(body, gzip_body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, and any representation's tag counts (proxies may re-tag compressed bodies)
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return etag in tags or any(encoded_etag(etag, encoding) in tags for encoding in ("gzip", "br"))
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    return etag[:-1] + f'-{encoding}"'
+
+def accepted_encodings(request: Request) -> set:
+    accepted = set()
+    for token in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = token.partition(";")
+        q = params.strip().removeprefix("q=")
+        # "br;q=0" explicitly refuses an encoding
+        if not q or q.replace(".", "").strip("0"):
+            accepted.add(name.strip().lower())
+    return accepted
+
+def snapshot_response(request: Request, snapshot: Snapshot) -> Response:
+    """Serves a snapshot's cached bytes: 304 when the client's copy is current, gzip when accepted."""
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    if snapshot.gzip_body is not None and "gzip" in accepted_encodings(request):
+        headers.update({"Content-Encoding": "gzip", "ETag": encoded_etag(snapshot.etag, "gzip")})
+        return Response(snapshot.gzip_body, media_type="application/json", headers=headers)
+    return Response(snapshot.body, media_type="application/json", headers=headers)
+
+EMPTY_DASHBOARD = {"status": "empty", "message": "No data available. Please upload a file first."}
+
 # --- Global State (Simple in-memory for demo purposes) ---
 class GlobalStore:
     last_state: Optional[State] = None
     history: List[dict] = []
     credentials: Optional[dict] = None
     chat_history: List[dict] = []
+    # Polled payloads, re-serialized only when a pipeline finishes
+    dashboard_snapshot: Snapshot = Snapshot.of(EMPTY_DASHBOARD)
+    history_snapshot: Snapshot = Snapshot.of([])
 
 store = GlobalStore()
 
+def publish_snapshots():
+    """Serializes the dashboard and history once, after `last_state` or `history` changed."""
+    state = store.last_state
+    store.dashboard_snapshot = Snapshot.of({
+        "status": "success",
+        "summary": state.get("summary", {}),
+        "tasks": state.get("parsed_tasks", []),
+        "schedule": state.get("schedule", []),
+        "flashcards": state.get("flashcards", [])
+    } if state else EMPTY_DASHBOARD)
+    store.history_snapshot = Snapshot.of(store.history)
+
+# --- Upload Helpers ---
+async def read_upload_form(request: Request, max_files: int) -> FormData:
+    """
+    Parses a multipart upload. Unlike the default parser, which spools files to
+    disk past 1 MB, this request's files stay in memory up to UPLOAD_SPOOL_BYTES
+    so `spooled_upload` can hand them to extraction without a disk round trip.
+    """
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload.")
+    parser = MultiPartParser(request.headers, request.stream(), max_files=max_files)
+    parser.spool_max_size = UPLOAD_SPOOL_BYTES
+    try:
+        return await parser.parse()
+    except MultiPartException as e:
+        raise HTTPException(status_code=400, detail=e.message)
+
+@contextmanager
+def spooled_upload(file: UploadFile) -> Iterator[Tuple[memoryview, str]]:
+    """
+    Views an upload in place, in the parser's own spooled file, with its SHA-256.
+    Spools still in memory are viewed directly, and spools rolled over to disk are
+    memory-mapped, so the PDF is never copied into a second buffer or temp file.
+    The view is only valid inside the `with` block.
+    """
+    spool = file.file
+    mapped = None
+    # starlette's UploadFile checks `_rolled` the same way
+    if getattr(spool, "_rolled", True):
+        spool.flush()
+        if os.fstat(spool.fileno()).st_size == 0:
+            raise HTTPException(status_code=400, detail="The uploaded file is empty.")
+        mapped = mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+    else:
+        view = spool._file.getbuffer()
+    try:
+        if view.nbytes > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="Upload exceeds the size limit.")
+        yield view, hashlib.sha256(view).hexdigest()
+    finally:
+        try:
+            view.release()
+            if mapped is not None:
+                mapped.close()
+        except BufferError:
+            # Still referenced (e.g. by an open document in a traceback); freed with its last reference
+            pass
+
+def record_upload(state: State) -> dict:
+    """Publishes a finished single-document run to the dashboard and history."""
+    store.last_state = state
+
+    history_entry = {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "filename": state.get("filename"),
+        "summary": state.get("summary", {}).get("summary", "No summary"),
+        "tasks_count": len(state.get("parsed_tasks", [])),
+        "flashcards_count": len(state.get("flashcards", [])),
+        "schedule_count": len(state.get("schedule", []))
+    }
+    store.history.append(history_entry)
+    publish_snapshots()
+
+    return {
+        "status": "success",
+        "session_id": state.session_id,
+        "cached": state.get("cache_hit", False),
+        "summary": state.get("summary", {}),
+        "tasks": state.get("parsed_tasks", []),
+        "schedule": state.get("schedule", []),
+        "flashcards": state.get("flashcards", [])
+    }
+
+def job_failure(orchestrator: OrchestratorAgent, state: State, error: Exception) -> JSONResponse:
+    """500 response naming the job, and whether it can be retried, when a pipeline run fails."""
+    job_id = state.get("job_id")
+    checkpoint = orchestrator.checkpoint_store.get(job_id) if job_id else None
+    resumable = bool(checkpoint and checkpoint.get("state") is not None)
+    return JSONResponse(status_code=500, content={
+        "detail": str(error),
+        "job_id": job_id,
+        "failed_stage": checkpoint.get("failed_stage") if checkpoint else None,
+        "retry_url": f"/api/jobs/{job_id}/retry" if resumable else None
+    })
+
 # --- Endpoints ---
 
 @app.get("/")
@@ -64,8 +294,8 @@ def read_root():
     return {"message": "ScholarFlow AI API is running"}
 
 @app.get("/api/history")
-def get_history():
-    return store.history
+def get_history(request: Request):
+    return snapshot_response(request, store.history_snapshot)
 
 @app.post("/api/settings")
 async def set_settings(settings: SettingsRequest):
@@ -142,60 +372,129 @@ def add_calendar_event(event: dict = Body(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/upload")
-async def upload_pdf(file: UploadFile = File(...)):
+async def upload_pdf(request: Request):
+    """Form fields: `file` (the PDF), optional `document_key` and `session_id`."""
+    form = await read_upload_form(request, max_files=1)
+    try:
+        return await process_upload(form.get("file"), form.get("document_key"), form.get("session_id"))
+    finally:
+        await form.close()
+
+async def process_upload(file: Optional[UploadFile], document_key: Optional[str], session_id: Optional[str]):
+    if not isinstance(file, UploadFile):
+        raise HTTPException(status_code=400, detail="A PDF file is required.")
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed.")
 
+    orchestrator = OrchestratorAgent()
+    # Uploads sharing a session_id are searched together in chat
+    state = State(session_id=session_id) if session_id else State()
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            shutil.copyfileobj(file.file, tmp_file)
-            tmp_path = tmp_file.name
+        with spooled_upload(file) as (source, content_hash):
+            # Identical PDFs hit the artifact cache by content hash
+            state.set("filename", file.filename)
+            state.set("content_hash", content_hash)
+            if document_key:
+                # Revisions uploaded under the same key in this session are processed incrementally
+                state.set("lineage_id", DocumentLineageStore.scoped_lineage_id(state.session_id, document_key))
+
+            print(f"Processing {file.filename}...")
+            await orchestrator.arun(state, source)
+            return record_upload(state)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error processing file: {e}")
+        return job_failure(orchestrator, state, e)
+
+@app.post("/api/jobs/{job_id}/retry")
+async def retry_job(job_id: str):
+    """Continues a failed upload from the stage that failed, reusing every stage that completed."""
+    orchestrator = OrchestratorAgent()
+    checkpoint = orchestrator.checkpoint_store.get(job_id)
+    if checkpoint is None:
+        raise HTTPException(status_code=404, detail="Unknown or already completed job.")
+    if checkpoint.get("state") is None:
+        raise HTTPException(status_code=409, detail="The job failed before any stage completed; upload the file again.")
 
-        orchestrator = OrchestratorAgent()
-        state = State()
+    try:
+        print(f"Retrying job {job_id} from {checkpoint['stages'][checkpoint['next_stage']:]}...")
+        state, _ = await orchestrator.aresume(job_id)
+        return record_upload(state)
+    except JobClaimedError:
+        raise HTTPException(status_code=409, detail="The job is already being retried.")
+    except CheckpointNotFoundError:
+        # Completed by a concurrent retry after the checkpoint was read
+        raise HTTPException(status_code=404, detail="Unknown or already completed job.")
+    except Exception as e:
+        print(f"Error retrying job: {e}")
+        return job_failure(orchestrator, State.from_dict(checkpoint["state"]), e)
 
-        print(f"Processing {file.filename}...")
-        orchestrator.run(state, tmp_path)
-        
-        store.last_state = state
-        
-        history_entry = {
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "filename": file.filename,
-            "summary": state.get("summary", {}).get("summary", "No summary"),
-            "tasks_count": len(state.get("parsed_tasks", [])),
-            "flashcards_count": len(state.get("flashcards", [])),
-            "schedule_count": len(state.get("schedule", []))
-        }
-        store.history.append(history_entry)
-        
-        os.unlink(tmp_path)
-        
-        return {
-            "status": "success",
-            "summary": state.get("summary", {}),
-            "tasks": state.get("parsed_tasks", []),
-            "schedule": state.get("schedule", []),
-            "flashcards": state.get("flashcards", [])
-        }
+@app.post("/api/upload/batch")
+async def upload_batch(request: Request):
+    """Form fields: `files` (one per PDF) and an optional `session_id`."""
+    form = await read_upload_form(request, max_files=MAX_BATCH_FILES)
+    try:
+        files = [f for f in form.getlist("files") if isinstance(f, UploadFile)]
+        return await process_batch(files, form.get("session_id"))
+    finally:
+        await form.close()
+
+async def process_batch(files: List[UploadFile], session_id: Optional[str]):
+    if not files or len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"Upload between 1 and {MAX_BATCH_FILES} PDF files.")
+    if not all(f.filename.endswith('.pdf') for f in files):
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed.")
 
+    # One session for the whole batch so chat can search across every course
+    session_id = session_id or State().session_id
+    try:
+        with ExitStack() as uploads:
+            documents = []
+            for file in files:
+                source, content_hash = uploads.enter_context(spooled_upload(file))
+                doc_state = State(session_id=session_id)
+                doc_state.set("filename", file.filename)
+                doc_state.set("content_hash", content_hash)
+                documents.append((doc_state, source))
+
+            print(f"Processing batch of {len(files)} files...")
+            state = State(session_id=session_id)
+            await BatchOrchestratorAgent().arun(state, documents)
+
+            store.last_state = state
+
+            for doc in state.get("documents", []):
+                store.history.append({
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "filename": doc["filename"],
+                    "summary": doc["summary"].get("summary", "No summary"),
+                    "tasks_count": len(doc["tasks"]),
+                    "flashcards_count": len(doc["flashcards"]),
+                    "schedule_count": len(state.get("schedule", []))
+                })
+            publish_snapshots()
+
+            return {
+                "status": "success",
+                "session_id": session_id,
+                "summary": state.get("summary", {}),
+                "tasks": state.get("parsed_tasks", []),
+                "schedule": state.get("schedule", []),
+                "flashcards": state.get("flashcards", []),
+                "documents": state.get("documents", [])
+            }
+
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error processing file: {e}")
+        print(f"Error processing batch: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/dashboard")
-def get_dashboard_data():
-    if not store.last_state:
-        return {"status": "empty", "message": "No data available. Please upload a file first."}
-    
-    state = store.last_state
-    return {
-        "status": "success",
-        "summary": state.get("summary", {}),
-        "tasks": state.get("parsed_tasks", []),
-        "schedule": state.get("schedule", []),
-        "flashcards": state.get("flashcards", [])
-    }
+def get_dashboard_data(request: Request):
+    return snapshot_response(request, store.dashboard_snapshot)
 
 @app.get("/api/chat/history")
 def get_chat_history():
@@ -206,7 +505,14 @@ def get_chat_history():
 
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
-    if not store.last_state:
+    # Only the session's own documents are searched, never other students' uploads
+    if not request.session_id:
+        raise HTTPException(status_code=400, detail="session_id is required; use the one returned by the upload.")
+    # Opening the shared vector store refreshes it from disk. Rows carry their session as `owner`,
+    # so every worker sharing the store sees the session's documents, whichever handled the upload
+    rag_tool = await run_sync(EmbeddingSearchTool)
+    document_ids = await run_sync(rag_tool.vector_store.owner_documents, request.session_id)
+    if not document_ids:
          return ChatResponse(response="Please upload and analyze a document first so I can answer questions about it.")
 
     prompt = request.message
@@ -215,16 +521,29 @@ async def chat(request: ChatRequest):
     store.chat_history.append({"role": "user", "content": prompt})
     
     try:
-        rag_tool = EmbeddingSearchTool()
-        results = rag_tool.run(prompt)
-        
-        if results:
-            context = "\n".join([r['content'] for r in results])
-            llm = LLMSkill()
-            full_prompt = f"Answer the question based on the context:\nContext: {context}\nQuestion: {prompt}"
-            answer = llm.execute(full_prompt)
-        else:
-            answer = "I couldn't find relevant information in the document."
+        try:
+            query_embedding = await rag_tool.aembed_query(prompt)
+        except Exception as e:
+            # No API key or a failed embedding call: answer without retrieval, as search failures do
+            print(f"Chat embedding error: {e}")
+            query_embedding = None
+        answer = answer_cache.lookup(document_ids, query_embedding) if query_embedding is not None else None
+
+        if answer is None:
+            results = await rag_tool.arun(prompt, query_embedding=query_embedding, document_ids=document_ids,
+                                         owner=request.session_id) \
+                if query_embedding is not None else []
+
+            if results:
+                context = "\n".join([r['content'] for r in results])
+                llm = LLMSkill()
+                full_prompt = f"Answer the question based on the context:\nContext: {context}\nQuestion: {prompt}"
+                answer = await llm.aexecute(full_prompt)
+                # Never cache error strings from the LLM skill
+                if not answer.startswith("[Error"):
+                    answer_cache.store(document_ids, query_embedding, answer)
+            else:
+                answer = "I couldn't find relevant information in the document."
         
         # Add assistant message to history
         store.chat_history.append({"role": "assistant", "content": answer})
@@ -236,24 +555,101 @@ async def chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 # --- Static Files (Must be last) ---
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-
-# Mount static files (JS, CSS, Images)
-if os.path.exists("frontend/out"):
-    app.mount("/_next", StaticFiles(directory="frontend/out/_next"), name="next")
-    # app.mount("/static", StaticFiles(directory="frontend/out/static"), name="static") # If you have a static folder
-
-    # Catch-all for SPA routing (serve index.html)
-    @app.get("/{full_path:path}")
-    async def serve_spa(full_path: str):
-        # Check if file exists in out directory (e.g. favicon.ico)
-        file_path = os.path.join("frontend/out", full_path)
-        if os.path.exists(file_path) and os.path.isfile(file_path):
-            return FileResponse(file_path)
-        
-        # Otherwise return index.html
-        return FileResponse("frontend/out/index.html")
+# Media types worth compressing; images, fonts and archives are already compressed
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/xml",
+                      "image/svg+xml", "application/manifest+json", "application/wasm")
+# Next.js puts content-hashed build output here, so a URL's bytes never change
+IMMUTABLE_PREFIX = "_next/static/"
+# Content-Encoding -> suffix of the variants frontend/scripts/precompress.mjs writes, best first
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+@dataclass(frozen=True)
+class StaticAsset:
+    """A frontend file read once at startup, with its precompressed variants and ETag."""
+    media_type: str
+    etag: str
+    cache_control: str
+    body: Optional[bytes]
+    # Content-Encoding -> body, best first; only variants smaller than `body` are kept
+    encodings: Dict[str, bytes]
+    # Set instead of `body` for files too large to hold in memory
+    path: Optional[str] = None
+
+    @classmethod
+    def load(cls, path: str, url_path: str) -> "StaticAsset":
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        cache_control = "public, max-age=31536000, immutable" if url_path.startswith(IMMUTABLE_PREFIX) else "no-cache"
+        if os.path.getsize(path) > STATIC_MAX_INLINE_BYTES:
+            stat = os.stat(path)
+            return cls(media_type, f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"', cache_control, None, {}, path)
+
+        with open(path, "rb") as f:
+            body = f.read()
+        encodings = {}
+        if len(body) >= GZIP_MIN_BYTES and media_type.startswith(COMPRESSIBLE_TYPES):
+            for encoding, suffix in PRECOMPRESSED_SUFFIXES.items():
+                variant = precompressed_variant(path, suffix)
+                if variant is None and encoding == "br" and brotli is not None:
+                    variant = brotli.compress(body, quality=STATIC_BROTLI_QUALITY)
+                elif variant is None and encoding == "gzip":
+                    variant = gzip.compress(body, compresslevel=6, mtime=0)
+                if variant is not None and len(variant) < len(body):
+                    encodings[encoding] = variant
+        return cls(media_type, f'"{hashlib.sha256(body).hexdigest()[:32]}"', cache_control, body, encodings)
+
+def precompressed_variant(path: str, suffix: str) -> Optional[bytes]:
+    """The build's compressed copy of `path`, unless it is missing or older than the file."""
+    variant_path = path + suffix
+    try:
+        if os.path.getmtime(variant_path) < os.path.getmtime(path):
+            return None
+        with open(variant_path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def build_static_manifest(root: str) -> Dict[str, StaticAsset]:
+    """Maps every file under `root` by URL path, so requests never touch the filesystem."""
+    manifest = {}
+    for directory, _, files in os.walk(root):
+        names = set(files)
+        for name in files:
+            stem, suffix = os.path.splitext(name)
+            if suffix in PRECOMPRESSED_SUFFIXES.values() and stem in names:
+                # Served as a Content-Encoding of the file it was compressed from
+                continue
+            path = os.path.join(directory, name)
+            url_path = os.path.relpath(path, root).replace(os.sep, "/")
+            manifest[url_path] = StaticAsset.load(path, url_path)
+    return manifest
+
+def static_response(request: Request, asset: StaticAsset) -> Response:
+    headers = {"ETag": asset.etag, "Cache-Control": asset.cache_control}
+    if asset.encodings:
+        headers["Vary"] = "Accept-Encoding"
+    if etag_matches(request.headers.get("if-none-match"), asset.etag):
+        return Response(status_code=304, headers=headers)
+    if asset.path is not None:
+        return FileResponse(asset.path, media_type=asset.media_type, headers=headers)
+    accepted = accepted_encodings(request) if asset.encodings else ()
+    for encoding, body in asset.encodings.items():
+        if encoding in accepted:
+            headers.update({"Content-Encoding": encoding, "ETag": encoded_etag(asset.etag, encoding)})
+            return Response(body, media_type=asset.media_type, headers=headers)
+    return Response(asset.body, media_type=asset.media_type, headers=headers)
+
+STATIC_ASSETS: Dict[str, StaticAsset] = build_static_manifest(STATIC_DIR) if os.path.isdir(STATIC_DIR) else {}
+
+# Catch-all for the exported frontend; client-side routes fall back to index.html
+@app.get("/{full_path:path}")
+async def serve_spa(request: Request, full_path: str):
+    asset = STATIC_ASSETS.get(full_path)
+    if asset is None:
+        # A missing build chunk must 404 rather than be answered with HTML
+        if full_path.startswith("_next/") or "index.html" not in STATIC_ASSETS:
+            raise HTTPException(status_code=404, detail="Not Found")
+        asset = STATIC_ASSETS["index.html"]
+    return static_response(request, asset)
 
 if __name__ == "__main__":
     uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,7 +1,31 @@
+import os
+import asyncio
+import contextlib
+import tempfile
 import unittest
-from campus_taskflow.adk.core import State
+from unittest import mock
+import fitz
+from campus_taskflow.adk.core import JobClaimedError, State
+from campus_taskflow.adk.memory import ArtifactStore, CheckpointStore, DocumentLineageStore
 from campus_taskflow.agents.orchestrator import OrchestratorAgent
+from campus_taskflow.agents.batch import BatchOrchestratorAgent
 from campus_taskflow.agents.scheduler import SchedulerAgent
+from campus_taskflow.agents.task_parser import PAGE_BATCH_CHARS, TaskParsingAgent, page_batches
+from campus_taskflow.tools.search_tools import EmbeddingSearchTool, SimpleVectorStore
+from campus_taskflow.agents.flashcard import FlashcardAgent, MAX_CARDS, MAX_SECTIONS, deduplicate, lexical_vectors
+
+@contextlib.contextmanager
+def in_directory(path):
+    # The shared vector store lives in the working directory
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+def fake_embeddings(self, texts):
+    return [[1.0, float(len(text))] for text in texts]
 
 class TestAgents(unittest.TestCase):
     def test_scheduler_agent(self):
@@ -17,5 +41,285 @@ class TestAgents(unittest.TestCase):
         agent = OrchestratorAgent()
         self.assertEqual(len(agent.agents), 6)
 
+    def test_orchestrator_artifact_cache_hit(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            agent = OrchestratorAgent(artifact_store=ArtifactStore(tmp), checkpoint_store=CheckpointStore(tmp))
+            agent.artifact_store.put(agent.cache_key("abc"), {
+                "document_id": "doc",
+                "summary": {"summary": "Cached"},
+                "parsed_tasks": [{"description": "Essay", "deadline": None}],
+                "flashcards": [{"front": "Q", "back": "A", "tags": []}]
+            })
+            state = State()
+            state.set("content_hash", "abc")
+            # The PDF path is never opened on a hit
+            report = agent.run(state, "/nonexistent.pdf")
+
+            self.assertTrue(state.get("cache_hit"))
+            self.assertEqual(state.get("schedule")[0]["task"], "Essay")
+            self.assertTrue(report["tasks_valid"])
+            self.assertEqual([h["agent"] for h in state.history], ["SchedulerAgent", "ValidationAgent"])
+
+    def test_degraded_runs_are_not_cached_and_hits_reindex(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = os.path.join(tmp, "syllabus.pdf")
+            doc = fitz.open()
+            doc.new_page().insert_text((72, 72), "Assignment 1 due Friday")
+            doc.save(pdf_path)
+            agent = OrchestratorAgent(artifact_store=ArtifactStore(os.path.join(tmp, "artifacts")),
+                                      checkpoint_store=CheckpointStore(os.path.join(tmp, "checkpoints")))
+            summarizer = next(a for a in agent.agents if a.name == "SummarizationAgent")
+
+            state = State()
+            state.set("content_hash", "abc")
+            with mock.patch.object(summarizer.llm_skill, "summarize", return_value="[Error calling Gemini: 503]"):
+                agent.run(state, pdf_path)
+            self.assertEqual(state.get("fallback_agents"), ["SummarizationAgent"])
+            self.assertIsNone(agent.artifact_store.get(agent.cache_key("abc")))
+
+            agent.run(State(data={"content_hash": "abc"}), pdf_path)
+            self.assertIsNotNone(agent.artifact_store.get(agent.cache_key("abc")))
+
+            # A hit whose document never made it into the vector store is extracted and indexed again
+            state = State(data={"content_hash": "abc"})
+            with mock.patch.object(agent, "needs_index", return_value=True):
+                agents, current_input = agent.plan(state, pdf_path)
+            self.assertEqual([a.name for a in agents], ["PDFExtractionAgent", "SchedulerAgent", "ValidationAgent"])
+            self.assertEqual(current_input, pdf_path)
+
+    def test_cache_hit_from_another_session_copies_vectors(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            agent = OrchestratorAgent(artifact_store=ArtifactStore(os.path.join(tmp, "artifacts")),
+                                      checkpoint_store=CheckpointStore(os.path.join(tmp, "checkpoints")))
+            with in_directory(tmp), mock.patch.dict(os.environ, {"GOOGLE_API_KEY": "test"}):
+                agent.artifact_store.put(agent.cache_key("abc"), {
+                    "document_id": "doc", "summary": {"summary": "Cached"},
+                    "parsed_tasks": [{"description": "Essay", "deadline": None}], "flashcards": []
+                })
+                SimpleVectorStore.shared().add("Essay due", [1.0, 0.0], {"document_id": "doc", "owner": "alice"})
+                state = State(session_id="bob", data={"content_hash": "abc"})
+                # The PDF is never opened: alice's vectors are copied for bob
+                agents, _ = agent.plan(state, "/nonexistent.pdf")
+            self.assertEqual([a.name for a in agents], ["SchedulerAgent", "ValidationAgent"])
+            self.assertTrue(SimpleVectorStore.shared(os.path.join(tmp, "vector_store.json")).has_document("doc", "bob"))
+
+    def test_orchestrator_incremental_revision(self):
+        def write_pdf(path, page_texts):
+            doc = fitz.open()
+            for text in page_texts:
+                doc.new_page().insert_text((72, 72), text)
+            doc.save(path)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            agent = OrchestratorAgent(
+                artifact_store=ArtifactStore(os.path.join(tmp, "artifacts")),
+                lineage_store=DocumentLineageStore(os.path.join(tmp, "lineages")),
+                checkpoint_store=CheckpointStore(os.path.join(tmp, "checkpoints"))
+            )
+            v1, v2 = os.path.join(tmp, "v1.pdf"), os.path.join(tmp, "v2.pdf")
+            write_pdf(v1, ["Assignment 1 due Friday", "Lecture notes"])
+            write_pdf(v2, ["Assignment 1 due Friday", "Exam 2 next week"])
+
+            with in_directory(tmp), mock.patch.object(EmbeddingSearchTool, "embed_texts", fake_embeddings):
+                state = State(session_id="s1")
+                state.set("lineage_id", DocumentLineageStore.lineage_id_from_filename("CS101 Syllabus.pdf"))
+                agent.run(state, v1)
+                self.assertEqual(len(state.get("page_diff")["added"]), 2)
+                v1_document_id = state.get("document_id")
+
+                state = State(session_id="s1")
+                state.set("lineage_id", DocumentLineageStore.lineage_id_from_filename("cs101_syllabus_v2.pdf"))
+                agent.run(state, v2)
+                vectors = SimpleVectorStore.shared()
+            diff = state.get("page_diff")
+            self.assertEqual(diff["previous_version"], 1)
+            self.assertEqual((len(diff["added"]), len(diff["removed"]), len(diff["unchanged"])), (1, 1, 1))
+            pages = state.get("extracted_content")["pages"]
+            self.assertEqual([p["reused"] for p in pages], [True, False])
+            self.assertEqual([t["description"] for t in state.get("parsed_tasks")],
+                             ["Assignment 1 due Friday", "Exam 2 next week"])
+            # Each version is its own document; the superseded version's vectors are deleted
+            self.assertNotEqual(state.get("document_id"), v1_document_id)
+            self.assertEqual(vectors.page_hashes(v1_document_id, "s1"), set())
+            self.assertEqual(vectors.page_hashes(state.get("document_id"), "s1"), {p["page_hash"] for p in pages})
+            self.assertEqual(len(vectors.documents), 2)
+
+    def test_cache_hits_advance_the_lineage(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            agent = OrchestratorAgent(
+                artifact_store=ArtifactStore(os.path.join(tmp, "artifacts")),
+                lineage_store=DocumentLineageStore(os.path.join(tmp, "lineages")),
+                checkpoint_store=CheckpointStore(os.path.join(tmp, "checkpoints"))
+            )
+            paths = {}
+            for name, text in [("v1", "Assignment 1 due Friday"), ("v2", "Exam 2 next week")]:
+                paths[name] = os.path.join(tmp, f"{name}.pdf")
+                doc = fitz.open()
+                doc.new_page().insert_text((72, 72), text)
+                doc.save(paths[name])
+
+            def upload(name, document_key):
+                state = State(session_id="s1", data={"content_hash": name,
+                                                     "lineage_id": DocumentLineageStore.scoped_lineage_id("s1", document_key)})
+                agent.run(state, paths[name])
+                return state
+
+            with in_directory(tmp), mock.patch.object(EmbeddingSearchTool, "embed_texts", fake_embeddings):
+                v1_document_id = upload("v1", "syllabus").get("document_id")
+                upload("v2", "handout")
+                # v2's artifacts are cached now, so this upload skips extraction entirely
+                hit = upload("v2", "syllabus")
+                vectors = SimpleVectorStore.shared()
+            self.assertTrue(hit.get("cache_hit"))
+            self.assertEqual(hit.get("lineage")["document_id"], v1_document_id)
+            record = agent.lineage_store.load(DocumentLineageStore.scoped_lineage_id("s1", "syllabus"))
+            self.assertEqual((record["version"], record["document_id"]), (2, hit.get("document_id")))
+            self.assertEqual([p["text"].strip() for p in record["pages"]], ["Exam 2 next week"])
+            self.assertFalse(vectors.has_document(v1_document_id, "s1"))
+
+    def test_added_pages_are_parsed_in_bounded_batches(self):
+        pages = [{"page_number": i + 1, "page_hash": f"p{i}", "text": f"Assignment {i} due Friday. " + "x" * 6000}
+                 for i in range(5)]
+        agent = TaskParsingAgent()
+        prompts = []
+        def generate(prompt, item_model):
+            prompts.append(prompt)
+            return [{"description": line.split(".")[0], "page": int(line.split()[2])}
+                    for line in prompt.splitlines() if line.strip().startswith("--- Page")]
+
+        with mock.patch.object(agent.llm, "generate_structured", side_effect=generate):
+            tasks = agent.extract_page_tasks_with_llm(pages, State())
+        # No page past the first batch is cut off
+        self.assertEqual(len(prompts), 3)
+        self.assertEqual([t["page_hash"] for t in tasks], [p["page_hash"] for p in pages])
+        self.assertTrue(all(len(batch_text) <= PAGE_BATCH_CHARS for batch_text in
+                            ("\n".join(f"--- Page {p['page_number']} ---\n{p['text']}" for p in batch)
+                             for batch in page_batches(pages))))
+        # A single oversized page is split rather than truncated
+        long_page = [{"page_number": 1, "page_hash": "long", "text": "y" * 40000}]
+        self.assertEqual("".join(p["text"] for batch in page_batches(long_page) for p in batch), "y" * 40000)
+
+    def test_orchestrator_arun_matches_run(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = os.path.join(tmp, "syllabus.pdf")
+            doc = fitz.open()
+            doc.new_page().insert_text((72, 72), "Assignment 1 due Friday")
+            doc.save(pdf_path)
+            agent = OrchestratorAgent(artifact_store=ArtifactStore(os.path.join(tmp, "artifacts")),
+                                      checkpoint_store=CheckpointStore(os.path.join(tmp, "checkpoints")))
+
+            sync_state, async_state = State(), State()
+            agent.run(sync_state, pdf_path)
+            report = asyncio.run(agent.arun(async_state, pdf_path))
+
+            self.assertTrue(report["tasks_valid"])
+            for key in ["parsed_tasks", "schedule", "flashcards", "document_id"]:
+                self.assertEqual(sync_state.get(key), async_state.get(key))
+            self.assertEqual([h["agent"] for h in async_state.history], [a.name for a in agent.agents])
+
+    def test_orchestrator_resumes_from_failed_stage(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = os.path.join(tmp, "syllabus.pdf")
+            doc = fitz.open()
+            doc.new_page().insert_text((72, 72), "Assignment 1 due Friday")
+            doc.save(pdf_path)
+            agent = OrchestratorAgent(artifact_store=ArtifactStore(os.path.join(tmp, "artifacts")),
+                                      checkpoint_store=CheckpointStore(os.path.join(tmp, "checkpoints")))
+            scheduler = next(a for a in agent.agents if a.name == "SchedulerAgent")
+
+            state = State()
+            with mock.patch.object(scheduler, "run", side_effect=RuntimeError("LLM unavailable")):
+                with self.assertRaises(RuntimeError):
+                    agent.run(state, pdf_path)
+            job_id = state.get("job_id")
+            checkpoint = agent.checkpoint_store.get(job_id)
+            self.assertEqual(checkpoint["failed_stage"], "SchedulerAgent")
+            # The stage input is referenced, not stored twice, and the full text is rebuilt on resume
+            self.assertEqual((checkpoint["input"], checkpoint["input_key"]), (None, "flashcards"))
+            self.assertNotIn("full_text", checkpoint["state"]["data"]["extracted_content"])
+
+            # A job that is already being retried cannot be claimed twice
+            self.assertTrue(agent.checkpoint_store.claim(job_id))
+            with self.assertRaises(JobClaimedError):
+                asyncio.run(agent.aresume(job_id))
+            agent.checkpoint_store.release(job_id)
+
+            # Only the failed stage and those after it run again
+            os.remove(pdf_path)
+            resumed, report = asyncio.run(agent.aresume(job_id))
+            self.assertTrue(report["schedule_valid"])
+            self.assertEqual(resumed.get("schedule")[0]["task"], "Assignment 1 due Friday")
+            self.assertEqual([h["agent"] for h in resumed.history][-3:], ["FlashcardAgent", "SchedulerAgent", "ValidationAgent"])
+            self.assertEqual(sum(h["agent"] == "PDFExtractionAgent" for h in resumed.history), 1)
+            self.assertIsNone(agent.checkpoint_store.get(job_id))
+            self.assertIn("Assignment 1 due Friday", resumed.get("extracted_content")["full_text"])
+            self.assertTrue(agent.checkpoint_store.claim(job_id))
+
+    def test_stale_checkpoints_are_swept(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = CheckpointStore(tmp, ttl=60)
+            store.put("old", {"job_id": "old"})
+            store.put("new", {"job_id": "new"})
+            stale = os.path.join(tmp, f"{store.make_key('old')}.json")
+            os.utime(stale, (0, 0))
+            self.assertEqual(store.sweep(), 1)
+            self.assertIsNone(store.get("old"))
+            self.assertEqual(store.get("new"), {"job_id": "new"})
+
+    def test_batch_orchestrator_extracts_on_process_pool(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            documents = []
+            for name, text in [("math.pdf", "Assignment 1 due Friday"), ("bio.pdf", "Exam 2 next week")]:
+                path = os.path.join(tmp, name)
+                doc = fitz.open()
+                doc.new_page().insert_text((72, 72), text)
+                doc.save(path)
+                doc_state = State()
+                doc_state.set("filename", name)
+                documents.append((doc_state, path))
+
+            agent = BatchOrchestratorAgent(orchestrator=OrchestratorAgent(
+                artifact_store=ArtifactStore(os.path.join(tmp, "artifacts"))
+            ))
+            state = State()
+            report = agent.run(state, documents)
+
+            self.assertTrue(report["schedule_valid"])
+            self.assertEqual([t["course"] for t in state.get("parsed_tasks")], ["math.pdf", "bio.pdf"])
+            self.assertEqual(len(state.get("schedule")), 2)
+
+    def test_flashcard_dedup_and_budget(self):
+        cards = ["What is entropy? A measure of disorder", "What is entropy? A measure of disorder.",
+                 "What is enthalpy? Heat content at constant pressure"]
+        self.assertEqual(deduplicate(lexical_vectors(cards)), [0, 2])
+
+        # A 500-page course pack stays within the section and card caps
+        state = State()
+        state.set("extracted_content", {"pages": [{"text": "Entropy: a measure of disorder.\n" * 100}] * 500})
+        jobs, budget = FlashcardAgent().plan_sections(state)
+        self.assertEqual(budget, MAX_CARDS)
+        self.assertLessEqual(len(jobs), MAX_SECTIONS)
+
+        state.set("extracted_content", {"pages": [{"text": "Entropy: a measure of disorder in a system.\nEnthalpy is the heat content at constant pressure."}]})
+        flashcards = FlashcardAgent().run(state, None)
+        self.assertEqual([c["front"] for c in flashcards], ["What is Entropy?", "What is Enthalpy?"])
+
+    def test_flashcards_fall_back_when_every_section_fails(self):
+        state = State()
+        state.set("extracted_content", {"pages": [{"text": "Entropy: a measure of disorder in a system."}]})
+        agent = FlashcardAgent(max_concurrency=2)
+        agent.llm_skill.model = object()
+        agent.llm_skill.agenerate_flashcards = mock.AsyncMock(return_value="[Error calling Gemini API: 503]")
+        with mock.patch.object(agent, "card_vectors", lexical_vectors):
+            flashcards = asyncio.run(agent.arun(state, None))
+        self.assertEqual([c["front"] for c in flashcards], ["What is Entropy?"])
+        self.assertEqual(state.get("fallback_agents"), ["FlashcardAgent"])
+
+    def test_flashcard_concurrency_is_read_at_run_time(self):
+        agent = FlashcardAgent()
+        with mock.patch.dict(os.environ, {"FLASHCARD_CONCURRENCY": "7"}):
+            self.assertEqual(agent.concurrency(), 7)
+        self.assertEqual(FlashcardAgent(max_concurrency=2).concurrency(), 2)
+
 if __name__ == '__main__':
     unittest.main()
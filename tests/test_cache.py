@@ -0,0 +1,39 @@
+import time
+import unittest
+from campus_taskflow.adk.cache import TTLCache, SemanticAnswerCache, normalize_query
+
+class TestTTLCache(unittest.TestCase):
+    def test_lru_bound(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+
+    def test_expiry(self):
+        cache = TTLCache(maxsize=2, ttl=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("  When is the\nMidterm? "), "when is the midterm?")
+
+class TestSemanticAnswerCache(unittest.TestCase):
+    def test_similar_query_hits(self):
+        cache = SemanticAnswerCache(threshold=0.95)
+        cache.store(["doc1"], [1.0, 0.0, 0.0], "Week 7")
+        self.assertEqual(cache.lookup(["doc1"], [0.99, 0.05, 0.0]), "Week 7")
+        self.assertIsNone(cache.lookup(["doc1"], [0.0, 1.0, 0.0]))
+        self.assertIsNone(cache.lookup(["doc2"], [1.0, 0.0, 0.0]))
+
+    def test_invalidate_document(self):
+        cache = SemanticAnswerCache()
+        cache.store(["doc1", "doc2"], [1.0, 0.0], "answer")
+        cache.invalidate("doc2")
+        self.assertIsNone(cache.lookup(["doc1", "doc2"], [1.0, 0.0]))
+
+if __name__ == '__main__':
+    unittest.main()
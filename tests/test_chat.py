@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from fastapi.testclient import TestClient
+from campus_taskflow.adk.cache import answer_cache, query_embedding_cache
+from campus_taskflow.adk.core import State
+from campus_taskflow.adk.skills import LLMSkill
+from campus_taskflow.tools.search_tools import EmbeddingSearchTool, SimpleVectorStore
+import main
+
+class TestChat(unittest.TestCase):
+    def setUp(self):
+        # The vector store is opened relative to the working directory
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        self.env = mock.patch.dict(os.environ)
+        self.env.start()
+        os.environ.pop("GOOGLE_API_KEY", None)
+        self.client = TestClient(main.app)
+        main.store.last_state = State(session_id="s1")
+        # Chat searches the documents the session has vectors for
+        SimpleVectorStore.shared().add("The exam is on Friday.", [1.0, 0.0], {"document_id": "doc-1", "owner": "s1"})
+        query_embedding_cache.clear()
+        answer_cache.clear()
+
+    def tearDown(self):
+        main.store.last_state = None
+        self.env.stop()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_embedding_failure_degrades_instead_of_500(self):
+        response = self.client.post("/api/chat", json={"message": "When is the exam?", "session_id": "s1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["response"], "I couldn't find relevant information in the document.")
+
+    def test_repeated_questions_skip_embedding_and_llm(self):
+        embed = mock.AsyncMock(return_value=[1.0, 0.0])
+        llm = mock.AsyncMock(return_value="Friday.")
+        with mock.patch.object(EmbeddingSearchTool, "_aget_embedding", embed), \
+                mock.patch.object(LLMSkill, "aexecute", llm):
+            for message in ("When is the exam?", "  when is the EXAM?"):
+                response = self.client.post("/api/chat", json={"message": message, "session_id": "s1"})
+                self.assertEqual(response.json()["response"], "Friday.")
+            self.assertEqual((embed.await_count, llm.await_count), (1, 1))
+
+            # Indexing more of the document drops its cached answers
+            with mock.patch.object(EmbeddingSearchTool, "embed_texts", return_value=[[0.9, 0.1]]):
+                EmbeddingSearchTool().embed_and_store([("Exam moved to Monday.", {"document_id": "doc-1", "owner": "s1"})])
+            self.client.post("/api/chat", json={"message": "When is the exam?", "session_id": "s1"})
+            self.assertEqual((embed.await_count, llm.await_count), (1, 2))
+
+    def test_sessions_are_read_from_the_shared_store(self):
+        # Another worker process indexed this session's upload
+        other_worker = SimpleVectorStore(os.path.join(self.tmp.name, "vector_store.json"))
+        other_worker.add("Lab report due Monday.", [0.0, 1.0], {"document_id": "doc-2", "owner": "s2"})
+        self.assertEqual(SimpleVectorStore.shared().owner_documents("s2"), ["doc-2"])
+        response = self.client.post("/api/chat", json={"message": "Any labs?", "session_id": "s3"})
+        self.assertTrue(response.json()["response"].startswith("Please upload"))
+
+    def test_session_id_is_required(self):
+        response = self.client.post("/api/chat", json={"message": "When is the exam?"})
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,20 @@
+import unittest
+from campus_taskflow.testing.loadtest import diff_reports, parse_args, run_load_test
+
+class TestLoadTest(unittest.TestCase):
+    def test_small_run_reports_and_diffs(self):
+        args = parse_args(["--users", "2", "--chats", "1", "--dashboards", "2", "--pages", "1", "--latency", "0"])
+        report = run_load_test(args)
+
+        self.assertEqual(report["requests"], 8)
+        self.assertEqual({e: s["errors"] for e, s in report["endpoints"].items()}, {"upload": 0, "chat": 0, "dashboard": 0})
+        self.assertGreater(report["fake_gemini"]["requests"], 0)
+        self.assertGreater(report["peak_rss_mb"], 0)
+
+        slower = {**report, "throughput_rps": report["throughput_rps"] / 2}
+        diff = diff_reports(report, slower)
+        self.assertAlmostEqual(diff["throughput_rps"]["change"], -0.5)
+        self.assertEqual(diff["upload.p50"]["change"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
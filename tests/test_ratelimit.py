@@ -0,0 +1,73 @@
+import os
+import time
+import asyncio
+import unittest
+from unittest import mock
+from campus_taskflow.adk.ratelimit import AIMDLimiter, RateLimiter, TokenBucket, gemini_limiter
+from campus_taskflow.adk.skills import LLMSkill
+from campus_taskflow.testing.fake_gemini import FakeGeminiServer
+
+class TestLimiters(unittest.TestCase):
+    def test_token_bucket_respects_deadline(self):
+        bucket = TokenBucket(rate=1, capacity=1)
+        self.assertTrue(bucket.acquire())
+        self.assertFalse(bucket.acquire(deadline=time.monotonic() + 0.1))
+
+    def test_aimd_window(self):
+        limiter = AIMDLimiter(initial=4, latency_target=1.0)
+        limiter.acquire()
+        limiter.release(latency=0.1)
+        self.assertAlmostEqual(limiter.limit, 4.25)
+        limiter.acquire()
+        limiter.release(latency=0.1, throttled=True)
+        self.assertAlmostEqual(limiter.limit, 2.125)
+
+    def test_async_waiters_are_woken_by_release(self):
+        limiter = AIMDLimiter(initial=1)
+        async def scenario():
+            self.assertTrue(await limiter.aacquire())
+            waiter = asyncio.ensure_future(limiter.aacquire())
+            await asyncio.sleep(0.01)
+            self.assertFalse(waiter.done())
+            # A (slow, so the window stays at one) release from another thread hands the slot over without polling
+            await asyncio.get_running_loop().run_in_executor(None, limiter.release, 60.0)
+            self.assertTrue(await asyncio.wait_for(waiter, 1))
+            self.assertFalse(await limiter.aacquire(deadline=time.monotonic() + 0.01))
+        asyncio.run(scenario())
+        self.assertEqual((limiter.in_flight, limiter._async_waiters), (1, []))
+
+    def test_non_retryable_errors_propagate(self):
+        limiter = RateLimiter("test", rate=100, burst=100)
+        calls = []
+        def fail():
+            calls.append(1)
+            raise ValueError("bad request")
+        with self.assertRaises(ValueError):
+            limiter.call(fail)
+        self.assertEqual(len(calls), 1)
+
+    def test_acall_retries_throttled_coroutines(self):
+        from google.api_core.exceptions import TooManyRequests
+        limiter = RateLimiter("test", rate=100, burst=100, base_delay=0.001)
+        attempts = []
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise TooManyRequests("slow down")
+            return "done"
+        self.assertEqual(asyncio.run(limiter.acall(flaky)), "done")
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(limiter.concurrency.in_flight, 0)
+
+class TestLLMSkillAgainstFakeServer(unittest.TestCase):
+    def test_throttled_calls_are_retried(self):
+        with FakeGeminiServer(throttle_first=2, response_text="hello") as server, \
+                mock.patch.dict(os.environ, {"GOOGLE_API_KEY": "test", "GEMINI_API_ENDPOINT": server.endpoint}), \
+                mock.patch.object(gemini_limiter, "base_delay", 0.01), \
+                mock.patch.object(gemini_limiter, "concurrency", AIMDLimiter(initial=4)):
+            self.assertEqual(LLMSkill().execute("hi"), "hello")
+            self.assertEqual((server.requests, server.throttled), (3, 2))
+            self.assertLess(gemini_limiter.concurrency.limit, 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import gzip
+import os
+import tempfile
+import unittest
+from unittest import mock
+from fastapi.testclient import TestClient
+import main
+
+class TestStatic(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "out")
+        os.makedirs(os.path.join(self.root, "_next", "static", "chunks"))
+        self.client = TestClient(main.app)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, relpath: str, data: bytes):
+        with open(os.path.join(self.root, relpath), "wb") as f:
+            f.write(data)
+
+    def test_static_assets_are_served_from_manifest(self):
+        self.write("index.html", b"<html>" + b"ScholarFlow " * 200 + b"</html>")
+        self.write(os.path.join("_next", "static", "chunks", "app-3f2a.js"), b"console.log('app');" * 100)
+        with mock.patch.object(main, "STATIC_ASSETS", main.build_static_manifest(self.root)):
+            # Requests are answered from memory even after the build directory changes
+            os.unlink(os.path.join(self.root, "index.html"))
+
+            chunk = self.client.get("/_next/static/chunks/app-3f2a.js", headers={"Accept-Encoding": "gzip"})
+            self.assertEqual(chunk.headers["content-encoding"], "gzip")
+            self.assertEqual(chunk.headers["cache-control"], "public, max-age=31536000, immutable")
+            self.assertTrue(chunk.text.startswith("console.log"))
+            if main.brotli is not None:
+                br = self.client.get("/_next/static/chunks/app-3f2a.js", headers={"Accept-Encoding": "gzip, br"})
+                self.assertEqual(br.headers["content-encoding"], "br")
+            self.assertEqual(self.client.get("/_next/static/chunks/missing.js").status_code, 404)
+
+            # Client-side routes fall back to index.html, revalidated by ETag
+            page = self.client.get("/dashboard", headers={"Accept-Encoding": "identity"})
+            self.assertEqual(page.headers["cache-control"], "no-cache")
+            self.assertTrue(page.text.startswith("<html>"))
+            self.assertEqual(self.client.get("/calendar", headers={"If-None-Match": page.headers["etag"]}).status_code, 304)
+
+    def test_build_time_variants_are_preferred(self):
+        body = b"console.log('app');" * 100
+        chunk = os.path.join("_next", "static", "chunks", "app-3f2a.js")
+        self.write(chunk, body)
+        self.write(chunk + ".gz", gzip.compress(body, compresslevel=9, mtime=0))
+        self.write(chunk + ".br", b"built brotli")
+
+        manifest = main.build_static_manifest(self.root)
+        # The variants are encodings of the chunk, not URLs of their own
+        self.assertEqual(list(manifest), ["_next/static/chunks/app-3f2a.js"])
+        asset = manifest["_next/static/chunks/app-3f2a.js"]
+        self.assertEqual(list(asset.encodings), ["br", "gzip"])
+        self.assertEqual(asset.encodings["br"], b"built brotli")
+
+        # A variant older than its source is stale and compressed again instead
+        os.utime(os.path.join(self.root, chunk + ".br"), (0, 0))
+        with mock.patch.object(main, "brotli", None):
+            self.assertEqual(list(main.StaticAsset.load(os.path.join(self.root, chunk), "app.js").encodings), ["gzip"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import json
+import unittest
+from unittest import mock
+from campus_taskflow.adk.core import State
+from campus_taskflow.adk.ratelimit import AIMDLimiter, gemini_limiter
+from campus_taskflow.adk.skills import LLMSkill
+from campus_taskflow.adk.structured import JSONArrayStreamParser, parse_json_array, response_schema, validate_items
+from campus_taskflow.agents.task_parser import TaskItem, TaskParsingAgent
+from campus_taskflow.testing.fake_gemini import FakeGeminiServer
+
+class TestStructuredParsing(unittest.TestCase):
+    def test_elements_are_emitted_as_they_complete(self):
+        parser = JSONArrayStreamParser()
+        self.assertEqual(parser.feed('```json\n[{"a": "x, ]'), [])
+        self.assertEqual(parser.feed('y"}, {"a": 2'), [{"a": "x, ]y"}])
+        self.assertEqual(parser.feed('}]\n```'), [{"a": 2}])
+
+    def test_broken_elements_do_not_lose_neighbours(self):
+        items, failed = parse_json_array(['[{"a": 1,}, {"a": oops}, {b: None}, {"a": 4, "b": "trunc'])
+        self.assertEqual(items, [{"a": 1}, {"b": None}, {"a": 4, "b": "trunc"}])
+        self.assertEqual(failed, ['{"a": oops}'])
+
+    def test_schema_and_validation(self):
+        schema = response_schema(TaskItem)
+        self.assertEqual(schema["items"]["properties"]["priority"]["enum"], ["High", "Medium", "Low"])
+        self.assertTrue(schema["items"]["properties"]["deadline"]["nullable"])
+
+        valid, broken = validate_items([
+            {"description": "Essay", "priority": "high", "deadline": "2025-03-01"},
+            {"description": "Lab", "deadline": "next Friday"}
+        ], TaskItem)
+        self.assertEqual(valid[0]["priority"], "High")
+        self.assertEqual(list(broken[0]["errors"]), ["deadline"])
+
+class TestStructuredAgainstFakeServer(unittest.TestCase):
+    def test_invalid_fields_are_repaired_without_reparsing_the_document(self):
+        prompts = []
+        def respond(request):
+            prompt = request["contents"][0]["parts"][0]["text"]
+            prompts.append(prompt)
+            if "failed validation" in prompt:
+                return json.dumps([{"description": "Lab report", "deadline": "2025-03-07", "priority": "Low", "estimated_hours": 3}])
+            return '[{"description": "Essay", "deadline": "2025-03-01", "priority": "High", "estimated_hours": 4},' \
+                   ' {"description": "Lab report", "deadline": "next Friday", "priority": "Low", "estimated_hours": 3}]'
+
+        with FakeGeminiServer(response_text=respond) as server, \
+                mock.patch.dict(os.environ, {"GOOGLE_API_KEY": "test", "GEMINI_API_ENDPOINT": server.endpoint}), \
+                mock.patch.object(gemini_limiter, "concurrency", AIMDLimiter(initial=4)):
+            state = State()
+            tasks = TaskParsingAgent().run(state, {"full_text": "Essay due March 1. Lab report due next Friday."})
+
+        self.assertEqual([t["deadline"] for t in tasks], ["2025-03-01", "2025-03-07"])
+        self.assertEqual(len(prompts), 2)
+        self.assertNotIn("Essay", prompts[1])
+
+    def test_nothing_valid_after_repair_falls_back_to_heuristic(self):
+        def respond(request):
+            return '[{"description": "Essay", "deadline": "whenever"}]'
+
+        with FakeGeminiServer(response_text=respond) as server, \
+                mock.patch.dict(os.environ, {"GOOGLE_API_KEY": "test", "GEMINI_API_ENDPOINT": server.endpoint}), \
+                mock.patch.object(gemini_limiter, "concurrency", AIMDLimiter(initial=4)):
+            state = State()
+            tasks = TaskParsingAgent().run(state, {"full_text": "Essay due Friday."})
+
+        self.assertEqual([t["description"] for t in tasks], ["Essay due Friday."])
+        self.assertEqual(state.get("fallback_agents"), ["TaskParsingAgent"])
+
+    def test_empty_response_is_an_honest_empty_list(self):
+        with FakeGeminiServer(response_text="[]") as server, \
+                mock.patch.dict(os.environ, {"GOOGLE_API_KEY": "test", "GEMINI_API_ENDPOINT": server.endpoint}), \
+                mock.patch.object(gemini_limiter, "concurrency", AIMDLimiter(initial=4)):
+            self.assertEqual(LLMSkill().generate_structured("Find tasks in: nothing here", TaskItem), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import time
+import asyncio
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import ValidationError
+from campus_taskflow.adk.tools import Tool, ToolTimeoutError, _tool_executor
+from campus_taskflow.tools.text_tools import DateParserTool
+from campus_taskflow.tools.study_tools import FlashcardFormatterTool
+
+class SlowTool(Tool):
+    timeout = 0.05
+
+    def __init__(self):
+        super().__init__(name="slow", description="Sleeps.")
+
+    def run(self, seconds: float) -> str:
+        time.sleep(seconds)
+        return "done"
+
+class TestToolRuntime(unittest.TestCase):
+    def test_memoization_and_stats(self):
+        tool = DateParserTool()
+        tool.clear_cache()
+        first = tool.invoke(date_string="March 3, 2025")
+        self.assertEqual(tool.invoke(date_string="March 3, 2025"), first)
+        self.assertEqual((tool.stats.calls, tool.stats.cache_hits), (2, 1))
+        # Agents build their tools per request; the cache is shared by every instance
+        fresh = DateParserTool()
+        self.assertEqual(fresh.invoke(date_string="March 3, 2025"), first)
+        self.assertEqual(fresh.stats.cache_hits, 1)
+
+        formatter = FlashcardFormatterTool()
+        cards = formatter.invoke(qa_pairs=[{"question": "Q", "answer": "A"}])
+        cards[0]["tags"].append("mutated")
+        # Cached results are copies, so callers cannot corrupt the cache
+        self.assertEqual(formatter.invoke(qa_pairs=[{"question": "Q", "answer": "A"}])[0]["tags"], ["academic"])
+
+    def test_invalid_arguments_are_rejected(self):
+        with self.assertRaises(ValidationError):
+            DateParserTool().invoke(date_string=None)
+
+    def test_timeouts(self):
+        tool = SlowTool()
+        self.assertEqual(tool.invoke(seconds=0), "done")
+        with self.assertRaises(ToolTimeoutError):
+            tool.invoke(seconds=0.5)
+        with self.assertRaises(ToolTimeoutError):
+            asyncio.run(tool.ainvoke(seconds=0.5))
+        self.assertEqual(tool.stats.timeouts, 2)
+
+    def test_timeouts_exclude_time_queued_for_a_thread(self):
+        tool = SlowTool()
+        tool.timeout = 0.3
+        calls = _tool_executor._max_workers * 2
+        # Half the calls wait a whole run for a pool thread, which must not count against their timeout
+        with ThreadPoolExecutor(max_workers=calls) as callers:
+            results = list(callers.map(lambda _: tool.invoke(seconds=0.2), range(calls)))
+        self.assertEqual(results, ["done"] * calls)
+
+        async def gather():
+            tool.offload = "thread"
+            return await asyncio.gather(*(tool.ainvoke(seconds=0.2) for _ in range(calls)))
+        self.assertEqual(asyncio.run(gather()), ["done"] * calls)
+        self.assertEqual(tool.stats.timeouts, 0)
+
+    def test_process_offload(self):
+        tool = DateParserTool()
+        tool.offload = "process"
+        self.assertEqual(asyncio.run(tool.ainvoke(date_string="2025-03-03")), "2025-03-03T00:00:00")
+
+if __name__ == '__main__':
+    unittest.main()
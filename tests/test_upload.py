@@ -0,0 +1,146 @@
+import mmap
+import os
+import tempfile
+import unittest
+from unittest import mock
+import fitz
+from fastapi.testclient import TestClient
+from starlette.formparsers import MultiPartParser
+import main
+
+def make_pdf(text: str) -> bytes:
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    return doc.tobytes()
+
+def _batch_init_with(executor):
+    original = main.BatchOrchestratorAgent.__init__
+    def init(self, *args, **kwargs):
+        original(self, *args, executor=executor, **kwargs)
+    return init
+
+class TestUpload(unittest.TestCase):
+    def setUp(self):
+        # Artifact, lineage and vector stores are created relative to the working directory
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        self.env = mock.patch.dict(os.environ)
+        self.env.start()
+        os.environ.pop("GOOGLE_API_KEY", None)
+        self.client = TestClient(main.app)
+
+    def tearDown(self):
+        self.env.stop()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def upload(self, filename: str, text: str):
+        return self.client.post("/api/upload", files={"file": (filename, make_pdf(text), "application/pdf")})
+
+    def test_upload_small_pdf_in_memory(self):
+        opened = []
+        original = main.OrchestratorAgent.arun
+        async def spy(agent, state, input_data):
+            opened.append(input_data)
+            return await original(agent, state, input_data)
+
+        with mock.patch.object(main.OrchestratorAgent, "arun", spy):
+            response = self.upload("syllabus.pdf", "Assignment 1 due Friday")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["tasks"][0]["description"], "Assignment 1 due Friday")
+        self.assertIsInstance(opened[0], memoryview)
+        # The larger spool size applies to upload requests only, not every multipart form
+        self.assertEqual(MultiPartParser.spool_max_size, 1024 * 1024)
+
+    def test_upload_spills_to_disk_above_threshold(self):
+        opened = []
+        original = main.OrchestratorAgent.arun
+        async def spy(agent, state, input_data):
+            opened.append(input_data.obj)
+            return await original(agent, state, input_data)
+
+        with mock.patch.object(main, "UPLOAD_SPOOL_BYTES", 16), mock.patch.object(main.OrchestratorAgent, "arun", spy):
+            response = self.upload("notes.pdf", "Exam 2 next week")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["tasks"][0]["description"], "Exam 2 next week")
+        # The parser's own temp file is mapped rather than copied into a second one
+        self.assertIsInstance(opened[0], mmap.mmap)
+
+    def test_upload_size_limit(self):
+        with mock.patch.object(main, "MAX_UPLOAD_BYTES", 100):
+            response = self.upload("big.pdf", "x" * 50)
+        self.assertEqual(response.status_code, 413)
+
+    def test_chunked_upload_is_cut_off_while_streaming(self):
+        pdf = make_pdf("x" * 50)
+        body = (b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.pdf\"\r\n"
+                b"Content-Type: application/pdf\r\n\r\n" + pdf + b"\r\n--b--\r\n")
+        def chunks():
+            # No Content-Length is sent for a generator body, so only the streamed bytes count
+            for i in range(0, len(body), 256):
+                yield body[i:i + 256]
+
+        with mock.patch.object(main, "MAX_UPLOAD_BYTES", 100), mock.patch.object(main, "MULTIPART_OVERHEAD_BYTES", 0):
+            response = self.client.post("/api/upload", content=chunks(),
+                                        headers={"Content-Type": "multipart/form-data; boundary=b"})
+        self.assertEqual(response.status_code, 413)
+
+    def test_failed_upload_can_be_retried(self):
+        from campus_taskflow.agents.scheduler import SchedulerAgent
+        with mock.patch.object(SchedulerAgent, "arun", mock.AsyncMock(side_effect=RuntimeError("LLM unavailable"))):
+            response = self.upload("syllabus.pdf", "Assignment 1 due Friday")
+        self.assertEqual(response.status_code, 500)
+        body = response.json()
+        self.assertEqual(body["failed_stage"], "SchedulerAgent")
+
+        response = self.client.post(body["retry_url"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["schedule"][0]["task"], "Assignment 1 due Friday")
+        # The job completed, so there is nothing left to retry
+        self.assertEqual(self.client.post(body["retry_url"]).status_code, 404)
+
+    def test_dashboard_and_history_serve_cached_snapshots(self):
+        text = "\n".join(f"Assignment {i} due Friday" for i in range(40))
+        self.assertEqual(self.upload("long.pdf", text).status_code, 200)
+
+        response = self.client.get("/api/dashboard", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.json()["tasks"][0]["description"], "Assignment 0 due Friday")
+        etag = response.headers["etag"]
+        self.assertEqual(self.client.get("/api/dashboard", headers={"If-None-Match": etag}).status_code, 304)
+
+        plain = self.client.get("/api/dashboard", headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("content-encoding", plain.headers)
+        # q=0 refuses gzip even though the header mentions it
+        refused = self.client.get("/api/dashboard", headers={"Accept-Encoding": "br, gzip;q=0"})
+        self.assertNotIn("content-encoding", refused.headers)
+        self.assertEqual(self.client.get("/api/dashboard", headers={"If-None-Match": plain.headers["etag"]}).status_code, 304)
+
+        history = self.client.get("/api/history")
+        self.assertEqual(history.json()[-1]["filename"], "long.pdf")
+        self.assertEqual(self.client.get("/api/history", headers={"If-None-Match": history.headers["etag"]}).status_code, 304)
+
+        # A new upload publishes new snapshots, so old ETags stop matching
+        self.upload("other.pdf", "Exam 2 next week")
+        self.assertEqual(self.client.get("/api/dashboard", headers={"If-None-Match": etag}).status_code, 200)
+
+    def test_batch_upload_combines_courses(self):
+        from concurrent.futures import ThreadPoolExecutor
+        files = [
+            ("files", ("math101.pdf", make_pdf("Assignment 1 due Friday"), "application/pdf")),
+            ("files", ("bio201.pdf", make_pdf("Exam 2 next week"), "application/pdf")),
+        ]
+        # Keep extraction in-process; spawned workers would not see the temp working directory
+        with ThreadPoolExecutor(2) as executor, \
+                mock.patch.object(main.BatchOrchestratorAgent, "__init__", _batch_init_with(executor)):
+            response = self.client.post("/api/upload/batch", files=files)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([t["course"] for t in body["tasks"]], ["math101.pdf", "bio201.pdf"])
+        self.assertEqual([d["filename"] for d in body["documents"]], ["math101.pdf", "bio201.pdf"])
+        self.assertEqual({s["task"] for s in body["schedule"]}, {"Assignment 1 due Friday", "Exam 2 next week"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import numpy as np
+from campus_taskflow.tools.quantization import FloatIndex, Int8Index, PQIndex
+from campus_taskflow.tools.search_tools import EmbeddingSearchTool, SimpleVectorStore
+
+class TestSimpleVectorStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "vector_store.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_delete_by_metadata(self):
+        store = SimpleVectorStore(self.path)
+        store.add("page one", [1.0, 0.0], {"document_id": "a", "page_hash": "p1"})
+        store.add("page two", [0.0, 1.0], {"document_id": "a", "page_hash": "p2"})
+        removed = store.delete(lambda m: m.get("page_hash") == "p1")
+
+        self.assertEqual(removed, 1)
+        self.assertEqual(store.page_hashes("a"), {"p2"})
+        reloaded = SimpleVectorStore(self.path)
+        self.assertEqual(reloaded.search([1.0, 0.0], n_results=5)[0]["content"], "page two")
+
+    def test_search_only_scans_requested_partitions(self):
+        store = SimpleVectorStore(self.path)
+        store.add("mine", [1.0, 0.1], {"document_id": "mine"})
+        store.add("theirs", [1.0, 0.0], {"document_id": "theirs"})
+
+        self.assertEqual(store.search([1.0, 0.0], n_results=1)[0]["content"], "theirs")
+        results = store.search([1.0, 0.0], n_results=3, document_ids=["mine"])
+        self.assertEqual([r["content"] for r in results], ["mine"])
+        self.assertEqual(store.search([1.0, 0.0], document_ids=["unknown"]), [])
+
+    def test_partitions_are_scoped_by_owner(self):
+        store = SimpleVectorStore(self.path)
+        store.add("alice's notes", [1.0, 0.0], {"document_id": "same", "owner": "alice"})
+        tool = EmbeddingSearchTool()
+        tool.vector_store = store
+
+        self.assertEqual(store.search([1.0, 0.0], document_ids=["same"], owner="bob"), [])
+        # Bob uploading identical content gets his own copy without re-embedding it
+        chunks = tool.document_chunks("alice's notes", {"document_id": "same", "owner": "bob"})
+        self.assertEqual(chunks, [])
+        self.assertTrue(store.has_document("same", "bob"))
+        self.assertEqual(store.search([1.0, 0.0], document_ids=["same"], owner="bob")[0]["metadata"]["owner"], "bob")
+        self.assertEqual(store.owner_documents("bob"), ["same"])
+
+    def test_partitions_are_extended_for_appended_rows(self):
+        store = SimpleVectorStore(self.path)
+        store.add("one", [1.0, 0.0], {"document_id": "a", "owner": "alice"})
+        rows = store._get_partitions()[("alice", "a")]
+        SimpleVectorStore(self.path).add("two", [0.0, 1.0], {"document_id": "b", "owner": "alice"})
+
+        self.assertEqual(store.owner_documents("alice"), ["a", "b"])
+        # The segment another writer appended was added to the existing partitions, not rebuilt from every row
+        self.assertIs(store._get_partitions()[("alice", "a")], rows)
+        store.delete(lambda m: m["document_id"] == "a")
+        self.assertEqual(store.owner_documents("alice"), ["b"])
+
+    def test_readers_pick_up_other_writers_incrementally(self):
+        worker_a = SimpleVectorStore(self.path)
+        worker_b = SimpleVectorStore(self.path)
+        worker_a.add("from a", [1.0, 0.0], {"document_id": "a"})
+
+        self.assertTrue(worker_b.refresh())
+        self.assertEqual(worker_b.documents, ["from a"])
+        self.assertFalse(worker_b.refresh())
+
+        # Writers refresh under the lock, so neither overwrites the other's rows
+        worker_b.add("from b", [0.0, 1.0], {"document_id": "b"})
+        worker_a.add("from a again", [1.0, 1.0], {"document_id": "a"})
+        self.assertEqual(SimpleVectorStore(self.path).documents, ["from a", "from b", "from a again"])
+        self.assertEqual(len(worker_a.segments), 3)
+
+    def test_legacy_file_is_migrated_on_write(self):
+        with open(self.path, 'w') as f:
+            json.dump({"documents": ["old"], "metadatas": [{"document_id": "x"}], "embeddings": [[1.0, 0.0]]}, f)
+        store = SimpleVectorStore(self.path)
+        store.add("new", [0.0, 1.0], {"document_id": "y"})
+        self.assertEqual(SimpleVectorStore(self.path).documents, ["old", "new"])
+
+    def test_revision_reuses_unchanged_page_vectors(self):
+        store = SimpleVectorStore(self.path)
+        store.add("intro", [1.0, 0.0], {"document_id": "v1", "page_hash": "p1", "page_number": 1})
+        store.add("old exam", [0.0, 1.0], {"document_id": "v1", "page_hash": "p2", "page_number": 2})
+        tool = EmbeddingSearchTool()
+        tool.vector_store = store
+
+        pages = [{"page_hash": "p3", "page_number": 1, "text": "new exam"}, {"page_hash": "p1", "page_number": 2, "text": "intro"}]
+        chunks = tool.page_chunks(pages, {"document_id": "v2", "source": "syllabus.pdf"}, previous_document_id="v1")
+
+        # Only the added page needs embedding; the unchanged one is copied under the new id
+        self.assertEqual([(text, m["page_hash"]) for text, m in chunks], [("new exam", "p3")])
+        copied = store.search([1.0, 0.0], n_results=1, document_ids=["v2"])[0]
+        self.assertEqual((copied["content"], copied["metadata"]["page_number"]), ("intro", 2))
+
+    def test_quantized_indexes_rerank_to_exact_results(self):
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((600, 64)).astype(np.float32)
+        queries = vectors[:20] + 0.1 * rng.standard_normal((20, 64)).astype(np.float32)
+        items = [(str(i), v.tolist(), {"document_id": "even" if i % 2 == 0 else "odd"}) for i, v in enumerate(vectors)]
+
+        # float32 rows take 256 bytes; on a store this small the PQ codebooks dominate its footprint
+        for mode, max_bytes in (("int8", 64 + 4), ("pq", 64 * 4 / 2)):
+            path = os.path.join(self.tmp.name, f"{mode}.json")
+            store = SimpleVectorStore(path, quantization=mode)
+            store.quantize_min_rows = 400
+            store.add_many(items[:300])
+            # Too few rows to train PQ codebooks on: searches score exact float rows
+            self.assertEqual(store.search(queries[0].tolist(), n_results=1)[0]["content"], "0")
+            store.add_many(items[300:])
+            self.assertTrue(store.wait_for_index(timeout=60))
+            # Scores come from the float vectors, so the nearest row is found exactly
+            for i, query in enumerate(queries):
+                top = store.search(query.tolist(), n_results=1)[0]
+                self.assertEqual(top["content"], str(i))
+            self.assertEqual(store.search(queries[1].tolist(), n_results=1, document_ids=["odd"])[0]["content"], "1")
+            self.assertLessEqual(store.index_stats()["bytes_per_vector"], max_bytes)
+            # Vectors live in .npy sidecars and survive a reload
+            self.assertEqual(SimpleVectorStore(path, quantization=mode).search(queries[0].tolist(), n_results=1)[0]["content"], "0")
+
+        with self.assertRaises(ValueError):
+            SimpleVectorStore(self.path, quantization="fp4")
+
+    def test_pq_training_runs_off_the_search_path(self):
+        vectors = np.random.default_rng(0).standard_normal((600, 16)).astype(np.float32)
+        store = SimpleVectorStore(self.path, quantization="pq")
+        store.quantize_min_rows = 400
+        trained = threading.Event()
+        original = PQIndex.train
+        def slow_train(index, sample):
+            trained.wait(30)
+            original(index, sample)
+
+        with mock.patch.object(PQIndex, "train", slow_train):
+            store.add_many([(str(i), v.tolist(), {"document_id": "d"}) for i, v in enumerate(vectors)])
+            # Searches are answered exactly while the codebooks are still training
+            self.assertEqual(store.search(vectors[5].tolist(), n_results=1)[0]["content"], "5")
+            self.assertEqual(store.index_stats()["bytes_per_vector"], 16 * 4)
+            trained.set()
+            self.assertTrue(store.wait_for_index(timeout=60))
+        self.assertLess(store.index_stats()["bytes_per_vector"], 16 * 4)
+        self.assertEqual(store.search(vectors[5].tolist(), n_results=1)[0]["content"], "5")
+
+    def test_quantized_scores_approximate_float(self):
+        rng = np.random.default_rng(0)
+        rows = rng.standard_normal((5000, 64)).astype(np.float32)
+        rows /= np.linalg.norm(rows, axis=1, keepdims=True)
+        exact, int8, pq = FloatIndex(64), Int8Index(64), PQIndex(64)
+        for index in (exact, int8, pq):
+            index.extend(rows)
+        subset = np.array([3, 700, 4999])
+        np.testing.assert_allclose(int8.scores(rows[0]), exact.scores(rows[0]), atol=0.01)
+        # PQ scores the same whether or not its rows span several lookup blocks
+        np.testing.assert_allclose(pq.scores(rows[0], subset), pq.scores(rows[0])[subset], rtol=1e-5)
+        self.assertGreater(np.corrcoef(pq.scores(rows[0]), exact.scores(rows[0]))[0, 1], 0.5)
+        # Query latency is checked by vector_benchmark's --max-latency-ratio, not here
+
+    def test_corrupt_manifest_is_not_silently_ignored(self):
+        with open(self.path, 'w') as f:
+            f.write("{not json")
+        with self.assertRaises(json.JSONDecodeError):
+            SimpleVectorStore(self.path)
+
+if __name__ == '__main__':
+    unittest.main()